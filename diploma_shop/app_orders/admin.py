@@ -1,8 +1,19 @@
 from django.contrib import admin
-from .models import Order, Basket, BasketItem, PaymentCard
+from .models import Order, OrderItem, Basket, BasketItem, PaymentCard
 from typing import Type
 
 
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    fields: list[str] = ['product', 'price', 'count']
+    readonly_fields: list[str] = fields  # Строки заказа фиксируются при оформлении
+    can_delete: bool = False
+    extra: int = 0
+
+    def has_add_permission(self, request, obj=None) -> bool:
+        return False
+
+
 class OrderAdmin(admin.ModelAdmin):
     list_display: list[str] = [
         'id',
@@ -18,6 +29,7 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields: list[str] = ['id']
     ordering: list[str] = ['id']
     save_on_top: bool = True  # кнопка "Сохранить" в верхней части страницы редактирования объекта в админ- панели
+    inlines: list = [OrderItemInline]
 
 
 class BasketAdmin(admin.ModelAdmin):
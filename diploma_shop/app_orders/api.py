@@ -12,9 +12,41 @@ from rest_framework.views import APIView
 from rest_framework.generics import RetrieveAPIView
 from .models import Basket, BasketItem, Order
 from .serializers import BasketProductSerializer, BasketItemSerializer, OrderSerializer, OrderDetailSerializer, \
-    PaymentCardSerializer
-from .service import PlainListJSONParser
+    PaymentCardSerializer, BasketDeltaSerializer, load_order_products
+from .service import get_basket_quantities, add_to_basket, remove_from_basket, \
+    add_many_to_basket, remove_many_from_basket, SessionBasket, OrderHistoryPagination, save_changed_fields
 from app_products.models import ProductInstance
+from app_users.service import get_profile_snapshots, invalidate_profile_snapshot
+from diploma_shop.json_api import PlainListJSONParser
+
+
+def get_basket_data(basket_id: int) -> List[Dict[str, Any]]:
+    """
+    Содержимое сохраненной корзины для ответа; количества получаются одним сгруппированным запросом.
+
+    Parameters:
+    - basket_id (int): Идентификатор корзины.
+
+    Returns:
+    - List[Dict[str, Any]]: Сериализованные продукты корзины.
+    """
+    # Количества всех продуктов корзины одним запросом: {id продукта: количество}
+    return serialize_basket(get_basket_quantities([basket_id]).get(basket_id, {}))
+
+
+def serialize_basket(quantities: Dict[int, int]) -> List[Dict[str, Any]]:
+    """
+    Сериализует продукты корзины вместе с изображениями и тегами.
+
+    Parameters:
+    - quantities (Dict[int, int]): Количества продуктов {id продукта: количество}.
+
+    Returns:
+    - List[Dict[str, Any]]: Сериализованные продукты корзины.
+    """
+    products = ProductInstance.objects.filter_and_annotate(list(quantities)) \
+        .values(*BasketProductSerializer.flat_fields)
+    return BasketProductSerializer(products, many=True, context={'quantities': quantities}).data
 
 
 class BasketView(APIView):
@@ -27,7 +59,8 @@ class BasketView(APIView):
     - delete: Удалить продукт(ы) из корзины.
 
     Permissions:
-    - IsAuthenticated: Пользователь должен быть аутентифицирован.
+    - AllowAny: Корзина анонимного пользователя хранится в сессии (SessionBasket) и переносится
+      в Basket при входе или регистрации.
 
     Authentication:
     - SessionAuthentication: Аутентификация по сессии.
@@ -38,7 +71,7 @@ class BasketView(APIView):
     - 400 Bad Request: Ошибка в запросе или данных.
     - 404 Not Found: Не найден продукт в корзине.
     """
-    permission_classes: List[Any] = [permissions.IsAuthenticated]
+    permission_classes: List[Any] = [permissions.AllowAny]
     authentication_classes: List[Any] = [SessionAuthentication]
 
     def get(self, request: Any) -> Response:
@@ -51,12 +84,10 @@ class BasketView(APIView):
         Returns:
         - 200 OK: Успешное получение содержимого корзины.
         """
+        if not request.user.is_authenticated:  # Корзина анонимного пользователя читается из сессии
+            return Response(serialize_basket(SessionBasket(request.session).items))
         basket = get_object_or_404(Basket, user=request.user)  # Получаем корзину текущего пользователя
-        basket_items = basket.items2.all()  # Получаем все элементы корзины
-        product_ids = basket_items.values_list('product_id', flat=True)  # Получаем ID всех продуктов в корзине
-        products = ProductInstance.objects.filter_and_annotate(product_ids)  # Получаем продукты и их аннотации
-        serializer = BasketProductSerializer(products, many=True, context={'user': request.user})  # Сериализация данных
-        return Response(serializer.data)
+        return Response(get_basket_data(basket.id))
 
     def post(self, request: Any) -> Response:
         """
@@ -68,30 +99,25 @@ class BasketView(APIView):
         Returns:
         - 200 OK: Успешное добавление продукта в корзину.
         - 400 Bad Request: Ошибка в запросе или данных.
+        - 404 Not Found: Продукт не найден.
         """
         serializer = BasketItemSerializer(data=request.data)
         if serializer.is_valid():
-            basket, created = Basket.objects.get_or_create(
-                user=request.user)  # Получаем или создаем корзину пользователя, сделавшего запрос
             product_id = serializer.validated_data['id']
             count = serializer.validated_data['count']
-            product = ProductInstance.objects.get(id=product_id)  # Получаем конкретный продукт по его id
-
-            try:
-                basket_item = BasketItem.objects.get(basket=basket, product=product)  # Ищем продукт в корзине
-                basket_item.count += count  # Обновляем количество
-                # basket_item.save()
-            except BasketItem.DoesNotExist:  # Если продукта нет в корзине
-                basket_item = BasketItem.objects.create(basket=basket, product=product,
-                                                        count=count)  # Создаем новый элемент корзины
-                # basket_item.save()
-
-            basket_item.save()  # Сохранение изменений
-            basket_items = basket.items2.all()  # Получаем все элементы корзины пользователя
-            product_ids = basket_items.values_list('product_id', flat=True)  # Идентификаторы всех продуктов в корзине
-            products = ProductInstance.objects.filter_and_annotate(product_ids)  # Экземпляры продуктов с аннотациями
-            serializer = BasketProductSerializer(products, many=True, context={'user': request.user})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            if not request.user.is_authenticated:  # Анонимная корзина изменяется только в сессии
+                if not ProductInstance.objects.filter(id=product_id).exists():
+                    return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+                session_basket = SessionBasket(request.session)
+                session_basket.add(product_id, count)
+                return Response(serialize_basket(session_basket.items), status=status.HTTP_200_OK)
+            with transaction.atomic():  # Ответ строится в той же транзакции, что и изменение корзины
+                basket, created = Basket.objects.get_or_create(
+                    user=request.user)  # Получаем или создаем корзину пользователя, сделавшего запрос
+                # Атомарное добавление: количество увеличивается одним запросом на стороне БД
+                if not add_to_basket(basket.id, product_id, count):
+                    return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+                return Response(get_basket_data(basket.id), status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request: Any) -> Response:
@@ -108,33 +134,101 @@ class BasketView(APIView):
         """
         serializer = BasketItemSerializer(data=request.data)
         if serializer.is_valid():
-            basket = Basket.objects.get(user=request.user)  # Корзина пользователя
             product_id = serializer.validated_data['id']  # Идентификатор продукта и количества из валидированных данных
             count = serializer.validated_data['count']  # Количество продукта из валидированных данных
 
             try:
-                # Поиск элемента корзины для удаляемого продукта:
-                basket_item = BasketItem.objects.get(basket=basket, product_id=product_id)
-            except BasketItem.DoesNotExist:
+                if request.user.is_authenticated:
+                    # Условное уменьшение количества или удаление продукта на стороне БД
+                    removed = remove_from_basket(request.user.id, product_id, count)
+                else:
+                    removed = SessionBasket(request.session).remove(product_id, count)
+            except ValueError as error:
+                # Возврат 400, если требуемое количество больше, чем имеющееся в корзине
+                return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+            if not removed:
                 # Если продукт не найден в корзине, возврат 404
                 return Response({"error": "Product not found in basket"}, status=status.HTTP_404_NOT_FOUND)
 
-            if basket_item.count == count:
-                # Удаление продукта из корзины, если количество совпадает
-                basket_item.delete()
-            elif basket_item.count > count:
-                # Уменьшение количества продукта в корзине, если требуемое количество меньше, чем имеющееся
-                basket_item.count -= count
-                basket_item.save()
-            else:
-                # Возврат 400, если требуемое количество больше, чем имеющееся в корзине
-                return Response({"error": "The basket contains fewer items than you're trying to remove"},
-                                status=status.HTTP_400_BAD_REQUEST)
-
             return Response({"message": "Item(s) removed successfully"}, status=status.HTTP_204_NO_CONTENT)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BasketBulkView(APIView):
+    """
+    Изменение нескольких продуктов корзины одним запросом.
+
+    Methods:
+    - post: Применить список изменений количества продуктов.
+
+    Parser Classes:
+    - PlainListJSONParser: Тело запроса - JSON-массив, элементы которого разбираются по мере обработки.
+
+    Permissions:
+    - AllowAny: Для анонимного пользователя изменяется корзина в сессии.
+
+    Authentication:
+    - SessionAuthentication: Аутентификация по сессии.
+
+    Example:
+    POST /api/basket/bulk
+    [{"id": 1, "count": 2}, {"id": 5, "count": -1}]
+
+    Returns:
+    - 200 OK: Содержимое корзины после изменений.
+    - 400 Bad Request: Ошибка в запросе или данных.
+    - 404 Not Found: Продукт не найден, изменения не применены.
+    """
+    parser_classes: List[Any] = [PlainListJSONParser]
+    stream_list_items: bool = True  # PlainListJSONParser возвращает итератор элементов
+    permission_classes: List[Any] = [permissions.AllowAny]
+    authentication_classes: List[Any] = [SessionAuthentication]
+
+    def post(self, request: Any) -> Response:
+        """
+        Применить изменения количества продуктов в одной транзакции: положительное count добавляет
+        продукт, отрицательное - удаляет (строка удаляется, если количество становится не больше нуля).
+
+        Parameters:
+        - request (Request): Объект запроса.
+
+        Returns:
+        - 200 OK: Содержимое корзины после изменений.
+        - 400 Bad Request: Ошибка в запросе или данных.
+        - 404 Not Found: Продукт не найден, изменения не применены.
+        """
+        # Элементы разбираются и проверяются по одному, в памяти остаются только суммы по продуктам
+        deltas: Dict[int, int] = {}  # Суммарное изменение по каждому продукту
+        errors: List[Dict[str, Any]] = []  # Ошибки в формате сериализатора списка
+        for data in request.data:
+            serializer = BasketDeltaSerializer(data=data)
+            if serializer.is_valid():
+                item = serializer.validated_data
+                deltas[item['id']] = deltas.get(item['id'], 0) + item['count']
+                errors.append({})
+            else:
+                errors.append(serializer.errors)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        added = {product_id: delta for product_id, delta in deltas.items() if delta > 0}
+        removed = {product_id: -delta for product_id, delta in deltas.items() if delta < 0}
+
+        if not request.user.is_authenticated:  # Анонимная корзина изменяется только в сессии
+            if ProductInstance.objects.filter(id__in=list(added)).count() < len(added):
+                return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+            session_basket = SessionBasket(request.session)
+            session_basket.apply(deltas)
+            return Response(serialize_basket(session_basket.items), status=status.HTTP_200_OK)
+
+        with transaction.atomic():
+            basket, created = Basket.objects.get_or_create(user=request.user)
+            if add_many_to_basket(basket.id, added) < len(added):
+                transaction.set_rollback(True)  # Изменения применяются только целиком
+                return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+            remove_many_from_basket(basket.id, removed)
+            return Response(get_basket_data(basket.id), status=status.HTTP_200_OK)
+
+
 class OrderAPIView(APIView):
     """
     Управление заказами пользователя.
@@ -163,7 +257,11 @@ class OrderAPIView(APIView):
 
     def get(self, request: Any, *args: Any, **kwargs: Any) -> Response:
         """
-        Получить заказы пользователя.
+        Получить историю заказов пользователя, от новых к старым.
+
+        Заказы, их строки, продукты с изображениями и тегами загружаются фиксированным числом
+        запросов, независимо от количества заказов и строк. С параметром currentPage (и limit)
+        история возвращается постранично, без него - списком.
 
         Parameters:
         - request (Request): Объект запроса.
@@ -171,10 +269,32 @@ class OrderAPIView(APIView):
         Returns:
         - 200 OK: Успешное получение заказов пользователя.
         """
-        # Получение всех заказов пользователя, привязанных к его корзине
-        orders = Order.objects.filter(id=request.user.basket2.order.id)
-        serializer = OrderSerializer(orders, many=True)
-
+        orders = Order.objects.filter(user=request.user).select_related('basket__user') \
+            .prefetch_related('items2').order_by('-createdAt', '-id')
+
+        paginator = None
+        if OrderHistoryPagination.page_query_param in request.query_params:
+            paginator = OrderHistoryPagination()
+            orders = paginator.paginate_queryset(orders, request, view=self)
+        orders = list(orders)
+
+        # Заказы без строк (оформлены до их появления) показывают содержимое корзины
+        basket_ids = {order.basket_id for order in orders if not order.items2.all()}
+        basket_quantities = get_basket_quantities(basket_ids)
+        product_ids = {item.product_id for order in orders for item in order.items2.all()}
+        for quantities in basket_quantities.values():
+            product_ids.update(quantities)
+        user_ids = {order.user_id for order in orders}
+        profiles = get_profile_snapshots(user_ids)
+        # Пустые корзины и пользователи без профиля тоже передаются, чтобы сериализатор не запрашивал их повторно
+        serializer = OrderSerializer(orders, many=True, context={
+            'basket_quantities': {basket_id: basket_quantities.get(basket_id, {}) for basket_id in basket_ids},
+            'order_products': load_order_products(product_ids),
+            'profiles': {user_id: profiles.get(user_id, {}) for user_id in user_ids},
+        })
+
+        if paginator is not None:
+            return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data)
 
     @transaction.atomic
@@ -200,7 +320,8 @@ class OrderAPIView(APIView):
             return Response({'error': 'User does not have a basket'}, status=status.HTTP_400_BAD_REQUEST)
 
         # Если у пользователя уже есть корзина, просто создаем заказ и привязываем к этой корзине
-        order = Order.objects.create(basket=basket)
+        order = Order.objects.create(basket=basket, user=user)
+        order.create_items()  # Строки заказа и стоимость фиксируются по текущим ценам корзины
         return Response({"orderId": order.id}, status=status.HTTP_201_CREATED)
 
 
@@ -218,7 +339,8 @@ class OrderDetailAPIView(RetrieveAPIView):
     - SessionAuthentication: Аутентификация по сессии.
 
     Attributes:
-    - queryset (QuerySet): Запрос для получения всех объектов заказов.
+    - queryset (QuerySet): Запрос для получения заказа вместе с корзиной и пользователем (для POST - и профилем);
+      доступны только заказы текущего пользователя.
     - serializer_class: Сериализатор для заказов.
 
     Returns:
@@ -227,7 +349,7 @@ class OrderDetailAPIView(RetrieveAPIView):
     """
     permission_classes: List[Any] = [permissions.IsAuthenticated]
     authentication_classes: List[Any] = [SessionAuthentication]
-    queryset: QuerySet = Order.objects.all()
+    queryset: QuerySet = Order.objects.select_related('basket__user')  # Данные покупателя - из снимка профиля
     serializer_class: Any = OrderDetailSerializer
 
     # Маппинг строковых значений на числовые для типа доставки
@@ -246,6 +368,14 @@ class OrderDetailAPIView(RetrieveAPIView):
         'оплачено': 2,
     }
 
+    def get_queryset(self) -> QuerySet:
+        queryset = super().get_queryset().filter(user=self.request.user)  # Чужой заказ - 404
+        if self.request.method == 'POST':
+            queryset = queryset.select_related('basket__user__profile2')  # Профиль изменяется вместе с заказом
+        else:
+            queryset = queryset.prefetch_related('items2')  # Строки нужны продуктам и стоимости заказа
+        return queryset
+
     def post(self, request: Any, *args: Any, **kwargs: Any) -> Response:
         """
         Обновление информации о заказе.
@@ -265,30 +395,45 @@ class OrderDetailAPIView(RetrieveAPIView):
 
         data = request.data  # Данные, полученные из тела POST-запроса
 
-        # Обновление данных заказа, если они присутствуют в запросе
-        if 'fullName' in data:
-            order.basket.user.profile2.fullName = data['fullName']
-        if 'email' in data:
-            order.basket.user.email = data['email']
-        if 'phone' in data:
-            order.basket.user.profile2.phone = data['phone']
+        # Новые значения полей заказа, пользователя и профиля, если они присутствуют в запросе
+        order_values: Dict[str, Any] = {}
         if 'deliveryType' in data:
-            order.deliveryType = self.delivery_type_mapping.get(data['deliveryType'], order.deliveryType)
+            order_values['deliveryType'] = self.delivery_type_mapping.get(data['deliveryType'], order.deliveryType)
         if 'paymentType' in data:
-            order.paymentType = self.payment_type_mapping.get(data['paymentType'], order.paymentType)
-        if 'totalCost' in data:
-            order.totalCost = data['totalCost']
+            order_values['paymentType'] = self.payment_type_mapping.get(data['paymentType'], order.paymentType)
+        # totalCost не принимается от клиента: стоимость рассчитывается по строкам заказа (Order.create_items)
         if 'status' in data:
-            order.status = self.status_mapping.get(data['status'], order.status)
-        if 'city' in data:
-            order.city = data['city']
-        if 'address' in data:
-            order.address = data['address']
-
-        # Сохранение изменений
-        order.save()
-        order.basket.user.profile2.save()
-        order.basket.user.save()
+            order_values['status'] = self.status_mapping.get(data['status'], order.status)
+        for field in ('city', 'address'):
+            if field in data:
+                order_values[field] = data[field]
+        user_values = {'email': data['email']} if 'email' in data else {}
+        profile_values = {field: data[field] for field in ('fullName', 'phone') if field in data}
+
+        # Пользователь и профиль уже загружены вместе с заказом (см. queryset)
+        user = order.basket.user if order.basket else None
+        profile = getattr(user, 'profile2', None) if user else None
+
+        # Сохраняются только изменившиеся поля; неизмененные объекты не записываются
+        with transaction.atomic():
+            # Переход в статус "оплачено" учитывается в количестве покупок ровно один раз: текущий статус
+            # читается с блокировкой строки заказа, чтобы параллельные запросы не учли покупки дважды
+            paid_now = False
+            if order_values.get('status') == Order.STATUS_PAID:
+                current_status = Order.objects.select_for_update().filter(pk=order.pk) \
+                    .values_list('status', flat=True).first()
+                paid_now = current_status != Order.STATUS_PAID
+                order.status = current_status
+            save_changed_fields(order, order_values)
+            if paid_now:
+                order.register_purchases()
+            changed = []
+            if user is not None:
+                changed += save_changed_fields(user, user_values)
+            if profile is not None:
+                changed += save_changed_fields(profile, profile_values)
+        if changed:
+            invalidate_profile_snapshot(user.id)  # Снимок профиля содержит email, fullName и phone
 
         return Response(status=status.HTTP_200_OK)
 
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:35
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_basket_items(apps, schema_editor):
+    # Дубли одного продукта в корзине объединяются в строку с наименьшим id
+    BasketItem = apps.get_model('app_orders', 'BasketItem')
+    duplicates = BasketItem.objects.values('basket_id', 'product_id').annotate(
+        rows=Count('id'), first_id=Min('id'), total=Sum('count')
+    ).filter(rows__gt=1).order_by()
+    for duplicate in duplicates:
+        BasketItem.objects.filter(id=duplicate['first_id']).update(count=duplicate['total'])
+        BasketItem.objects.filter(
+            basket_id=duplicate['basket_id'], product_id=duplicate['product_id']
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='paymentcard',
+            options={'ordering': ['pk'], 'verbose_name': 'Оплата', 'verbose_name_plural': 'Оплаты'},
+        ),
+        migrations.RunPython(merge_duplicate_basket_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='basketitem',
+            constraint=models.UniqueConstraint(fields=('basket', 'product'), name='unique_basket_product'),
+        ),
+    ]
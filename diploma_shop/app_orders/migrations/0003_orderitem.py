@@ -0,0 +1,49 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F, Sum
+
+
+def fill_order_items(apps, schema_editor):
+    # Строки существующих заказов строятся по их корзинам с текущими ценами продуктов
+    Order = apps.get_model('app_orders', 'Order')
+    OrderItem = apps.get_model('app_orders', 'OrderItem')
+    BasketItem = apps.get_model('app_orders', 'BasketItem')
+    for order in Order.objects.filter(basket__isnull=False).iterator():
+        lines = BasketItem.objects.filter(basket_id=order.basket_id).values('product_id').annotate(
+            total_count=Sum('count'), price=F('product__price')
+        ).order_by()
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=line['product_id'], price=line['price'] or 0, count=line['total_count'])
+            for line in lines
+        ])
+        total = OrderItem.objects.filter(order=order).aggregate(total=Sum(F('price') * F('count')))['total']
+        Order.objects.filter(pk=order.pk).update(totalCost=float(total or 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_products', '0006_categoryimages_renditions_productimages_renditions'),
+        ('app_orders', '0002_basketitem_unique_basket_product'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена на момент покупки')),
+                ('count', models.PositiveIntegerField(verbose_name='Количество')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items2', to='app_orders.order', verbose_name='Заказ')),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='product_orderitem2', to='app_products.productinstance', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Строка заказа',
+                'verbose_name_plural': 'Строки заказа',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(fill_order_items, migrations.RunPython.noop),
+    ]
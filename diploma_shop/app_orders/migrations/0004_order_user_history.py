@@ -0,0 +1,41 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import OuterRef, Subquery
+
+
+def fill_order_users(apps, schema_editor):
+    # Покупатель существующих заказов - владелец корзины, одним UPDATE-запросом
+    Order = apps.get_model('app_orders', 'Order')
+    Basket = apps.get_model('app_orders', 'Basket')
+    Order.objects.filter(user__isnull=True, basket__isnull=False).update(
+        user=Subquery(Basket.objects.filter(pk=OuterRef('basket_id')).values('user_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('app_orders', '0003_orderitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='orders2', to=settings.AUTH_USER_MODEL, verbose_name='Покупатель'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='basket',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='orders2', to='app_orders.basket', verbose_name='Корзина'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-createdAt', '-id'], name='order_user_history_idx'),
+        ),
+        migrations.RunPython(fill_order_users, migrations.RunPython.noop),
+    ]
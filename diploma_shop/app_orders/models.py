@@ -1,9 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.functions import Coalesce
 from typing import Any, List, Dict, Union
 from PIL import Image
 from django.db.models import Sum, F, Count, Model, OneToOneField, ManyToManyField, FloatField, ForeignKey, \
-    PositiveIntegerField, IntegerField, DateTimeField, CharField
+    PositiveIntegerField, IntegerField, DateTimeField, CharField, OuterRef, Subquery
 
 User = get_user_model()
 
@@ -65,6 +66,10 @@ class BasketItem(models.Model):
         verbose_name = 'Продукт в корзине'
         verbose_name_plural = 'Продукты в корзине'
         ordering = ['id']
+        constraints = [
+            # Одна строка на продукт в корзине: на нее опирается INSERT ... ON CONFLICT в add_to_basket
+            models.UniqueConstraint(fields=('basket', 'product'), name='unique_basket_product'),
+        ]
 
 
 class Order(models.Model):
@@ -83,6 +88,7 @@ class Order(models.Model):
         (1, 'ожидание платежа'),
         (2, 'оплачено'),
     )
+    STATUS_PAID = 2
     createdAt = models.DateTimeField(auto_now_add=True, verbose_name="Дата и время формирования заказа")
     deliveryType = models.IntegerField(
         null=True,
@@ -105,29 +111,113 @@ class Order(models.Model):
     )
     city = models.CharField(max_length=100, default='yyy')
     address = models.CharField(max_length=100, default='xxx')
-    basket = models.OneToOneField(
+    # Корзина, из которой оформлен заказ; пользователь оформляет из одной корзины несколько заказов
+    basket = models.ForeignKey(
         'Basket',
         on_delete=models.CASCADE,
         blank=True,
         null=True,
+        related_name='orders2',
         verbose_name='Корзина'
     )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='orders2',
+        verbose_name='Покупатель'
+    )
 
     def __str__(self):
         # return f'{self.basket.user.username}'
         return self.address
 
     def calculate_total_cost(self) -> float:
-        total_cost = 0
-        basket_items = self.basket.items2.all()  # Получаем все элементы в корзине
-        for basket_item in basket_items:
-            total_cost += basket_item.product.price * basket_item.count  # Суммируем стоимость каждого продукта в корзине
-        return total_cost
+        """
+        Стоимость заказа одним запросом SUM(price * count): по строкам заказа с ценами на момент покупки,
+        а для заказа без строк - по корзине с текущими ценами продуктов.
+        """
+        total = self.items2.aggregate(total=Sum(F('price') * F('count')))['total']
+        if total is None:  # Заказ без строк (создан до их появления или вне API)
+            total = BasketItem.objects.filter(basket_id=self.basket_id).aggregate(
+                total=Sum(F('product__price') * F('count'))
+            )['total']
+        return float(total or 0)
+
+    def create_items(self) -> float:
+        """
+        Сохраняет строки заказа из корзины с ценами продуктов на момент покупки и записывает
+        стоимость заказа, посчитанную в том же агрегатном запросе.
+
+        Returns:
+        - float: Стоимость заказа.
+        """
+        lines = BasketItem.objects.filter(basket_id=self.basket_id).values('product_id').annotate(
+            total_count=Sum('count'), price=F('product__price'), cost=Sum(F('count') * F('product__price'))
+        ).order_by()
+        OrderItem.objects.bulk_create([
+            OrderItem(order=self, product_id=line['product_id'], price=line['price'] or 0, count=line['total_count'])
+            for line in lines
+        ])
+        # Стоимость строк посчитана тем же запросом, что и сами строки
+        self.totalCost = float(sum(line['cost'] or 0 for line in lines))
+        Order.objects.filter(pk=self.pk).update(totalCost=self.totalCost)
+        return self.totalCost
+
+    def register_purchases(self) -> int:
+        """
+        Увеличивает количество покупок (number_of_purchases) продуктов заказа на их количество
+        в строках заказа одним UPDATE-запросом. Вызывается при переходе заказа в статус "оплачено".
+
+        Returns:
+        - int: Количество обновленных продуктов.
+        """
+        counts = OrderItem.objects.filter(order_id=self.pk, product_id=OuterRef('pk')).order_by() \
+            .values('product_id').annotate(total=Sum('count')).values('total')
+        product_model = OrderItem._meta.get_field('product').related_model
+        return product_model.objects.filter(id__in=self.items2.values('product_id')).update(
+            number_of_purchases=Coalesce(F('number_of_purchases'), 0) + Subquery(counts)
+        )
 
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
         ordering = ['pk']
+        indexes = [
+            # История заказов пользователя выбирается от новых к старым
+            models.Index(fields=('user', '-createdAt', '-id'), name='order_user_history_idx'),
+        ]
+
+
+class OrderItem(models.Model):
+    """
+    Строка заказа: продукт, количество и цена на момент оформления заказа.
+    Строки создаются один раз в Order.create_items и не пересчитываются по текущим ценам.
+    """
+    order = models.ForeignKey(
+        'Order',
+        on_delete=models.CASCADE,
+        related_name='items2',
+        verbose_name='Заказ'
+    )
+    product = models.ForeignKey(
+        'app_products.ProductInstance',
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='product_orderitem2',
+        verbose_name='Товар'
+    )
+    price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Цена на момент покупки')
+    count = models.PositiveIntegerField(verbose_name='Количество')
+
+    def __str__(self) -> str:
+        return f'{self.product} ({self.count} шт. по {self.price})'
+
+    class Meta:
+        verbose_name = 'Строка заказа'
+        verbose_name_plural = 'Строки заказа'
+        ordering = ['id']
 
 
 class PaymentCard(models.Model):
@@ -1,11 +1,17 @@
-from typing import List, Dict, Any
+from decimal import Decimal
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
 from rest_framework import serializers
 from . import models
 from .models import User, BasketItem, Basket, Order, PaymentCard
 from app_products.models import ProductInstance
-from app_products.serializers import TagSerializer, ProductImageSerializer
+from app_products.serializers import TagSerializer, ProductImageSerializer, FlatListSerializer, FlatProductListMixin
+from app_users.service import get_profile_snapshots
+from .service import get_basket_quantities
 # from typing import Type
 
+# Представление цены строки заказа в том же формате, что и цена продукта
+PRICE_FIELD = serializers.DecimalField(max_digits=10, decimal_places=2)
+
 
 class UserSerializer(serializers.ModelSerializer):
     """
@@ -18,7 +24,7 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class BasketItemSerializer(serializers.ModelSerializer):
-    count = serializers.IntegerField()
+    count = serializers.IntegerField(min_value=1)  # Количество изменяется в БД выражением count +/- значение
     id = serializers.IntegerField()
 
     class Meta:
@@ -29,12 +35,25 @@ class BasketItemSerializer(serializers.ModelSerializer):
         )
 
 
-class BasketProductSerializer(serializers.ModelSerializer):
+class BasketDeltaSerializer(serializers.Serializer):
+    """
+    Изменение количества продукта для BasketBulkView: count > 0 - добавление, count < 0 - удаление
+    """
+    id = serializers.IntegerField()
+    count = serializers.IntegerField()
+
+    def validate_count(self, value: int) -> int:
+        if value == 0:
+            raise serializers.ValidationError('Count must not be zero.')
+        return value
+
+
+class BasketProductSerializer(FlatProductListMixin, serializers.ModelSerializer):
     """
-    Данные продукта из корзины
+    Данные продукта из корзины; список сериализуется FlatListSerializer из строк .values(*flat_fields)
     """
     tags = TagSerializer(many=True, read_only=True)
-    images = ProductImageSerializer(source='images2', many=True, read_only=True)
+    images = ProductImageSerializer(source='images2', many=True, read_only=True, rendition='card')
     reviews = serializers.IntegerField(source='reviews_count', read_only=True)
     rating = serializers.FloatField(source='average_rating', read_only=True)
     date = serializers.DateTimeField(format='%a %b %d %Y %H:%M:%S GMT%z (%Z)')
@@ -56,23 +75,38 @@ class BasketProductSerializer(serializers.ModelSerializer):
             'reviews',
             'rating',
         )
+        list_serializer_class = FlatListSerializer
+
+    def get_quantities(self) -> Optional[Dict[int, int]]:
+        """
+        Количества продуктов в корзине: словарь quantities {id продукта: количество} из контекста.
+        Если передан только пользователь, словарь строится одним запросом для всей корзины
+        и сохраняется в контексте, чтобы не выполнять запрос для каждого продукта.
+        """
+        quantities = self.context.get('quantities')  # Количества продуктов в корзине из контекста
+        user = self.context.get('user')  # Получаем пользователя из контекста
+        if quantities is None and user:
+            basket = Basket.objects.get(user=user)  # Получаем корзину пользователя
+            quantities = get_basket_quantities([basket.id]).get(basket.id, {})
+            self.context['quantities'] = quantities  # Контекст общий для всех элементов списка
+        return quantities
+
     # Переопределяем формат данных, которые будут возвращены в ответе API:
     def to_representation(self, instance: ProductInstance) -> Dict[str, Any]:
         """
-        Если пользователь передан в контекст, ищем объект корзины для этого пользователя
-        и подсчитываем общее количество данного продукта в корзине.
-        Затем это общее количество добавляем в представление продукта в поле count:
+        Добавляем количество данного продукта в корзине в представление продукта в поле count.
         """
         representation: Dict[str, Any] = super().to_representation(instance)  # Получаем базовое представление продукта
+        quantities = self.get_quantities()
+        if quantities is not None:
+            representation['count'] = quantities.get(instance.id, 0)  # Количество данного продукта в корзине
+        return representation
 
-        user = self.context.get('user')  # Получаем пользователя из контекста
-        if user:
-            basket = Basket.objects.get(user=user)  # Получаем корзину пользователя
-            basket_items = BasketItem.objects.filter(product=instance, basket=basket)  # Получаем продукты в корзине
-            # Получаем общее количества продукта в корзине с использованием. Если количество не определено, то 0.
-            total_count = basket_items.aggregate(total_count=models.Sum('count'))['total_count'] or 0
-            representation['count'] = total_count  # Добавляем количество данного продукта в корзине
-
+    def to_flat_representation(self, row: Dict[str, Any], related: Dict[str, Any]) -> Dict[str, Any]:
+        representation = super().to_flat_representation(row, related)
+        quantities = self.get_quantities()
+        if quantities is not None:
+            representation['count'] = quantities.get(row['id'], 0)
         return representation
 
 
@@ -98,13 +132,155 @@ class DeleteBasketItemSerializer(serializers.Serializer):
     count = serializers.IntegerField()
 
 
-class OrderSerializer(serializers.ModelSerializer):
+def get_order_lines(
+        order: Order,
+        basket_quantities: Callable[[], Dict[int, int]],
+) -> Tuple[Dict[int, int], Dict[int, Any]]:
+    """
+    Количества и цены продуктов заказа из строк заказа (цены на момент покупки).
+    Для заказа без строк количества берутся из корзины, а цены - текущие.
+
+    Parameters:
+    - order (Order): Заказ; строки заказа могут быть заранее загружены prefetch_related('items2').
+    - basket_quantities (Callable[[], Dict[int, int]]): Количества продуктов в корзине заказа.
+
+    Returns:
+    - Tuple[Dict[int, int], Dict[int, Any]]: Количества {id продукта: количество} и цены {id продукта: цена}.
+    """
+    quantities: Dict[int, int] = {}
+    prices: Dict[int, Any] = {}
+    for item in order.items2.all():
+        if item.product_id is not None:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.count
+            prices[item.product_id] = item.price
+    if not quantities:
+        quantities = basket_quantities()
+    return quantities, prices
+
+
+def load_order_products(product_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Сериализует продукты заказов один раз для всех заказов: продукты, изображения и теги загружаются
+    фиксированным числом запросов, независимо от количества заказов и строк.
+
+    Parameters:
+    - product_ids (Iterable[int]): Идентификаторы продуктов.
+
+    Returns:
+    - Dict[int, Dict[str, Any]]: Словарь {id продукта: представление продукта}.
+    """
+    products = ProductInstance.objects.filter(id__in=list(product_ids)).values(*BasketProductSerializer.flat_fields)
+    # Пустой словарь quantities: количество подставляется для каждого заказа отдельно
+    serializer = BasketProductSerializer(products, many=True, context={'quantities': {}})
+    return {product['id']: product for product in serializer.data}
+
+
+def serialize_order_products(
+        order: Order,
+        basket_quantities: Callable[[], Dict[int, int]],
+        products: Optional[Dict[int, Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Продукты заказа с количеством и ценой из строк заказа (см. get_order_lines).
+
+    Parameters:
+    - order (Order): Заказ.
+    - basket_quantities (Callable[[], Dict[int, int]]): Количества продуктов в корзине заказа.
+    - products (Optional[Dict[int, Dict[str, Any]]]): Продукты, заранее загруженные load_order_products
+      для нескольких заказов; если не переданы - загружаются для этого заказа.
+
+    Returns:
+    - List[Dict[str, Any]]: Сериализованные продукты заказа.
+    """
+    quantities, prices = get_order_lines(order, basket_quantities)
+    if products is None:
+        products = load_order_products(quantities)
+    product_data = []
+    for product_id, count in quantities.items():
+        if product_id not in products:  # Продукт удален из каталога
+            continue
+        product = dict(products[product_id], count=count)
+        if product_id in prices:
+            product['price'] = PRICE_FIELD.to_representation(prices[product_id])
+        product_data.append(product)
+    return product_data
+
+
+class OrderProductsMixin:
+    """
+    Продукты (products) и стоимость (totalCost) заказа. Представление может заранее передать в контекст
+    basket_quantities и order_products для всех заказов сразу; иначе они загружаются для заказа и
+    сохраняются в контексте, чтобы продукты и стоимость заказа строились по одним данным.
+    """
+
+    def get_basket_quantities(self, obj) -> Dict[int, int]:
+        basket_quantities = self.context.setdefault('basket_quantities', {})
+        if obj.basket_id not in basket_quantities:
+            basket_quantities.update(get_basket_quantities([obj.basket_id]))
+            basket_quantities.setdefault(obj.basket_id, {})  # Пустая корзина: повторно не запрашиваем
+        return basket_quantities[obj.basket_id]
+
+    def get_order_products(self, quantities: Dict[int, int]) -> Dict[int, Dict[str, Any]]:
+        products = self.context.setdefault('order_products', {})
+        missing = [product_id for product_id in quantities if product_id not in products]
+        if missing:
+            products.update(load_order_products(missing))
+        return products
+
+    def get_products(self, obj) -> List[Dict[str, Any]]:
+        quantities, _ = get_order_lines(obj, lambda: self.get_basket_quantities(obj))
+        return serialize_order_products(obj, lambda: quantities, self.get_order_products(quantities))
+
+    def get_totalCost(self, obj) -> float:
+        """
+        Стоимость, сохраненная при оформлении (Order.create_items), а для заказа без строк (созданного
+        в админке или вне API) - по корзине с текущими ценами, как и его продукты (см. Order.calculate_total_cost).
+        Цены берутся из уже загруженных продуктов заказа, без отдельного запроса.
+        """
+        if obj.items2.all():
+            return obj.totalCost
+        quantities = self.get_basket_quantities(obj)
+        products = self.get_order_products(quantities)
+        return float(sum(
+            (Decimal(products[product_id]['price']) * count for product_id, count in quantities.items()
+             if product_id in products and products[product_id]['price'] is not None),
+            Decimal(0),
+        ))
+
+
+class OrderContactsMixin:
+    """
+    Данные покупателя заказа (fullName, email, phone) из снимка профиля в кэше (get_profile_snapshots).
+    Представление может заранее передать в контекст profiles снимки для всех заказов сразу; иначе
+    снимок загружается для заказа один раз и сохраняется в контексте ({} - пользователь без профиля).
+    """
+
+    def get_profile(self, obj) -> Dict[str, Any]:
+        profiles = self.context.setdefault('profiles', {})
+        if obj.user_id not in profiles:
+            profiles[obj.user_id] = get_profile_snapshots([obj.user_id]).get(obj.user_id, {})
+        return profiles[obj.user_id] or {}
+
+    def get_fullName(self, obj) -> Optional[str]:
+        return self.get_profile(obj).get('fullName')
+
+    def get_email(self, obj) -> Optional[str]:
+        profile = self.get_profile(obj)
+        if profile:
+            return profile['email']
+        return obj.basket.user.email if obj.basket_id and obj.basket.user_id else None  # Пользователь без профиля
+
+    def get_phone(self, obj) -> Optional[str]:
+        return self.get_profile(obj).get('phone')
+
+
+class OrderSerializer(OrderContactsMixin, OrderProductsMixin, serializers.ModelSerializer):
     """
     Заказ
     """
-    fullName = serializers.CharField(source='basket.user.profile.fullName', read_only=True)
-    email = serializers.EmailField(source='basket.user.email', read_only=True)
-    phone = serializers.CharField(source='basket.user.profile.phone', read_only=True)
+    fullName = serializers.SerializerMethodField()  # Данные покупателя - из снимка профиля (OrderContactsMixin)
+    email = serializers.SerializerMethodField()
+    phone = serializers.SerializerMethodField()
     products = serializers.SerializerMethodField(source='products2')
     totalCost = serializers.SerializerMethodField()
     createdAt = serializers.DateTimeField(format='%Y-%m-%d %H:%M', read_only=True)
@@ -124,32 +300,6 @@ class OrderSerializer(serializers.ModelSerializer):
         status = obj.get_status_display()
         return status
 
-    def get_totalCost(self, obj) -> float:
-        return obj.calculate_total_cost()
-
-    def get_products(self, obj) -> List[Dict[str, Any]]:
-
-        products = obj.basket.products.all()  # Получаем все продукты в этом заказе
-        product_ids = [product.id for product in products]  # Получаем их ID
-        annotated_products = ProductInstance.objects.filter_and_annotate(product_ids)  # Аннотируем их
-        annotated_products_dict = {
-            product.id: {'reviews': product.reviews_count, 'rating': product.average_rating}
-            for product in annotated_products
-        }  #  Создаем словарь, где ключ - ID продукта, значение - словарь с аннотациями продукта
-        product_data = []  # Пустой список, в который будут добавляться данные о продуктах
-        added_products = {}  # Словарь, чтобы проверять, добавлен ли уже продукт в список
-        for product in products:
-            # Если ID продукта уже есть в словаре добавленных, продолжаем со следующим продуктом:
-            if product.id in added_products:
-                continue
-            product_serialized = BasketProductSerializer(product).data  # Сериализуем каждый продукт
-            # Обновляем данные сериализованного продукта, добавляя аннотации (если они есть):
-            product_serialized.update(annotated_products_dict.get(product.id, {'reviews': 0, 'rating': 0}))
-            # Добавляем сериализованный продукт в список product_data:
-            product_data.append(product_serialized)
-            added_products[product.id] = True  # Отмечаем, что продукт был добавлен в список
-        return product_data
-
     class Meta:
         model = Order
         fields = (
@@ -168,10 +318,10 @@ class OrderSerializer(serializers.ModelSerializer):
         )
 
 
-class OrderDetailSerializer(serializers.ModelSerializer):
-    fullName = serializers.CharField(source='basket.user.profile.fullName', read_only=True)
-    email = serializers.EmailField(source='basket.user.email', read_only=True)
-    phone = serializers.CharField(source='basket.user.profile.phone', read_only=True)
+class OrderDetailSerializer(OrderContactsMixin, OrderProductsMixin, serializers.ModelSerializer):
+    fullName = serializers.SerializerMethodField()  # Данные покупателя - из снимка профиля (OrderContactsMixin)
+    email = serializers.SerializerMethodField()
+    phone = serializers.SerializerMethodField()
     products = serializers.SerializerMethodField()
     totalCost = serializers.SerializerMethodField()
     createdAt = serializers.DateTimeField(format='%a %b %d %Y %H:%M:%S GMT%z (%Z)', read_only=True)
@@ -191,33 +341,6 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         status = obj.get_status_display()
         return status
 
-    def get_products(self, obj) -> List[Dict[str, Any]]:
-
-        products = obj.basket.products.all()  # Получаем все продукты в этом заказе
-        product_ids = [product.id for product in products]  # Получаем их ID
-        annotated_products = ProductInstance.objects.filter_and_annotate(product_ids)  # Аннотируем их
-        annotated_products_dict = {
-            product.id: {'reviews': product.reviews_count, 'rating': product.average_rating}
-            for product in annotated_products
-        }
-        product_data = []  # Пустой список, в который будут добавляться данные о продуктах
-        added_products = {}  # Создаем словарь, чтобы проверять, добавлен ли уже продукт в список
-        for product in products:
-            # Если продукт уже добавлен, пропускаем его
-            if product.id in added_products:
-                continue
-            product_serialized = BasketProductSerializer(product).data  # Сериализуем каждый продукт
-            # Обновляем данные сериализованного продукта, добавляя аннотации (если они есть):
-            product_serialized.update(annotated_products_dict.get(product.id, {'reviews': 0, 'rating': 0}))
-            # Добавляем сериализованный продукт в список product_data:
-            product_data.append(product_serialized)
-            added_products[product.id] = True  # Отмечаем, что продукт был добавлен в список
-
-        return product_data
-
-    def get_totalCost(self, obj) -> float:
-        return obj.calculate_total_cost()
-
     class Meta:
         model = Order
         fields = (
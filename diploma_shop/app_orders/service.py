@@ -1,56 +1,264 @@
-import json
-from rest_framework.parsers import JSONParser
-from rest_framework.exceptions import ParseError
-from typing import List, Union, Any, Dict
+from django.db import connection, models, transaction, IntegrityError
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from typing import List, Any, Dict, Iterable
 
+from .models import Basket, BasketItem
+from app_products.models import ProductInstance
 
-class PlainListJSONParser(JSONParser):
+
+class OrderHistoryPagination(PageNumberPagination):
+    """
+    Пагинация истории заказов. Включается параметром currentPage, без него история
+    возвращается списком, как ожидает страница истории заказов.
+
+    Attributes:
+    - page_size (int): Базовый размер страницы.
+    - page_query_param (str): Параметр запроса для указания текущей страницы.
+    - page_size_query_param (str): Параметр запроса для указания размера страницы.
+    - max_page_size (int): Максимальный размер страницы.
     """
-    Анализирует входные данные, сериализованные в формате JSON, в список примитивов Python.
-    Это позволяет в POST-запросе отправлять данные в формате массива.
+    page_size: int = 10
+    page_query_param: str = 'currentPage'
+    page_size_query_param: str = 'limit'
+    max_page_size: int = 50
 
-    Media Type:
-    - application/json: Медиа-тип определен как 'application/json'.
+    def get_paginated_response(self, data: List[Dict[str, Any]]) -> Response:
+        return Response({
+            'items': data,  # Заказы текущей страницы
+            'currentPage': self.page.number,  # Номер текущей страницы
+            'lastPage': self.page.paginator.num_pages,  # Номер последней страницы
+        })
 
-    Methods:
-    - parse: Метод для анализа входных данных JSON в список Python.
+
+def save_changed_fields(instance: models.Model, values: Dict[str, Any]) -> List[str]:
+    """
+    Присваивает объекту новые значения полей и сохраняет только изменившиеся поля.
+    Если ни одно поле не изменилось, запрос к БД не выполняется.
 
     Parameters:
-    - stream (Any): Поток данных для анализа.
-    - media_type (Union[None, str]): Медиа-тип данных.
-    - parser_context (Union[None, Dict[str, Any]]): Контекст анализатора.
+    - instance (models.Model): Сохраняемый объект.
+    - values (Dict[str, Any]): Новые значения {имя поля: значение}.
 
     Returns:
-    - List[Any]: Преобразованный список данных из JSON в формате Python.
+    - List[str]: Имена сохраненных полей.
+    """
+    changed = [field for field, value in values.items() if getattr(instance, field) != value]
+    for field in changed:
+        setattr(instance, field, values[field])
+    if changed:
+        instance.save(update_fields=changed)
+    return changed
+
+
+def get_basket_quantities(basket_ids: Iterable[int]) -> Dict[int, Dict[int, int]]:
+    """
+    Количество каждого продукта в корзинах, полученное одним сгруппированным запросом.
+
+    Parameters:
+    - basket_ids (Iterable[int]): Идентификаторы корзин.
+
+    Returns:
+    - Dict[int, Dict[int, int]]: Словарь {id корзины: {id продукта: количество}}.
+    """
+    quantities: Dict[int, Dict[int, int]] = {}
+    rows = BasketItem.objects.filter(
+        basket_id__in=list(basket_ids)
+    ).values('basket_id', 'product_id').annotate(total=Sum('count')).order_by()
+    for row in rows:
+        quantities.setdefault(row['basket_id'], {})[row['product_id']] = row['total']
+    return quantities
+
+
+def add_to_basket(basket_id: int, product_id: int, count: int) -> bool:
+    """
+    Добавляет продукт в корзину (см. add_many_to_basket).
+
+    Parameters:
+    - basket_id (int): Идентификатор корзины.
+    - product_id (int): Идентификатор продукта.
+    - count (int): Добавляемое количество.
+
+    Returns:
+    - bool: False, если продукт не найден.
+    """
+    return add_many_to_basket(basket_id, {product_id: count}) > 0
+
+
+def add_many_to_basket(basket_id: int, counts: Dict[int, int]) -> int:
+    """
+    Добавляет продукты в корзину одним запросом INSERT ... ON CONFLICT DO UPDATE: количество
+    увеличивается на стороне БД, поэтому одновременные добавления не теряются. Существование
+    продуктов проверяется тем же запросом.
+
+    Parameters:
+    - basket_id (int): Идентификатор корзины.
+    - counts (Dict[int, int]): Добавляемые количества {id продукта: количество}.
+
+    Returns:
+    - int: Количество найденных и добавленных продуктов.
+    """
+    if not counts:
+        return 0
+    if connection.vendor not in ('postgresql', 'sqlite'):  # СУБД без INSERT ... ON CONFLICT
+        return sum(_add_to_basket_fallback(basket_id, product_id, count) for product_id, count in counts.items())
+
+    item_table = connection.ops.quote_name(BasketItem._meta.db_table)
+    product_table = connection.ops.quote_name(ProductInstance._meta.db_table)
+    cases = ' '.join(['WHEN %s THEN %s'] * len(counts))
+    placeholders = ', '.join(['%s'] * len(counts))
+    params: List[Any] = [basket_id]
+    for product_id, count in counts.items():
+        params += [product_id, count]
+    params += list(counts)
+    with connection.cursor() as cursor:
+        # Уникальное ограничение unique_basket_product обеспечивает одну строку на продукт в корзине
+        cursor.execute(
+            f'INSERT INTO {item_table} (basket_id, product_id, count) '
+            f'SELECT %s, id, CASE id {cases} END FROM {product_table} WHERE id IN ({placeholders}) '
+            f'ON CONFLICT (basket_id, product_id) DO UPDATE SET count = {item_table}.count + excluded.count',
+            params
+        )
+        return cursor.rowcount
+
+
+def _add_to_basket_fallback(basket_id: int, product_id: int, count: int) -> bool:
+    if not ProductInstance.objects.filter(id=product_id).exists():
+        return False
+    items = BasketItem.objects.filter(basket_id=basket_id, product_id=product_id)
+    if items.update(count=F('count') + count):
+        return True
+    try:
+        with transaction.atomic():  # Строку мог создать параллельный запрос
+            BasketItem.objects.create(basket_id=basket_id, product_id=product_id, count=count)
+    except IntegrityError:
+        items.update(count=F('count') + count)
+    return True
+
+
+def remove_many_from_basket(basket_id: int, counts: Dict[int, int]) -> None:
+    """
+    Уменьшает количества продуктов в корзине двумя запросами: DELETE строк, в которых останется
+    не больше нуля, и UPDATE остальных. Продукты, которых нет в корзине, пропускаются.
+
+    Parameters:
+    - basket_id (int): Идентификатор корзины.
+    - counts (Dict[int, int]): Удаляемые количества {id продукта: количество}.
+    """
+    if not counts:
+        return
+    removed = Case(
+        *[When(product_id=product_id, then=Value(count)) for product_id, count in counts.items()],
+        output_field=IntegerField(),
+    )
+    items = BasketItem.objects.filter(basket_id=basket_id, product_id__in=list(counts))
+    with transaction.atomic():
+        # Сначала удаление: уменьшение ниже нуля нарушило бы CHECK-ограничение поля count
+        items.alias(removed=removed).filter(count__lte=F('removed')).delete()
+        items.update(count=F('count') - removed)
+
+
+def remove_from_basket(user_id: int, product_id: int, count: int) -> bool:
+    """
+    Уменьшает количество продукта в корзине пользователя условным UPDATE или удаляет его
+    условным DELETE, без чтения строки и изменения количества в Python.
+
+    Parameters:
+    - user_id (int): Идентификатор пользователя.
+    - product_id (int): Идентификатор продукта.
+    - count (int): Удаляемое количество.
+
+    Returns:
+    - bool: False, если продукта нет в корзине.
 
     Raises:
-    - ParseError: Исключение в случае ошибки при разборе JSON.
+    - ValueError: В корзине меньше продукта, чем требуется удалить.
+    """
+    items = BasketItem.objects.filter(basket__user_id=user_id, product_id=product_id)
+    with transaction.atomic():
+        if items.filter(count__gt=count).update(count=F('count') - count):
+            return True
+        if items.filter(count=count).delete()[0]:
+            return True
+        if items.exists():
+            raise ValueError("The basket contains fewer items than you're trying to remove")
+    return False
+
+
+class SessionBasket:
     """
+    Корзина анонимного пользователя, хранящаяся в сессии в виде {id продукта: количество}.
+    Изменения не пишут строки Basket/BasketItem - они создаются один раз при входе или регистрации
+    (merge_into). Сессия читается из кэша (app_users.sessions.SessionStore) и записывается в БД
+    только при изменении, поэтому корзина не теряется при очистке кэша и продлевается вместе с сессией.
 
-    media_type: str = 'application/json'  # Определение медиа-типа
+    Attributes:
+    - session_key (str): Ключ корзины в сессии.
+    """
+    session_key = 'basket'
+
+    def __init__(self, session: Any) -> None:
+        self.session = session
 
-    def parse(self, stream: Any, media_type: Union[None, str] = None,
-              parser_context: Union[None, Dict[str, Any]] = None) -> List[Any]:
+    @property
+    def items(self) -> Dict[int, int]:
+        """
+        Returns:
+        - Dict[int, int]: Содержимое корзины {id продукта: количество}.
         """
-        Анализирует входные данные в формате JSON и преобразует их в список примитивов Python.
+        # Сессия сериализуется в JSON, поэтому ключи хранятся строками
+        return {int(product_id): count for product_id, count in self.session.get(self.session_key, {}).items()}
 
-        Parameters:
-        - stream (Any): Поток данных для анализа.
-        - media_type (Union[None, str]): Медиа-тип данных.
-        - parser_context (Union[None, Dict[str, Any]]): Контекст анализатора.
+    def save(self, items: Dict[int, int]) -> None:
+        self.session[self.session_key] = {str(product_id): count for product_id, count in items.items() if count > 0}
+
+    def add(self, product_id: int, count: int) -> None:
+        self.apply({product_id: count})
+
+    def remove(self, product_id: int, count: int) -> bool:
+        """
+        Уменьшает количество продукта или удаляет его, как remove_from_basket.
 
         Returns:
-        - List[Any]: Преобразованный список данных из JSON в формате Python.
+        - bool: False, если продукта нет в корзине.
 
         Raises:
-        - ParseError: Исключение в случае ошибки при разборе JSON.
+        - ValueError: В корзине меньше продукта, чем требуется удалить.
         """
-        parser_context = parser_context or {}  # Установка контекста анализатора
-        encoding = parser_context.get('encoding',
-                                      'utf-8')  # Получение кодировки из контекста или установка значения по умолчанию
+        current = self.items.get(product_id)
+        if current is None:
+            return False
+        if current < count:
+            raise ValueError("The basket contains fewer items than you're trying to remove")
+        self.apply({product_id: -count})
+        return True
 
-        try:
-            data = stream.read().decode(encoding)  # Чтение и декодирование данных
-            return json.loads(data)  # Конвертация декодированных данных из JSON в Python список
-        except ValueError as exc:
-            raise ParseError('JSON parse error - %s' % str(exc))  # Возбуждение исключения в случае ошибки анализа
+    def apply(self, deltas: Dict[int, int]) -> None:
+        """
+        Применяет изменения количества {id продукта: изменение}; продукты с количеством
+        не больше нуля удаляются.
+        """
+        items = self.items
+        for product_id, delta in deltas.items():
+            items[product_id] = items.get(product_id, 0) + delta
+        self.save(items)
+
+    def clear(self) -> None:
+        self.session.pop(self.session_key, None)
+
+    def merge_into(self, user: Any) -> None:
+        """
+        Переносит корзину из сессии в Basket пользователя одним INSERT ... ON CONFLICT
+        (количества складываются с уже сохраненными) и очищает корзину сессии.
+
+        Parameters:
+        - user (User): Пользователь, вошедший в систему.
+        """
+        items = self.items
+        if not items:
+            return
+        with transaction.atomic():
+            basket, created = Basket.objects.get_or_create(user=user)
+            add_many_to_basket(basket.id, items)  # Удаленные из каталога продукты пропускаются
+        self.clear()
@@ -1,3 +1,411 @@
-from django.test import TestCase
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 
-# Create your tests here.
+from app_products.models import ProductInstance, User
+from app_products.service import refresh_popular_products
+from app_products.tests import PerformanceBudgetTestCase
+from app_users.models import Profile
+from diploma_shop.json_api import PlainListJSONParser, StreamingJSONParser, FastJSONRenderer
+
+from .models import Basket, BasketItem, Order
+
+
+class OrdersPerformanceTest(PerformanceBudgetTestCase):
+    """
+    Бюджеты эндпоинтов app_orders
+    """
+
+    def setUp(self) -> None:
+        self.client.force_login(self.user)
+        self.basket = Basket.objects.create(user=self.user)
+        self.products = list(ProductInstance.objects.order_by('id')[:10])
+        BasketItem.objects.bulk_create([
+            BasketItem(basket=self.basket, product=product, count=2) for product in self.products
+        ])
+
+    def test_basket_get(self) -> None:
+        self.measure('basket_get', 'get', reverse('basket'))
+
+    def test_basket_post(self) -> None:
+        self.measure('basket_post', 'post', reverse('basket'),
+                     data={'id': self.products[0].id, 'count': 1}, content_type='application/json')
+
+    def test_basket_delete(self) -> None:
+        self.measure('basket_delete', 'delete', reverse('basket'),
+                     data={'id': self.products[0].id, 'count': 1}, content_type='application/json')
+
+    def test_basket_bulk(self) -> None:
+        data = [{'id': product.id, 'count': 1} for product in self.products[:5]]
+        data += [{'id': product.id, 'count': -1} for product in self.products[5:]]
+        self.measure('basket_bulk', 'post', reverse('basket-bulk'), data=data, content_type='application/json')
+
+    def test_orders_get(self) -> None:
+        Order.objects.create(basket=self.basket, user=self.user)
+        self.measure('orders_get', 'get', reverse('order-list'))
+
+    def test_orders_post(self) -> None:
+        data = [{'id': product.id, 'count': 2} for product in self.products]
+        self.measure('orders_post', 'post', reverse('order-list'), data=data, content_type='application/json')
+
+    def test_order_detail_get(self) -> None:
+        order = Order.objects.create(basket=self.basket, user=self.user)
+        self.measure('order_detail_get', 'get', reverse('order-detail', kwargs={'pk': order.id}))
+
+    def test_order_detail_post(self) -> None:
+        order = Order.objects.create(basket=self.basket, user=self.user)
+        self.measure('order_detail_post', 'post', reverse('order-detail', kwargs={'pk': order.id}), data={
+            'city': 'Москва', 'address': 'Красная площадь, 1', 'deliveryType': 'Доставка',
+            'paymentType': 'Онлайн картой', 'status': 'оплачено',
+        }, content_type='application/json')
+
+    def test_payment(self) -> None:
+        self.measure('payment', 'post', reverse('payment'), data={
+            'number': '12345678', 'name': 'Иван Иванов', 'month': '02', 'year': '2030', 'code': '123',
+        })
+
+
+class BasketMutationTest(TestCase):
+    """
+    Добавление и удаление продуктов корзины условными запросами на стороне БД
+    """
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='buyer', password='password')
+        self.client.force_login(self.user)
+        self.product = ProductInstance.objects.create(title='Продукт', slug='product', price=100)
+
+    def post(self, count: int, product_id: int = None) -> HttpResponse:
+        return self.client.post(reverse('basket'), data={'id': product_id or self.product.id, 'count': count},
+                                content_type='application/json')
+
+    def delete(self, count: int) -> HttpResponse:
+        return self.client.delete(reverse('basket'), data={'id': self.product.id, 'count': count},
+                                  content_type='application/json')
+
+    def basket_counts(self) -> list:
+        return list(BasketItem.objects.filter(basket__user=self.user).values_list('count', flat=True))
+
+    def test_add_accumulates_in_one_row(self) -> None:
+        self.assertEqual(self.post(2).json()[0]['count'], 2)
+        self.assertEqual(self.post(3).json()[0]['count'], 5)
+        self.assertEqual(self.basket_counts(), [5])
+        self.assertEqual(self.post(1, product_id=self.product.id + 100).status_code, 404)
+        self.assertEqual(self.post(0).status_code, 400)
+
+    def test_remove(self) -> None:
+        self.post(3)
+        self.assertEqual(self.delete(5).status_code, 400)
+        self.assertEqual(self.delete(1).status_code, 204)
+        self.assertEqual(self.basket_counts(), [2])
+        self.assertEqual(self.delete(2).status_code, 204)
+        self.assertEqual(self.basket_counts(), [])
+        self.assertEqual(self.delete(1).status_code, 404)
+
+    def test_bulk(self) -> None:
+        other = ProductInstance.objects.create(title='Другой продукт', slug='other', price=50)
+        self.post(3)
+        response = self.client.post(reverse('basket-bulk'), data=[
+            {'id': self.product.id, 'count': -1}, {'id': other.id, 'count': 2}, {'id': other.id, 'count': 1},
+        ], content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({item['id']: item['count'] for item in response.json()}, {self.product.id: 2, other.id: 3})
+
+        response = self.client.post(reverse('basket-bulk'), data=[
+            {'id': self.product.id, 'count': -5}, {'id': other.id + 100, 'count': 1},
+        ], content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(sorted(self.basket_counts()), [2, 3])  # Изменения откатываются целиком
+
+        response = self.client.post(reverse('basket-bulk'), data=[{'id': self.product.id, 'count': -5}],
+                                    content_type='application/json')
+        self.assertEqual([item['id'] for item in response.json()], [other.id])
+        self.assertEqual(self.client.post(reverse('basket-bulk'), data={'id': other.id, 'count': 1},
+                                          content_type='application/json').status_code, 400)
+
+    def test_get_counts(self) -> None:
+        def get_basket() -> tuple:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('basket'))
+            self.assertEqual(response.status_code, 200)
+            return {item['id']: item['count'] for item in response.json()}, len(queries)
+
+        products = [self.product] + [
+            ProductInstance.objects.create(title=f'Продукт {i}', slug=f'product-{i}', price=100 + i) for i in range(5)
+        ]
+        for count, product in enumerate(products[:2], start=1):
+            self.post(count, product_id=product.id)
+        counts, queries_for_two = get_basket()
+        self.assertEqual(counts, {products[0].id: 1, products[1].id: 2})
+
+        for count, product in enumerate(products[2:], start=3):
+            self.post(count, product_id=product.id)
+        counts, queries = get_basket()
+        self.assertEqual(counts, {product.id: count for count, product in enumerate(products, start=1)})
+        self.assertEqual(queries, queries_for_two)  # Количества - одним сгруппированным запросом
+
+
+class SessionBasketTest(TestCase):
+    """
+    Корзина анонимного пользователя в сессии и ее перенос в Basket при входе
+    """
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='buyer', password='password')
+        self.product = ProductInstance.objects.create(title='Продукт', slug='product', price=100)
+        self.other = ProductInstance.objects.create(title='Другой продукт', slug='other', price=50)
+
+    def test_anonymous_basket_is_merged_on_sign_in(self) -> None:
+        url = reverse('basket')
+        self.client.post(url, data={'id': self.product.id, 'count': 2}, content_type='application/json')
+        self.client.post(reverse('basket-bulk'), data=[{'id': self.other.id, 'count': 3}],
+                         content_type='application/json')
+        self.assertEqual(self.client.delete(url, data={'id': self.other.id, 'count': 1},
+                                            content_type='application/json').status_code, 204)
+        self.assertEqual({item['id']: item['count'] for item in self.client.get(url).json()},
+                         {self.product.id: 2, self.other.id: 2})
+        self.assertFalse(BasketItem.objects.exists())  # Анонимная корзина не пишется в БД
+
+        basket = Basket.objects.create(user=self.user)
+        BasketItem.objects.create(basket=basket, product=self.product, count=1)
+        self.client.post(reverse('sign-in'), data={'username': 'buyer', 'password': 'password'})
+        self.assertEqual(dict(BasketItem.objects.values_list('product_id', 'count')),
+                         {self.product.id: 3, self.other.id: 2})
+        self.assertEqual(len(self.client.get(url).json()), 2)
+
+    def test_anonymous_basket_survives_cache_clear(self) -> None:
+        url = reverse('basket')
+        self.client.post(url, data={'id': self.product.id, 'count': 2}, content_type='application/json')
+        self.client.post(reverse('basket-bulk'), data=[{'id': self.other.id, 'count': 1}],
+                         content_type='application/json')
+        cache.clear()  # Сессия загружается из БД
+        self.assertEqual({item['id']: item['count'] for item in self.client.get(url).json()},
+                         {self.product.id: 2, self.other.id: 1})
+
+
+class OrderItemsTest(TestCase):
+    """
+    Строки заказа фиксируют цены на момент оформления, стоимость считается агрегатным запросом
+    """
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='buyer', password='password')
+        self.client.force_login(self.user)
+        self.product = ProductInstance.objects.create(title='Продукт', slug='product', price=100)
+        self.other = ProductInstance.objects.create(title='Другой продукт', slug='other', price=50)
+        basket = Basket.objects.create(user=self.user)
+        BasketItem.objects.create(basket=basket, product=self.product, count=2)
+        BasketItem.objects.create(basket=basket, product=self.other, count=3)
+
+    def test_order_keeps_prices(self) -> None:
+        response = self.client.post(reverse('order-list'), data=[], content_type='application/json')
+        order = Order.objects.get(id=response.json()['orderId'])
+        self.assertEqual(dict(order.items2.values_list('product_id', 'count')), {self.product.id: 2, self.other.id: 3})
+        self.assertEqual(order.totalCost, 350)
+
+        ProductInstance.objects.filter(id=self.product.id).update(price=1000)
+        self.assertEqual(order.calculate_total_cost(), 350)
+        data = self.client.get(reverse('order-detail', kwargs={'pk': order.id})).json()
+        self.assertEqual(data['totalCost'], 350)
+        self.assertEqual({product['id']: product['price'] for product in data['products']}[self.product.id], '100.00')
+
+    def test_order_without_items(self) -> None:
+        # Заказ, созданный вне API (в админке или generate_catalog): строк нет, totalCost - значение по умолчанию
+        order = Order.objects.create(basket=Basket.objects.get(user=self.user), user=self.user)
+        detail = self.client.get(reverse('order-detail', kwargs={'pk': order.id})).json()
+        history = {item['id']: item for item in self.client.get(reverse('order-list')).json()}
+        for data in (detail, history[order.id]):
+            self.assertEqual(data['totalCost'], 350)
+            self.assertEqual({product['id']: product['count'] for product in data['products']},
+                             {self.product.id: 2, self.other.id: 3})
+
+
+class PopularProductsTest(TestCase):
+    """
+    Оплата заказа учитывается в количестве покупок один раз, рейтинг популярных продуктов пересчитывается отдельно
+    """
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='buyer', password='password')
+        self.client.force_login(self.user)
+        self.product = ProductInstance.objects.create(title='Продукт', slug='product', price=100,
+                                                      number_of_purchases=0)
+        self.other = ProductInstance.objects.create(title='Другой продукт', slug='other', price=50,
+                                                    number_of_purchases=1)
+        basket = Basket.objects.create(user=self.user)
+        BasketItem.objects.create(basket=basket, product=self.product, count=2)
+        response = self.client.post(reverse('order-list'), data=[], content_type='application/json')
+        self.url = reverse('order-detail', kwargs={'pk': response.json()['orderId']})
+
+    def popular_ids(self) -> list:
+        return [product['id'] for product in self.client.get(reverse('products_popular')).json()]
+
+    def test_other_user_cannot_pay(self) -> None:
+        self.client.force_login(User.objects.create_user(username='other', password='password'))
+        response = self.client.post(self.url, data={'status': 'оплачено'}, content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(ProductInstance.objects.get(id=self.product.id).number_of_purchases, 0)
+
+    def test_paid_order_counts_once(self) -> None:
+        for _ in range(2):
+            self.client.post(self.url, data={'status': 'оплачено'}, content_type='application/json')
+        self.assertEqual(ProductInstance.objects.get(id=self.product.id).number_of_purchases, 2)
+        self.assertEqual(ProductInstance.objects.get(id=self.other.id).number_of_purchases, 1)
+
+        # До пересчета рейтинг пуст, и продукты сортируются запросом; после пересчета - по позициям рейтинга
+        self.assertEqual(self.popular_ids(), [self.product.id, self.other.id])
+        ProductInstance.objects.filter(id=self.other.id).update(number_of_purchases=10)
+        self.assertEqual(refresh_popular_products(), 2)
+        self.assertEqual(self.popular_ids(), [self.other.id, self.product.id])
+
+
+class OrderHistoryTest(TestCase):
+    """
+    История заказов загружается фиксированным числом запросов и постранично по параметру currentPage
+    """
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='buyer', password='password')
+        self.client.force_login(self.user)
+        self.basket = Basket.objects.create(user=self.user)
+        self.products = [
+            ProductInstance.objects.create(title=f'Продукт {i}', slug=f'product-{i}', price=100 + i) for i in range(4)
+        ]
+
+    def create_orders(self, count: int) -> None:
+        for i in range(count):
+            BasketItem.objects.update_or_create(basket=self.basket, product=self.products[i % 4],
+                                                defaults={'count': i + 1})
+            Order.objects.create(basket=self.basket, user=self.user).create_items()
+
+    def count_queries(self) -> int:
+        cache.clear()  # Снимок профиля (и его отсутствие) загружается при каждом измерении
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('order-list'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_constant_queries(self) -> None:
+        self.create_orders(1)
+        queries_for_one = self.count_queries()
+        self.create_orders(5)
+        self.assertEqual(self.count_queries(), queries_for_one)
+
+    def test_pagination(self) -> None:
+        self.create_orders(3)
+        orders = self.client.get(reverse('order-list')).json()
+        self.assertEqual(len(orders), 3)
+        self.assertEqual(len(orders[0]['products']), 3)  # Последний заказ содержит все продукты корзины
+
+        page = self.client.get(reverse('order-list'), {'currentPage': 2, 'limit': 2}).json()
+        self.assertEqual(page['currentPage'], 2)
+        self.assertEqual(page['lastPage'], 2)
+        self.assertEqual([order['id'] for order in page['items']], [orders[2]['id']])
+        self.assertEqual([product['count'] for product in page['items'][0]['products']], [1])
+
+
+class OrderDetailUpdateTest(TestCase):
+    """
+    Обновление заказа записывает только изменившиеся поля в одной транзакции
+    """
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='password')
+        Profile.objects.create(user=self.user, fullName='Иван Иванов')
+        self.client.force_login(self.user)
+        self.order = Order.objects.create(basket=Basket.objects.create(user=self.user), user=self.user)
+        self.url = reverse('order-detail', kwargs={'pk': self.order.id})
+
+    def post(self, data: dict) -> list:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data=data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+
+    def test_update_fields(self) -> None:
+        updates = self.post({'city': 'Казань', 'fullName': 'Иван Иванов', 'email': 'buyer@example.com'})
+        self.assertEqual(len(updates), 1)  # Пользователь и профиль не изменились
+        self.assertIn('"city"', updates[0])
+        self.assertNotIn('"address"', updates[0])
+        self.assertEqual(Order.objects.get(id=self.order.id).city, 'Казань')
+
+        self.assertEqual(self.post({'city': 'Казань', 'status': 'ожидание платежа'}), [])
+        self.assertEqual(len(self.post({'fullName': 'Петр Петров'})), 1)
+        self.assertEqual(Profile.objects.get(user=self.user).fullName, 'Петр Петров')
+
+
+class StreamingJSONParserTest(TestCase):
+    """
+    Инкрементальный разбор JSON: границы блоков, ограничения размера и количества элементов
+    """
+
+    def parse(self, body: str, parser: StreamingJSONParser = None) -> Any:
+        parser = parser or StreamingJSONParser()
+        return parser.parse(io.BytesIO(body.encode('utf-8')), parser_context={'encoding': 'utf-8'})
+
+    @mock.patch('diploma_shop.json_api.JSON_STREAM_CHUNK_SIZE', 3)
+    def test_chunk_boundaries(self) -> None:
+        body = ' [{"id": 12345, "title": "Продукт"}, 67890 , [1.5e3, null], "ё"] '
+        self.assertEqual(self.parse(body), json.loads(body))
+        self.assertEqual(self.parse(body, PlainListJSONParser()), json.loads(body))
+        self.assertEqual(self.parse('[]', PlainListJSONParser()), [])
+        for invalid in ('[1, 2', '[1 2]', '[1] 2', '{"id": 1}', '[NaN]'):
+            with self.assertRaises(ParseError):
+                self.parse(invalid, PlainListJSONParser())
+
+    @override_settings(JSON_PARSER_MAX_BYTES=20, JSON_PARSER_MAX_ITEMS=3)
+    def test_limits(self) -> None:
+        self.assertEqual(self.parse('[1, 2, 3]', PlainListJSONParser()), [1, 2, 3])
+        with self.assertRaises(ParseError):
+            self.parse('[1, 2, 3, 4]', PlainListJSONParser())
+        with self.assertRaises(ParseError):
+            self.parse('{"title": "%s"}' % ('x' * 20))
+        response = self.client.post(reverse('basket-bulk'), data=[{'id': 1, 'count': 1}] * 4,
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class FastJSONRendererTest(TestCase):
+    """
+    FastJSONRenderer выводит те же байты, что и JSONRenderer DRF
+    """
+
+    def test_same_output(self) -> None:
+        data = {
+            'price': Decimal('199.90'),
+            'date': timezone.now(),
+            'local': datetime(2023, 7, 1, 12, 30, 15, 123456),
+            'day': date(2023, 7, 1),
+            'status': gettext_lazy('оплачено'),
+            'text': 'Строка\u2028с разделителями\u2029',
+            'big': 2 ** 70,  # Не поддерживается orjson, рендерится JSONRenderer
+            'items': [{'id': 1, 'rating': 4.5, 'tags': ('a', 'b')}, None, True],
+            1: 'ключ-число',
+        }
+        for payload in (data, {key: value for key, value in data.items() if key != 'big'}, [], 'строка'):
+            self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_floats(self) -> None:
+        for value in (1e-07, 1e-05, 1e+16, 1e22, -2.5e-10, 0.0, -0.0, 0.0001, 4.5, Decimal('1E-7')):
+            payload = {'a': value, 'items': [{'rating': value}]}
+            self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+        self.assertEqual(FastJSONRenderer().render({'a': 1e-07}), b'{"a":1e-07}')
+        # NaN и бесконечность запрещены (STRICT_JSON), как и в JSONRenderer
+        for value in (float('nan'), float('inf'), float('-inf')):
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({'items': [{'rating': value}]})
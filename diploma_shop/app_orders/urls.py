@@ -1,9 +1,10 @@
 from django.urls import path
-from .api import BasketView, OrderAPIView, OrderDetailAPIView, PaymentCardAPIView
+from .api import BasketView, BasketBulkView, OrderAPIView, OrderDetailAPIView, PaymentCardAPIView
 
 
 urlpatterns = [
     path('basket', BasketView.as_view(), name='basket'),
+    path('basket/bulk', BasketBulkView.as_view(), name='basket-bulk'),
     path('orders', OrderAPIView.as_view(), name='order-list'),
     path('order/<int:pk>', OrderDetailAPIView.as_view(), name='order-detail'),
     path('payment', PaymentCardAPIView.as_view(), name='payment'),
@@ -1,6 +1,6 @@
 from django.db.models.query import QuerySet
-from django.db.models import Avg, Count
 from django.utils import timezone
+from rest_framework.exceptions import NotFound
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
 from rest_framework import permissions
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -10,10 +10,11 @@ from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import ProductInstance, Review, Category, Tag
-from .serializers import ProductListSerializer, ProductSalesSerializer, ProductDetailSerializer, CategorySerializer, \
-    TagSerializer, ReviewCreateSerializer
-from .service import CustomPaginationProducts, ProductFilter, CustomOrderingFilter
+from .models import ProductInstance, Review, Tag
+from .serializers import ProductListSerializer, ProductSalesSerializer, ProductDetailSerializer, TagSerializer, \
+    ReviewCreateSerializer
+from .service import CustomPaginationProducts, ProductFilter, CustomOrderingFilter, get_or_set_versioned, \
+    get_category_tree, get_popular_products, get_reviews_page, product_detail_queryset
 
 
 class ProductListView(ListAPIView):
@@ -26,7 +27,7 @@ class ProductListView(ListAPIView):
     pagination_class = CustomPaginationProducts
 
     def get_queryset(self) -> QuerySet:
-        queryset = ProductInstance.objects.filter(available=True).annotate(reviews_count=Count('reviews2'))
+        queryset = ProductInstance.objects.filter_and_annotate().values(*ProductListSerializer.flat_fields)
         return queryset
 
 
@@ -48,7 +49,8 @@ class CatalogView(ListAPIView):
     - get_queryset(): Метод для получения набора данных товаров.
 
     Query Parameters:
-    - filter[name] (str): Фильтр по имени товара.
+    - filter[name] (str): Поисковый запрос (название, описание, теги, характеристики); без sort - по релевантности.
+    - filter[property] (str): Поиск по поисковому индексу без ранжирования.
     - filter[minPrice] (int): Минимальная цена товара.
     - filter[maxPrice] (int): Максимальная цена товара.
     - filter[freeDelivery] (bool): Фильтр для бесплатной доставки товара.
@@ -56,6 +58,7 @@ class CatalogView(ListAPIView):
     - sort (str): Параметр сортировки.
     - sortType (str): Тип сортировки.
     - currentPage (int): Номер текущей страницы.
+    - cursor (str): Курсор страницы для курсорной пагинации (пустое значение - первая страница).
 
     Permissions:
     - `AllowAny`: Разрешен доступ для всех пользователей.
@@ -88,12 +91,8 @@ class CatalogView(ListAPIView):
         - Получает набор данных товаров с применением фильтров и сортировки.
 
         """
-        queryset = ProductInstance.objects.filter_and_annotate()
-        name_filter = self.request.query_params.get('filter[name]', None)  # Получение фильтра по имени из запроса
-
-        # Фильтрация
-        if name_filter:
-            queryset = queryset.filter(title__icontains=name_filter)  # Применяем фильтр по имени, если он задан
+        # Фильтрация (в том числе поиск filter[name]) выполняется ProductFilter
+        queryset = ProductInstance.objects.filter_and_annotate().values(*ProductListSerializer.flat_fields)
 
         # Сортировка
         # current_page = self.request.query_params.get('currentPage', None)  # Текущая страница
@@ -129,10 +128,12 @@ class ProductPopularView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request: Request) -> Response:
-        # Использование filter_and_annotate для получения продуктов
-        products = ProductInstance.objects.filter_and_annotate().order_by('-sort_index', '-number_of_purchases')[:8]
-        serializer = ProductListSerializer(products, many=True)
-        return Response(serializer.data)
+        # Рейтинг популярности рассчитывается заранее (refresh_popular_products); ответ кэшируется по версии каталога
+        data = get_or_set_versioned('products_popular', lambda: ProductListSerializer(
+            get_popular_products(8, ProductListSerializer.flat_fields),  # Первые позиции рейтинга популярности
+            many=True
+        ).data)
+        return Response(data)
 
 
 class ProductLimitedView(APIView):
@@ -155,9 +156,12 @@ class ProductLimitedView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request: Request) -> Response:
-        products = ProductInstance.objects.filter_and_annotate()[:16]  # Получение первых 16 отаннотированных продуктов
-        serializer = ProductListSerializer(products, many=True)
-        return Response(serializer.data)
+        # Получение первых 16 продуктов; ответ кэшируется по версии каталога
+        data = get_or_set_versioned('products_limited', lambda: ProductListSerializer(
+            ProductInstance.objects.filter_and_annotate().values(*ProductListSerializer.flat_fields)[:16],
+            many=True
+        ).data)
+        return Response(data)
 
 
 class ProductSalesView(ListAPIView):
@@ -183,7 +187,11 @@ class ProductSalesView(ListAPIView):
 
     def get_queryset(self) -> QuerySet:
         current_date = timezone.now().date()  # Получение текущей даты
-        queryset = ProductInstance.objects.filter(dateFrom__lte=current_date, dateTo__gte=current_date, available=True)
+        queryset = ProductInstance.objects.filter(
+            dateFrom__lte=current_date,
+            dateTo__gte=current_date,
+            available=True
+        ).values(*ProductSalesSerializer.flat_fields)
         return queryset
 
 
@@ -207,10 +215,12 @@ class ProductBannersView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request: Request) -> Response:
-        # Использование filter_and_annotate для получения продуктов
-        products = ProductInstance.objects.filter_and_annotate().order_by('-sort_index', '-number_of_purchases')[:3]
-        serializer = ProductListSerializer(products, many=True)
-        return Response(serializer.data)
+        # Рейтинг популярности рассчитывается заранее (refresh_popular_products); ответ кэшируется по версии каталога
+        data = get_or_set_versioned('products_banners', lambda: ProductListSerializer(
+            get_popular_products(3, ProductListSerializer.flat_fields),  # Первые позиции рейтинга популярности
+            many=True
+        ).data)
+        return Response(data)
 
 
 class ProductDetailView(APIView):
@@ -223,6 +233,9 @@ class ProductDetailView(APIView):
     Parameters:
     - pk (int): Идентификатор конкретного продукта.
 
+    Query Parameters:
+    - reviewsPage (int): Номер страницы отзывов (PRODUCT_REVIEWS_PAGE_SIZE отзывов на странице), по умолчанию 1.
+
     Permissions:
     - `AllowAny`: Разрешен доступ для всех пользователей.
 
@@ -245,20 +258,11 @@ class ProductDetailView(APIView):
         Информация о продукте в формате JSON.
 
         """
-        product = ProductInstance.objects.filter_and_annotate(product_ids=[pk]).get(id=pk, available=True)
-        # Получение среднего рейтинга продукта на основе отзывов:
-        average_rating = Review.objects.filter(product=product).aggregate(Avg('rate__value'))
-
-        # Округляем средний рейтинг до одного десятичного знака
-        if average_rating['rate__value__avg'] is not None:
-            formatted_rating = round(average_rating['rate__value__avg'], 1)
-        else:
-            formatted_rating = None
-
-        # Сохраняем округленное значение в модель
-        product.rating = formatted_rating
-        product.save()
-
+        # Рейтинг хранится в модели и пересчитывается при добавлении отзыва, поэтому GET ничего не записывает
+        try:
+            product = product_detail_queryset(pk, get_reviews_page(request)).get(id=pk, available=True)
+        except ProductInstance.DoesNotExist:
+            raise NotFound()
         serializer = ProductDetailSerializer(product)
         return Response(serializer.data)
 
@@ -292,9 +296,7 @@ class CategoryView(APIView):
         Категории продуктов в формате JSON.
 
         """
-        category = Category.objects.all()
-        serializer = CategorySerializer(category, many=True)
-        return Response(serializer.data)
+        return Response(get_category_tree())  # Дерево строится одним запросом и запоминается до изменения категорий
 
 
 class TagsView(APIView):
@@ -325,9 +327,8 @@ class TagsView(APIView):
         Returns:
         Теги продуктов в формате JSON.
         """
-        tags = Tag.objects.all()
-        serializer = TagSerializer(tags, many=True)
-        return Response(serializer.data)
+        data = get_or_set_versioned('tags', lambda: TagSerializer(Tag.objects.all(), many=True).data)
+        return Response(data)
 
 
 class ReviewCreateView(APIView):
@@ -371,19 +372,17 @@ class ReviewCreateView(APIView):
 
         if review.is_valid():
             # Проверяем, существует ли уже отзыв от этого пользователя на данный продукт
-            if Review.objects.filter(product=product, author=author).exists():
-                Review.objects.filter(  # Если существует, то обновляем отзыв и рейтинг
-                    product=product,
-                    author=author
-                ).update(
-                    rate=review.data['rate'],
-                    text=review.data['text']
-                )
+            existing = Review.objects.filter(product=product, author=author).first()
+            if existing is not None:  # Если существует, то обновляем отзыв и рейтинг
+                existing.rate_id = review.data['rate']
+                existing.text = review.data['text']
+                existing.save(update_fields=['rate', 'text', 'updated_date'])
             else:
                 review.save(  # Если нет, то сохраняем новый отзыв
                     product=product,
                     author=author,
                 )
+            # Рейтинг продукта и кэш каталога обновляются сигналами сохранения отзыва (app_products.signals)
             return Response(status=201)
         else:
             return Response(status=400)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AppProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_products'
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401 Подключение обработчиков сигналов
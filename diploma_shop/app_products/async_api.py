@@ -0,0 +1,92 @@
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.response import Response
+from typing import Any, Dict, List
+
+from diploma_shop.async_views import AsyncAPIView
+from .api import CatalogView, ProductPopularView, ProductDetailView, CategoryView, TagsView
+from .models import ProductInstance, Tag
+from .serializers import ProductListSerializer, ProductDetailSerializer, TagSerializer
+from .service import aget_or_set_versioned, aget_category_tree, aget_popular_products, get_reviews_page, \
+    product_detail_queryset
+
+
+async def aserialize_product_list(rows: List[Dict[str, Any]], context: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Сериализует строки .values() продуктов ProductListSerializer: изображения и теги загружаются
+    асинхронным ORM заранее и передаются сериализатору в контексте flat_related (см. FlatListSerializer).
+
+    Parameters:
+    - rows (List[Dict[str, Any]]): Строки .values(*ProductListSerializer.flat_fields).
+    - context (Dict[str, Any]): Контекст сериализатора.
+
+    Returns:
+    - List[Dict[str, Any]]: Сериализованные продукты.
+    """
+    related = await ProductListSerializer(context=context).aload_flat_related([row['id'] for row in rows])
+    return ProductListSerializer(rows, many=True, context={**context, 'flat_related': related}).data
+
+
+class AsyncCatalogView(AsyncAPIView, CatalogView):
+    """
+    Асинхронный вариант CatalogView (те же параметры запроса и ответ) для запуска через ASGI:
+    количество и строки страницы, изображения и теги загружаются асинхронным ORM, а количество
+    берется из общего с CatalogView кэша. Фильтрация выполняется в потоке: поиск по индексу
+    может обращаться к БД при построении запроса.
+    """
+
+    async def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        if page is None:
+            return Response(await aserialize_product_list([row async for row in queryset],
+                                                          self.get_serializer_context()))
+        return self.get_paginated_response(await aserialize_product_list(page, self.get_serializer_context()))
+
+
+class AsyncProductPopularView(AsyncAPIView, ProductPopularView):
+    """
+    Асинхронный вариант ProductPopularView; запись кэша общая с ProductPopularView.
+    """
+
+    async def get(self, request: Request) -> Response:
+        async def build() -> List[Dict[str, Any]]:
+            return await aserialize_product_list(await aget_popular_products(8, ProductListSerializer.flat_fields), {})
+
+        return Response(await aget_or_set_versioned('products_popular', build))
+
+
+class AsyncProductDetailView(AsyncAPIView, ProductDetailView):
+    """
+    Асинхронный вариант ProductDetailView. Связанные данные загружаются заранее (product_detail_queryset):
+    в асинхронном коде ленивые запросы сериализатора к БД запрещены.
+    """
+
+    async def get(self, request: Request, pk: int) -> Response:
+        try:
+            product = await product_detail_queryset(pk, get_reviews_page(request)).aget(id=pk, available=True)
+        except ProductInstance.DoesNotExist:
+            raise NotFound()
+        return Response(ProductDetailSerializer(product).data)
+
+
+class AsyncCategoryView(AsyncAPIView, CategoryView):
+    """
+    Асинхронный вариант CategoryView; дерево категорий общее с CategoryView.
+    """
+
+    async def get(self, request: Request) -> Response:
+        return Response(await aget_category_tree())
+
+
+class AsyncTagsView(AsyncAPIView, TagsView):
+    """
+    Асинхронный вариант TagsView; запись кэша общая с TagsView.
+    """
+
+    async def get(self, request: Request) -> Response:
+        async def build() -> List[Dict[str, Any]]:
+            return TagSerializer([tag async for tag in Tag.objects.all()], many=True).data
+
+        return Response(await aget_or_set_versioned('tags', build))
@@ -0,0 +1,159 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.db import close_old_connections, models, transaction
+from django.dispatch import Signal
+from PIL import Image
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Отправляется после записи вариантов изображения: sender - модель, instance_id - идентификатор изображения
+renditions_ready = Signal()
+
+_executor: Optional[ThreadPoolExecutor] = None  # Пул потоков обработки изображений этого процесса
+
+
+class ImageRenditionsMixin:
+    """
+    Примесь для моделей изображений с полями src (ImageField) и renditions (JSONField).
+
+    Оригинал сохраняется без изменений, а варианты из rendition_sizes создаются после фиксации
+    транзакции в пуле потоков, вне обработки запроса. В renditions записываются пути вариантов
+    и имя исходного файла ('source'), по которым они построены.
+
+    Attributes:
+    - rendition_sizes (Dict[str, Tuple[int, int]]): Максимальные размеры вариантов {имя: (ширина, высота)}.
+    """
+    rendition_sizes: Dict[str, Tuple[int, int]] = {}
+
+    def save(self, *args, **kwargs) -> None:
+        super().save(*args, **kwargs)
+        if self.needs_renditions():
+            schedule_renditions(self)
+
+    def needs_renditions(self) -> bool:
+        """
+        Проверяет, что у изображения есть загруженный файл, для которого варианты еще не построены.
+        """
+        if not self.src or self.src.name == self._meta.get_field('src').default:
+            return False
+        return (self.renditions or {}).get('source') != self.src.name
+
+    def rendition_url(self, name: Optional[str]) -> Optional[str]:
+        """
+        Возвращает URL варианта изображения, а пока вариант не готов - URL оригинала.
+
+        Parameters:
+        - name (Optional[str]): Имя варианта из rendition_sizes; None - оригинал.
+
+        Returns:
+        - Optional[str]: URL изображения.
+        """
+        return get_rendition_url(self.src.storage, self.src.name, self.renditions, name)
+
+
+def get_rendition_url(storage: Storage, source: Optional[str], renditions: Optional[Dict[str, str]],
+                      name: Optional[str]) -> Optional[str]:
+    """
+    URL варианта изображения по значениям полей src и renditions (например, из строк .values()).
+
+    Parameters:
+    - storage (Storage): Хранилище файлов поля src.
+    - source (Optional[str]): Имя файла оригинала.
+    - renditions (Optional[Dict[str, str]]): Значение поля renditions.
+    - name (Optional[str]): Имя варианта из rendition_sizes; None - оригинал.
+
+    Returns:
+    - Optional[str]: URL изображения.
+    """
+    if not source:
+        return None
+    renditions = renditions or {}
+    if name and renditions.get('source') == source and renditions.get(name):
+        return storage.url(renditions[name])
+    return storage.url(source)
+
+
+def schedule_renditions(instance: models.Model) -> None:
+    """
+    Ставит построение вариантов изображения в очередь после фиксации текущей транзакции.
+    """
+    transaction.on_commit(partial(_submit, instance._meta.label, instance.pk))
+
+
+def _submit(model_label: str, pk: int) -> None:
+    global _executor
+    if not getattr(settings, 'IMAGE_PIPELINE_ASYNC', True):
+        process_renditions(model_label, pk)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_PIPELINE_WORKERS', 2),
+            thread_name_prefix='image-renditions',
+        )
+    _executor.submit(_process_in_worker, model_label, pk)
+
+
+def _process_in_worker(model_label: str, pk: int) -> None:
+    try:
+        process_renditions(model_label, pk)
+    except Exception:  # Ошибка обработки не должна останавливать поток пула
+        logger.exception('Не удалось построить варианты изображения %s #%s', model_label, pk)
+    finally:
+        close_old_connections()  # Соединение с БД открыто в потоке пула
+
+
+def process_renditions(model_label: str, pk: int) -> Optional[Dict[str, str]]:
+    """
+    Строит варианты изображения из оригинала и записывает их пути в поле renditions.
+
+    Parameters:
+    - model_label (str): Модель изображения в формате 'app_label.ModelName'.
+    - pk (int): Идентификатор изображения.
+
+    Returns:
+    - Optional[Dict[str, str]]: Записанные варианты или None, если строить нечего.
+    """
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not instance.needs_renditions():
+        return None
+
+    source = instance.src.name
+    storage = instance.src.storage
+    with instance.src.open('rb') as file:
+        original = Image.open(file)
+        original.load()
+    image_format = original.format or 'JPEG'
+
+    renditions = {'source': source}
+    directory, filename = os.path.split(source)
+    for name, size in instance.rendition_sizes.items():
+        if original.width <= size[0] and original.height <= size[1]:
+            renditions[name] = source  # Оригинал не больше варианта - используем его
+            continue
+        image = original.copy()
+        image.thumbnail(size)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, format=image_format)
+        renditions[name] = storage.save(os.path.join(directory, 'renditions', name, filename),
+                                        ContentFile(buffer.getvalue()))
+
+    # Варианты предыдущего оригинала больше не нужны
+    for name, path in (instance.renditions or {}).items():
+        if name != 'source' and path and path not in renditions.values() and path != instance.renditions.get('source'):
+            storage.delete(path)
+
+    # update() не вызывает save(), поэтому повторная постановка в очередь не происходит
+    model.objects.filter(pk=pk, src=source).update(renditions=renditions)
+    renditions_ready.send(sender=model, instance_id=pk)
+    return renditions
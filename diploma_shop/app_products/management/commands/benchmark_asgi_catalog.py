@@ -0,0 +1,117 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from typing import Any, Dict, List
+
+from app_products.models import ProductInstance
+
+# Пары (синхронное представление, асинхронный вариант) каталога
+ENDPOINTS = (
+    ('catalog', 'async_catalog'),
+    ('categories', 'async_categories'),
+    ('products_popular', 'async_products_popular'),
+    ('tags', 'async_tags'),
+    ('product_detail', 'async_product_detail'),
+)
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест представлений каталога в одном процессе: синхронные представления через
+    WSGI-обработчик (тестовый Client в пуле потоков, как у многопоточного WSGI-сервера) и их
+    асинхронные варианты (/api/async/...) через ASGI-обработчик (AsyncClient в цикле событий,
+    как у uvicorn). Выводит количество запросов в секунду и задержки p50/p99.
+
+    Пример:
+    python manage.py benchmark_asgi_catalog --concurrency 16 --duration 10
+    """
+    help = 'Сравнивает запросы в секунду и задержку p99 представлений каталога через WSGI и ASGI'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--concurrency', type=int, default=16, help='Количество параллельных клиентов')
+        parser.add_argument('--duration', type=float, default=10, help='Длительность каждого этапа (секунды)')
+        parser.add_argument('--mode', choices=('both', 'wsgi', 'asgi'), default='both', help='Измеряемые этапы')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        product_id = ProductInstance.objects.filter(available=True).values_list('id', flat=True).first()
+        if product_id is None:
+            raise CommandError('Нет доступных продуктов: заполните каталог командой generate_catalog')
+
+        def urls(asynchronous: bool) -> List[str]:
+            return [
+                reverse(async_name if asynchronous else name, kwargs={'pk': product_id} if 'detail' in name else None)
+                for name, async_name in ENDPOINTS
+            ]
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            if options['mode'] in ('both', 'wsgi'):
+                result = self.run_wsgi(urls(False), options['concurrency'], options['duration'])
+                self.report('WSGI', result, options['duration'])
+            if options['mode'] in ('both', 'asgi'):
+                result = asyncio.run(self.run_asgi(urls(True), options['concurrency'], options['duration']))
+                self.report('ASGI', result, options['duration'])
+
+    def run_wsgi(self, urls: List[str], concurrency: int, duration: float) -> Dict[str, Any]:
+        """
+        Синхронные представления: каждый клиент выполняет запросы в своем потоке.
+        """
+        result: Dict[str, Any] = {'latencies': [], 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def client(number: int) -> None:
+            http = Client()
+            try:
+                while time.perf_counter() < deadline:
+                    url = urls[(number + len(result['latencies'])) % len(urls)]
+                    started = time.perf_counter()
+                    response = http.get(url)
+                    with lock:
+                        if response.status_code == 200:
+                            result['latencies'].append((time.perf_counter() - started) * 1000)
+                        else:
+                            result['errors'] += 1
+            finally:
+                connection.close()  # Соединение с БД потока клиента
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(client, range(concurrency)))
+        return result
+
+    async def run_asgi(self, urls: List[str], concurrency: int, duration: float) -> Dict[str, Any]:
+        """
+        Асинхронные представления: клиенты - задачи одного цикла событий.
+        """
+        result: Dict[str, Any] = {'latencies': [], 'errors': 0}
+        deadline = time.perf_counter() + duration
+
+        async def client(number: int) -> None:
+            http = AsyncClient()
+            while time.perf_counter() < deadline:
+                url = urls[(number + len(result['latencies'])) % len(urls)]
+                started = time.perf_counter()
+                async with ThreadSensitiveContext():  # Как в ASGIHandler: свой поток синхронного кода на запрос
+                    response = await http.get(url)
+                if response.status_code == 200:
+                    result['latencies'].append((time.perf_counter() - started) * 1000)
+                else:
+                    result['errors'] += 1
+
+        await asyncio.gather(*[client(number) for number in range(concurrency)])
+        return result
+
+    def report(self, name: str, result: Dict[str, Any], duration: float) -> None:
+        latencies = sorted(result['latencies']) or [0.0]
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f'{name}: {len(result["latencies"]) / duration:.1f} запросов/с, ошибок {result["errors"]}, '
+            f'p50 {statistics.median(latencies):.1f} мс, p99 {p99:.1f} мс'
+        )
@@ -0,0 +1,81 @@
+import time
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from typing import Any, Dict
+
+from app_orders.models import Order
+from app_orders.serializers import OrderSerializer, load_order_products
+from app_orders.service import get_basket_quantities
+from app_products.models import ProductInstance
+from app_products.serializers import ProductListSerializer
+from app_users.service import get_profile_snapshots
+from diploma_shop.json_api import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    """
+    Сравнение времени рендеринга ответов каталога и истории заказов JSONRenderer DRF и FastJSONRenderer
+    на данных текущей БД (например, после generate_catalog). Проверяет, что результаты совпадают побайтово.
+
+    Пример:
+    python manage.py benchmark_json_renderer --products 1000 --orders 200 --iterations 50
+    """
+    help = 'Сравнивает JSONRenderer и FastJSONRenderer на ответах каталога и истории заказов'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--products', type=int, default=1000, help='Количество продуктов в ответе каталога')
+        parser.add_argument('--orders', type=int, default=200, help='Количество заказов в ответе истории')
+        parser.add_argument('--iterations', type=int, default=50, help='Количество повторов рендеринга')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson не установлен: FastJSONRenderer использует JSONRenderer'))
+
+        products = ProductInstance.objects.filter_and_annotate().values(*ProductListSerializer.flat_fields) \
+            .order_by('id')[:options['products']]
+        catalog = {'items': ProductListSerializer(products, many=True).data, 'currentPage': 1, 'lastPage': 1}
+
+        orders = list(Order.objects.select_related('basket__user').prefetch_related('items2')
+                      .order_by('-id')[:options['orders']])
+        basket_quantities = get_basket_quantities({order.basket_id for order in orders})
+        product_ids = {item.product_id for order in orders for item in order.items2.all()}
+        for quantities in basket_quantities.values():
+            product_ids.update(quantities)
+        history = OrderSerializer(orders, many=True, context={
+            'basket_quantities': basket_quantities,
+            'order_products': load_order_products(product_ids),
+            'profiles': get_profile_snapshots({order.user_id for order in orders}),
+        }).data
+
+        for name, payload in (('Каталог', catalog), ('История заказов', history)):
+            self.compare(name, payload, options['iterations'])
+
+    def compare(self, name: str, payload: Any, iterations: int) -> None:
+        """
+        Рендерит данные обоими рендерерами и выводит среднее время и ускорение.
+
+        Raises:
+        - CommandError: Результаты рендереров различаются.
+        """
+        results: Dict[str, float] = {}
+        outputs: Dict[str, bytes] = {}
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            results[type(renderer).__name__], outputs[type(renderer).__name__] = \
+                self.measure(renderer, payload, iterations)
+        if outputs['JSONRenderer'] != outputs['FastJSONRenderer']:
+            raise CommandError(f'{name}: результаты JSONRenderer и FastJSONRenderer различаются')
+
+        size = len(outputs['JSONRenderer'])
+        self.stdout.write(
+            f'{name} ({size} байт): JSONRenderer {results["JSONRenderer"]:.2f} мс, '
+            f'FastJSONRenderer {results["FastJSONRenderer"]:.2f} мс, '
+            f'ускорение {results["JSONRenderer"] / max(results["FastJSONRenderer"], 1e-9):.1f}x'
+        )
+
+    @staticmethod
+    def measure(renderer: BaseRenderer, payload: Any, iterations: int) -> tuple:
+        output = renderer.render(payload)  # Прогрев и результат для сравнения
+        started = time.perf_counter()
+        for _ in range(iterations):
+            renderer.render(payload)
+        return (time.perf_counter() - started) * 1000 / max(iterations, 1), output
@@ -0,0 +1,68 @@
+import time
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from rest_framework import serializers
+from typing import Any, Callable, List
+
+from app_orders.serializers import BasketProductSerializer
+from app_products.models import ProductInstance
+from app_products.serializers import ProductListSerializer, ProductSalesSerializer
+
+
+class Command(BaseCommand):
+    """
+    Сравнение процессорного времени сериализации элемента списка полями DRF и плоской сериализацией
+    (FlatListSerializer) на продуктах текущей БД. Запросы к БД выполняются до замера: сравнивается
+    только построение ответа. Проверяет, что результаты совпадают.
+
+    Пример:
+    python manage.py benchmark_serializers --products 20 --iterations 500
+    """
+    help = 'Сравнивает сериализацию списков продуктов полями DRF и из строк .values()'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--products', type=int, default=20, help='Количество продуктов на странице')
+        parser.add_argument('--iterations', type=int, default=500, help='Количество повторов сериализации')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        ids = list(ProductInstance.objects.order_by('id').values_list('id', flat=True)[:options['products']])
+        if not ids:
+            raise CommandError('В БД нет продуктов, заполните ее командой generate_catalog')
+        for serializer_class in (ProductListSerializer, ProductSalesSerializer, BasketProductSerializer):
+            self.compare(serializer_class, ids, options['iterations'])
+
+    def compare(self, serializer_class: Any, ids: List[int], iterations: int) -> None:
+        """
+        Сериализует страницу обоими способами и выводит время на один элемент.
+
+        Raises:
+        - CommandError: Результаты различаются.
+        """
+        context = {'quantities': {product_id: 1 for product_id in ids}}
+        instances = list(ProductInstance.objects.filter(id__in=ids).order_by('id').prefetch_related('images2', 'tags'))
+        rows = list(ProductInstance.objects.filter(id__in=ids).order_by('id').values(*serializer_class.flat_fields))
+
+        drf = serializers.ListSerializer(child=serializer_class(), context=context)
+        flat = serializer_class(context=context)
+        related = flat.load_flat_related(ids)
+
+        drf_data, drf_time = self.measure(lambda: drf.to_representation(instances), iterations)
+        flat_data, flat_time = self.measure(
+            lambda: [flat.to_flat_representation(row, related) for row in rows], iterations
+        )
+        if drf_data != flat_data:
+            raise CommandError(f'{serializer_class.__name__}: результаты сериализации различаются')
+
+        per_item = 1000000 / (iterations * len(ids))  # Секунды на все повторы -> микросекунды на элемент
+        self.stdout.write(
+            f'{serializer_class.__name__}: поля DRF {drf_time * per_item:.1f} мкс/элемент, '
+            f'плоская {flat_time * per_item:.1f} мкс/элемент, '
+            f'ускорение {drf_time / max(flat_time, 1e-9):.1f}x'
+        )
+
+    @staticmethod
+    def measure(serialize: Callable[[], Any], iterations: int) -> tuple:
+        data = serialize()  # Прогрев и результат для сравнения
+        started = time.perf_counter()
+        for _ in range(iterations):
+            serialize()
+        return data, time.perf_counter() - started
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from typing import Any
+
+from app_products.images import process_renditions
+from app_products.models import ProductImages, CategoryImages
+from app_users.models import AvatarsImages
+
+
+class Command(BaseCommand):
+    """
+    Построение вариантов для изображений, загруженных до появления фоновой обработки
+    или не обработанных из-за ошибки.
+
+    Пример:
+    python manage.py build_image_renditions
+    """
+    help = 'Строит варианты (thumbnail, card, full) для изображений продуктов, категорий и аватаров'
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        built = 0
+        for model in (ProductImages, CategoryImages, AvatarsImages):
+            for pk in model.objects.order_by('pk').values_list('pk', flat=True).iterator():
+                try:
+                    if process_renditions(model._meta.label, pk) is not None:
+                        built += 1
+                except OSError as error:  # Файл оригинала отсутствует или поврежден
+                    self.stderr.write(f'{model._meta.label} #{pk}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Обработано изображений: {built}'))
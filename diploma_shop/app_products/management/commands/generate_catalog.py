@@ -0,0 +1,248 @@
+import random
+import time
+from datetime import timedelta
+from itertools import islice
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import models, transaction
+from django.utils import timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Type
+
+from app_orders.models import Basket, BasketItem, Order, OrderItem
+from app_products.models import ProductInstance, ProductImages, Tag, Category, Rate, Review, PropertyTypeProduct, \
+    PropertyInstanceProduct, User
+from app_products.search import update_search_documents
+from app_products.service import refresh_popular_products
+from app_users.models import Profile
+
+
+class Command(BaseCommand):
+    """
+    Генерация детерминированного синтетического набора данных для нагрузочного тестирования.
+
+    Объекты создаются генераторами и вставляются пачками через bulk_create, поэтому в памяти
+    одновременно находится не больше одной пачки. Работает на SQLite и PostgreSQL.
+
+    Slug продуктов и имена пользователей строятся из --prefix и --seed, поэтому повторный запуск
+    с теми же значениями в той же БД невозможен: нужны другой --seed или --prefix либо чистая БД.
+
+    Пример:
+    python manage.py generate_catalog --products 1000000 --reviews 10000000 --users 100000 --seed 42
+    """
+    help = 'Заполняет БД синтетическими продуктами, отзывами, пользователями, корзинами и заказами'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--products', type=int, default=10000, help='Количество продуктов')
+        parser.add_argument('--reviews', type=int, default=100000, help='Количество отзывов')
+        parser.add_argument('--users', type=int, default=1000, help='Количество покупателей')
+        parser.add_argument('--orders', type=int, default=500, help='Количество корзин с заказами')
+        parser.add_argument('--basket-size', type=int, default=5, help='Количество продуктов в корзине')
+        parser.add_argument('--tags', type=int, default=50, help='Количество тегов')
+        parser.add_argument('--category-depth', type=int, default=3, help='Глубина дерева категорий')
+        parser.add_argument('--category-width', type=int, default=3, help='Количество подкатегорий на уровне')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Размер пачки bulk_create')
+        parser.add_argument('--seed', type=int, default=1, help='Значение для генератора случайных чисел')
+        parser.add_argument('--prefix', default='gen', help='Префикс slug и имен пользователей')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        self.rnd = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = f"{options['prefix']}-{options['seed']}"
+        if User.objects.filter(username__startswith=f'{self.prefix}-user-').exists() or \
+                ProductInstance.objects.filter(slug__startswith=f'{self.prefix}-product-').exists():
+            raise CommandError(f'Данные с префиксом {self.prefix} уже созданы: укажите другой --seed или --prefix')
+        self.total_rows = 0
+        started = time.perf_counter()
+
+        user_ids = self.generate_users(options['users'])
+        rate_ids = self.insert(Rate, (Rate(value=value) for value in range(1, 6)))
+        tag_ids = self.insert(Tag, (Tag(name=f'Тег {i}') for i in range(options['tags'])))
+        leaf_ids = self.generate_categories(options['category_depth'], options['category_width'])
+        product_ids = self.generate_products(options['products'], leaf_ids, tag_ids)
+        self.generate_reviews(options['reviews'], product_ids, user_ids, rate_ids)
+        self.generate_orders(options['orders'], options['basket_size'], product_ids, user_ids)
+        ranking_started = time.perf_counter()
+        self.report('Рейтинг популярных продуктов', refresh_popular_products(), ranking_started)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего строк: {self.total_rows} за {elapsed:.1f} с ({self.total_rows / max(elapsed, 1e-9):.0f} строк/с)'
+        ))
+
+    def insert(self, model: Type[models.Model], objects: Iterable[models.Model]) -> List[int]:
+        """
+        Вставляет объекты пачками и сообщает скорость вставки.
+
+        Parameters:
+        - model (Type[models.Model]): Модель вставляемых объектов.
+        - objects (Iterable[models.Model]): Поток объектов.
+
+        Returns:
+        - List[int]: Идентификаторы созданных объектов.
+        """
+        started = time.perf_counter()
+        ids: List[int] = []
+        iterator = iter(objects)
+        with transaction.atomic():
+            while True:
+                batch = list(islice(iterator, self.batch_size))
+                if not batch:
+                    break
+                ids.extend(obj.pk for obj in model.objects.bulk_create(batch, batch_size=self.batch_size))
+        self.report(model._meta.verbose_name_plural, len(ids), started)
+        return ids
+
+    def insert_related(self, name: str, model: Type[models.Model], objects: Iterator[models.Model]) -> None:
+        """
+        Вставляет связанные объекты пачками без получения их идентификаторов.
+        """
+        started = time.perf_counter()
+        count = 0
+        with transaction.atomic():
+            while True:
+                batch = list(islice(objects, self.batch_size))
+                if not batch:
+                    break
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+                count += len(batch)
+        self.report(name, count, started)
+
+    def report(self, name: str, count: int, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        self.total_rows += count
+        self.stdout.write(f'{name}: {count} строк за {elapsed:.1f} с ({count / max(elapsed, 1e-9):.0f} строк/с)')
+
+    def generate_users(self, count: int) -> List[int]:
+        password = make_password('55660078aA')  # Хеш пароля вычисляется один раз для всех пользователей
+        user_ids = self.insert(User, (
+            User(username=f'{self.prefix}-user-{i}', email=f'{self.prefix}-user-{i}@example.com', password=password)
+            for i in range(count)
+        ))
+        self.insert_related('Профили пользователей', Profile, (
+            Profile(user_id=user_id, fullName=f'Покупатель {i}')
+            for i, user_id in enumerate(user_ids)
+        ))
+        return user_ids
+
+    def generate_categories(self, depth: int, width: int) -> List[int]:
+        level = self.insert(Category, (Category(title=f'Категория {i}') for i in range(width)))
+        for _ in range(1, depth):
+            level = self.insert(Category, (
+                Category(title=f'Категория {parent_id}.{i}', parent_id=parent_id)
+                for parent_id in level
+                for i in range(width)
+            ))
+        return level  # Продукты привязываются к листовым категориям
+
+    def generate_products(self, count: int, category_ids: List[int], tag_ids: List[int]) -> List[int]:
+        now = timezone.now()
+        rnd = self.rnd
+        product_ids = self.insert(ProductInstance, (
+            ProductInstance(
+                title=f'Продукт {i}',
+                slug=f'{self.prefix}-product-{i}',
+                item_number=i,
+                description=f'Описание продукта {i}',
+                price=rnd.randint(100, 50000),
+                salePrice=rnd.randint(50, 100),
+                count=rnd.randint(0, 100),
+                freeDelivery=rnd.random() < 0.5,
+                sort_index=rnd.randint(0, 100),
+                number_of_purchases=rnd.randint(0, 1000),
+                limited_edition=rnd.random() < 0.1,
+                category_id=rnd.choice(category_ids),
+                dateFrom=now - timedelta(days=rnd.randint(0, 10)),
+                dateTo=now + timedelta(days=rnd.randint(0, 10)),
+            )
+            for i in range(count)
+        ))
+        # bulk_create не вызывает save(), поэтому изображения не обрабатываются PIL
+        self.insert_related('Изображения продуктов', ProductImages, (
+            ProductImages(product_id=product_id, src=f'images/images_product/{product_id}.jpg', alt=f'{product_id}')
+            for product_id in product_ids
+        ))
+        tags_per_product = min(2, len(tag_ids))
+        self.insert_related('Теги продуктов', ProductInstance.tags.through, (
+            ProductInstance.tags.through(productinstance_id=product_id, tag_id=tag_id)
+            for product_id in product_ids
+            for tag_id in rnd.sample(tag_ids, tags_per_product)
+        ))
+        property_type_ids = self.insert(PropertyTypeProduct, (
+            PropertyTypeProduct(name=f'Характеристика {i}', slug=f'property-{i}') for i in range(3)
+        ))
+        self.insert_related('Значения характеристик продуктов', PropertyInstanceProduct, (
+            PropertyInstanceProduct(
+                product_id=product_id,
+                name_id=name_id,
+                value=f'Значение {rnd.randint(0, 50)}',
+                slug='value'
+            )
+            for product_id in product_ids
+            for name_id in property_type_ids
+        ))
+        started = time.perf_counter()
+        # bulk_create не отправляет сигналы, поэтому поисковые документы строятся отдельно
+        self.report('Поисковые документы', update_search_documents(product_ids), started)
+        return product_ids
+
+    def generate_reviews(self, count: int, product_ids: List[int], user_ids: List[int], rate_ids: List[int]) -> None:
+        if not product_ids or not user_ids:
+            return
+        rnd = self.rnd
+        self.insert_related('Отзывы к продукту', Review, (
+            Review(
+                author_id=rnd.choice(user_ids),
+                product_id=rnd.choice(product_ids),
+                rate_id=rnd.choice(rate_ids),
+                text=f'Отзыв {i}',
+            )
+            for i in range(count)
+        ))
+        started = time.perf_counter()
+        ProductInstance.objects.refresh_review_stats()  # Хранимые рейтинги пересчитываются одним запросом
+        self.stdout.write(f'Пересчет рейтингов: {time.perf_counter() - started:.1f} с')
+
+    def generate_orders(self, count: int, basket_size: int, product_ids: List[int], user_ids: List[int]) -> None:
+        """
+        Корзины покупателей и заказы из них со строками и стоимостью, как после Order.create_items:
+        цены строк - текущие цены продуктов, стоимость заказа - сумма строк.
+        """
+        rnd = self.rnd
+        buyer_ids = user_ids[:count]
+        basket_ids = self.insert(Basket, (Basket(user_id=user_id) for user_id in buyer_ids))
+        lines: Dict[int, List[Tuple[int, int]]] = {  # Строки корзин {корзина: [(продукт, количество)]}
+            basket_id: [(product_id, rnd.randint(1, 5))
+                        for product_id in rnd.sample(product_ids, min(basket_size, len(product_ids)))]
+            for basket_id in basket_ids
+        }
+        self.insert_related('Продукты в корзине', BasketItem, (
+            BasketItem(basket_id=basket_id, product_id=product_id, count=product_count)
+            for basket_id, basket_lines in lines.items()
+            for product_id, product_count in basket_lines
+        ))
+
+        ordered_ids = list({product_id for basket_lines in lines.values() for product_id, _ in basket_lines})
+        prices: Dict[int, Decimal] = {}
+        for start in range(0, len(ordered_ids), self.batch_size):
+            prices.update(ProductInstance.objects.filter(id__in=ordered_ids[start:start + self.batch_size])
+                          .values_list('id', 'price'))
+        order_ids = self.insert(Order, (
+            Order(
+                basket_id=basket_id,
+                user_id=user_id,
+                deliveryType=rnd.choice((1, 2)),
+                paymentType=rnd.choice((1, 2)),
+                status=rnd.choice((1, 2)),
+                city='Москва',
+                address=f'Улица {basket_id}',
+                totalCost=float(sum((prices[product_id] or 0) * product_count
+                                    for product_id, product_count in lines[basket_id])),
+            )
+            for basket_id, user_id in zip(basket_ids, buyer_ids)
+        ))
+        self.insert_related('Строки заказов', OrderItem, (
+            OrderItem(order_id=order_id, product_id=product_id, price=prices[product_id] or 0, count=product_count)
+            for order_id, basket_id in zip(order_ids, basket_ids)
+            for product_id, product_count in lines[basket_id]
+        ))
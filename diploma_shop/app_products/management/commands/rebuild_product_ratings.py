@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandParser
+from typing import Any
+
+from app_products.models import ProductInstance
+
+
+class Command(BaseCommand):
+    """
+    Пересчет хранимых количества отзывов и среднего рейтинга всех продуктов.
+
+    Пример:
+    python manage.py rebuild_product_ratings --batch-size 5000
+    """
+    help = 'Пересчитывает reviews_count, average_rating и rating продуктов по их отзывам'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество продуктов, пересчитываемых одним UPDATE-запросом'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        batch_size = options['batch_size']
+        product_ids = list(ProductInstance.objects.order_by('id').values_list('id', flat=True))
+        updated = 0
+        for start in range(0, len(product_ids), batch_size):  # Пересчитываем продукты пачками
+            updated += ProductInstance.objects.refresh_review_stats(product_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f'Обновлено продуктов: {updated}'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandParser
+from typing import Any
+
+from app_products.service import refresh_popular_products
+
+
+class Command(BaseCommand):
+    """
+    Пересчет рейтинга популярных продуктов для блоков популярных продуктов и баннеров.
+    Запускается периодически планировщиком, например cron каждые 10 минут.
+
+    Пример:
+    python manage.py refresh_popular_products --limit 100
+    """
+    help = 'Пересчитывает рейтинг популярных продуктов (ProductPopularity)'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Количество позиций рейтинга (по умолчанию - настройка POPULAR_PRODUCTS_LIMIT)'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        positions = refresh_popular_products(options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Позиций в рейтинге: {positions}'))
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:20
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, ExpressionWrapper, OuterRef, Subquery, fields
+from django.db.models.functions import Coalesce, Round
+
+
+def fill_review_stats(apps, schema_editor):
+    ProductInstance = apps.get_model('app_products', 'ProductInstance')
+    Review = apps.get_model('app_products', 'Review')
+    reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    average_rating = Subquery(reviews.annotate(
+        average=ExpressionWrapper(Round(Avg('rate__value') * 10) / 10.0, output_field=fields.DecimalField())
+    ).values('average'))
+    ProductInstance.objects.update(
+        reviews_count=Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), 0),
+        average_rating=average_rating,
+        rating=average_rating,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_products', '0003_alter_productinstance_number_of_purchases'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='productinstance',
+            options={'ordering': ('date',), 'verbose_name': 'Продукт', 'verbose_name_plural': 'Продукты'},
+        ),
+        migrations.AddField(
+            model_name='productinstance',
+            name='average_rating',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True, verbose_name='Средний рейтинг по отзывам'),
+        ),
+        migrations.AddField(
+            model_name='productinstance',
+            name='reviews_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Количество отзывов'),
+        ),
+        migrations.AlterField(
+            model_name='productinstance',
+            name='rating',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=1, max_digits=10, null=True, verbose_name='Рейтинг продукта'),
+        ),
+        migrations.RunPython(fill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.3 on 2026-10-18 09:40
+
+import re
+
+from django.db import migrations, models
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def fill_search_documents(apps, schema_editor):
+    ProductInstance = apps.get_model('app_products', 'ProductInstance')
+    PropertyInstanceProduct = apps.get_model('app_products', 'PropertyInstanceProduct')
+    parts = {product.id: [product.title or '', product.description or '']
+             for product in ProductInstance.objects.only('id', 'title', 'description')}
+    for product_id, tag in ProductInstance.tags.through.objects.values_list('productinstance_id', 'tag__name'):
+        parts[product_id].append(tag or '')
+    for product_id, value in PropertyInstanceProduct.objects.filter(product__isnull=False) \
+            .values_list('product_id', 'value'):
+        parts[product_id].append(value or '')
+    ProductInstance.objects.bulk_update(
+        [
+            ProductInstance(id=product_id, search_document=' '.join(
+                TOKEN_RE.findall(' '.join(texts).lower().replace('ё', 'е'))
+            ))
+            for product_id, texts in parts.items()
+        ],
+        ['search_document'],
+        batch_size=1000,
+    )
+
+
+def create_postgres_indexes(apps, schema_editor):
+    # Полнотекстовый и триграммный индексы доступны только в PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS app_products_product_search_gin ON app_products_productinstance "
+        "USING GIN (to_tsvector('russian'::regconfig, COALESCE(search_document, '')))"
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS app_products_product_title_trgm ON app_products_productinstance '
+        'USING GIN (title gin_trgm_ops)'
+    )
+
+
+def drop_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS app_products_product_search_gin')
+    schema_editor.execute('DROP INDEX IF EXISTS app_products_product_title_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_products', '0004_productinstance_review_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productinstance',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Поисковый документ'),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_postgres_indexes, drop_postgres_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_products', '0005_productinstance_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoryimages',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Варианты изображения'),
+        ),
+        migrations.AddField(
+            model_name='productimages',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Варианты изображения'),
+        ),
+    ]
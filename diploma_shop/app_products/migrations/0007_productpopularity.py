@@ -0,0 +1,29 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_products', '0006_categoryimages_renditions_productimages_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPopularity',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity2', serialize=False, to='app_products.productinstance', verbose_name='Продукт')),
+                ('position', models.PositiveIntegerField(unique=True, verbose_name='Позиция в рейтинге')),
+                ('sort_index', models.PositiveIntegerField(verbose_name='Индекс сортировки при расчете')),
+                ('number_of_purchases', models.PositiveIntegerField(verbose_name='Количество покупок при расчете')),
+                ('refreshed_at', models.DateTimeField(auto_now=True, verbose_name='Дата расчета')),
+            ],
+            options={
+                'verbose_name': 'Популярный продукт',
+                'verbose_name_plural': 'Рейтинг популярных продуктов',
+                'ordering': ('position',),
+            },
+        ),
+    ]
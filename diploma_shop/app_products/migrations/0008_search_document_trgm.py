@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def create_postgres_index(apps, schema_editor):
+    # Триграммный индекс для поиска по части слова (search_document LIKE '%...%') доступен только в PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS app_products_product_search_trgm ON app_products_productinstance '
+        'USING GIN (search_document gin_trgm_ops)'
+    )
+
+
+def drop_postgres_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS app_products_product_search_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_products', '0007_productpopularity'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_postgres_index, drop_postgres_index),
+    ]
@@ -1,28 +1,73 @@
 from django.contrib.auth import get_user_model
 from django.db import models
-from PIL import Image
-from django.db.models import Sum, F, Count, Avg, ExpressionWrapper, fields
-from django.db.models.functions import Round
+from django.db.models import Sum, F, Count, Avg, ExpressionWrapper, fields, OuterRef, Subquery
+from django.db.models.functions import Round, Coalesce
 from django.utils import timezone
 from django.urls import reverse
 from typing import List, Optional, Union
 
+from .images import ImageRenditionsMixin
+
 User = get_user_model()
 
 
-class ProductInstanceManager(models.Manager):
-    # Добавляем количество отзывов и среднее значение рейтинга
+class ProductInstanceQuerySet(models.QuerySet):
+    """
+    Набор данных продуктов с проекциями для сериализаторов списков
+    """
+    # Связанные данные, которые нужны сериализаторам списков продуктов. Категория выводится
+    # как идентификатор из category_id, поэтому отдельного запроса или JOIN для нее не требуется.
+    list_projections = {
+        'list': ('images2', 'tags'),  # ProductListSerializer
+        'sales': ('images2',),  # ProductSalesSerializer
+        'basket': ('images2', 'tags'),  # BasketProductSerializer
+    }
+
+    def list_projection(self, name: str = 'list') -> 'ProductInstanceQuerySet':
+        """
+        Загружает связанные данные сериализатора списка фиксированным числом запросов,
+        независимо от количества продуктов на странице.
+
+        Parameters:
+        - name (str): Название проекции из list_projections.
+
+        Returns:
+        - ProductInstanceQuerySet: Набор данных с prefetch_related.
+        """
+        return self.prefetch_related(*self.list_projections[name])
+
+
+class ProductInstanceManager(models.Manager.from_queryset(ProductInstanceQuerySet)):
+    # Количество отзывов и средний рейтинг хранятся в самой модели (reviews_count, average_rating)
     def filter_and_annotate(self, product_ids: Optional[List[int]] = None) -> models.QuerySet:
         if product_ids is not None:
-            queryset = self.filter(id__in=product_ids, available=True)
-        else:
-            queryset = self.filter(available=True)
-        return queryset.annotate(
-            reviews_count=Count('reviews2'),
-            average_rating=ExpressionWrapper(
-                Round(Avg('reviews2__rate__value') * 10) / 10.0,
+            return self.filter(id__in=product_ids, available=True)
+        return self.filter(available=True)
+
+    def refresh_review_stats(self, product_ids: Optional[List[int]] = None) -> int:
+        """
+        Пересчитывает количество отзывов и средний рейтинг продуктов одним UPDATE-запросом.
+
+        Parameters:
+        - product_ids (Optional[List[int]]): Идентификаторы продуктов; если не переданы - все продукты.
+
+        Returns:
+        - int: Количество обновленных продуктов.
+        """
+        reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+        reviews_count = Subquery(reviews.annotate(total=Count('id')).values('total'))
+        average_rating = Subquery(reviews.annotate(
+            average=ExpressionWrapper(
+                Round(Avg('rate__value') * 10) / 10.0,
                 output_field=fields.DecimalField()
             )
+        ).values('average'))
+
+        queryset = self.all() if product_ids is None else self.filter(id__in=product_ids)
+        return queryset.update(
+            reviews_count=Coalesce(reviews_count, 0),
+            average_rating=average_rating,
+            rating=average_rating,  # Поле rating используется для сортировки каталога
         )
 
 
@@ -119,8 +164,27 @@ class ProductInstance(models.Model):
         blank=True,
         max_digits=10,
         decimal_places=1,
+        db_index=True,
         verbose_name='Рейтинг продукта'
     )
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name='Количество отзывов'
+    )
+    average_rating = models.DecimalField(
+        null=True,
+        blank=True,
+        max_digits=3,
+        decimal_places=1,
+        verbose_name='Средний рейтинг по отзывам'
+    )
+    search_document = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Поисковый документ'  # Название, описание, теги и характеристики (app_products.search)
+    )
     order = models.ForeignKey(
         'app_orders.Order',
         blank=True,
@@ -145,6 +209,32 @@ class ProductInstance(models.Model):
         indexes = [models.Index(fields=['id', 'slug'])]
 
 
+class ProductPopularity(models.Model):
+    """
+    Рейтинг популярных продуктов, рассчитанный заранее (см. service.refresh_popular_products).
+    Блоки популярных продуктов и баннеров читают первые позиции по индексу, а не сортируют каталог.
+    """
+    product = models.OneToOneField(
+        'ProductInstance',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity2',
+        verbose_name='Продукт'
+    )
+    position = models.PositiveIntegerField(unique=True, verbose_name='Позиция в рейтинге')
+    sort_index = models.PositiveIntegerField(verbose_name='Индекс сортировки при расчете')
+    number_of_purchases = models.PositiveIntegerField(verbose_name='Количество покупок при расчете')
+    refreshed_at = models.DateTimeField(auto_now=True, verbose_name='Дата расчета')
+
+    def __str__(self):
+        return f'{self.position}. {self.product}'
+
+    class Meta:
+        ordering = ('position',)
+        verbose_name = 'Популярный продукт'
+        verbose_name_plural = 'Рейтинг популярных продуктов'
+
+
 class PropertyTypeProduct(models.Model):
     """
     Модель названия характеристики продукта
@@ -218,7 +308,7 @@ class PropertyInstanceProduct(models.Model):
         return self.value
 
 
-class ProductImages(models.Model):
+class ProductImages(ImageRenditionsMixin, models.Model):
     """
     Модель изображения для магазина
     """
@@ -246,6 +336,17 @@ class ProductImages(models.Model):
         related_name='images2',
         verbose_name='Продукт'
     )
+    renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Варианты изображения'  # Заполняется app_products.images после сохранения
+    )
+    rendition_sizes = {
+        'thumbnail': (100, 100),
+        'card': (300, 300),  # Размер, до которого раньше уменьшался оригинал
+        'full': (1200, 1200),
+    }
 
     def __str__(self):
         return f'{self.product}'
@@ -259,16 +360,8 @@ class ProductImages(models.Model):
         if self.src and hasattr(self.src, 'url'):
             return self.src.url
 
-    def save(self, *args, **kwargs) -> None:
-        super().save()
-        img = Image.open(self.src.path)
-        if img.height > 300 or img.width > 300:
-            output_size = (300, 300)
-            img.thumbnail(output_size)
-            img.save(self.src.path)
 
-
-class CategoryImages(models.Model):
+class CategoryImages(ImageRenditionsMixin, models.Model):
     """
     Модель изображения для категории
     """
@@ -287,6 +380,17 @@ class CategoryImages(models.Model):
         default=None,
         verbose_name='Альтернативная строка изображения продукта'
     )
+    renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Варианты изображения'  # Заполняется app_products.images после сохранения
+    )
+    rendition_sizes = {
+        'thumbnail': (25, 25),  # Размер, до которого раньше уменьшался оригинал
+        'card': (100, 100),
+        'full': (400, 400),
+    }
 
     def __str__(self) -> str:
         return f'{self.alt}'
@@ -300,14 +404,6 @@ class CategoryImages(models.Model):
         if self.src and hasattr(self.src, 'url'):
             return self.src.url
 
-    def save(self, *args, **kwargs) -> None:
-        super().save()
-        img = Image.open(self.src.path)
-        if img.height > 25 or img.width > 25:
-            output_size = (25, 25)
-            img.thumbnail(output_size)
-            img.save(self.src.path)
-
 
 class Rate(models.Model):
     """
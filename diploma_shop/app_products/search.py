@@ -0,0 +1,257 @@
+import re
+from collections import Counter
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.query import QuerySet
+from django.utils.module_loading import import_string
+from typing import Dict, Iterable, List, Optional
+
+from .models import ProductInstance, PropertyInstanceProduct
+from .service import get_cache_version, bump_cache_version
+
+SEARCH_BATCH_SIZE = 1000  # Количество продуктов, документы которых пересчитываются за один проход
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Разбивает текст на слова в нижнем регистре.
+
+    Parameters:
+    - text (str): Исходный текст.
+
+    Returns:
+    - List[str]: Список слов.
+    """
+    return TOKEN_RE.findall(text.lower().replace('ё', 'е'))
+
+
+def build_search_documents(product_ids: List[int]) -> Dict[int, str]:
+    """
+    Собирает поисковые документы продуктов из названия, описания, тегов и значений характеристик
+    тремя запросами, независимо от количества продуктов.
+
+    Parameters:
+    - product_ids (List[int]): Идентификаторы продуктов.
+
+    Returns:
+    - Dict[int, str]: Словарь {идентификатор продукта: поисковый документ}.
+    """
+    parts: Dict[int, List[str]] = {}
+    for product_id, title, description in ProductInstance.objects.filter(id__in=product_ids).order_by() \
+            .values_list('id', 'title', 'description'):
+        parts[product_id] = [title or '', description or '']
+    for product_id, tag in ProductInstance.tags.through.objects.filter(productinstance_id__in=parts) \
+            .values_list('productinstance_id', 'tag__name'):
+        parts[product_id].append(tag or '')
+    for product_id, value in PropertyInstanceProduct.objects.filter(product_id__in=parts).order_by() \
+            .values_list('product_id', 'value'):
+        parts[product_id].append(value or '')
+    return {product_id: ' '.join(tokenize(' '.join(texts))) for product_id, texts in parts.items()}
+
+
+def update_search_documents(product_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Пересчитывает поле search_document продуктов и обновляет поисковый индекс.
+
+    Parameters:
+    - product_ids (Optional[Iterable[int]]): Идентификаторы продуктов; если не переданы - все продукты.
+
+    Returns:
+    - int: Количество обновленных продуктов.
+    """
+    if product_ids is None:
+        product_ids = ProductInstance.objects.order_by('id').values_list('id', flat=True).iterator()
+    backend = get_search_backend()
+    batch: List[int] = []
+    updated = 0
+    for product_id in product_ids:
+        batch.append(product_id)
+        if len(batch) == SEARCH_BATCH_SIZE:
+            updated += _update_batch(backend, batch)
+            batch = []
+    if batch:
+        updated += _update_batch(backend, batch)
+    return updated
+
+
+def _update_batch(backend: 'BaseSearchBackend', product_ids: List[int]) -> int:
+    documents = build_search_documents(product_ids)
+    # bulk_update не отправляет сигналы post_save, поэтому повторной индексации не происходит
+    ProductInstance.objects.bulk_update(
+        [ProductInstance(id=product_id, search_document=document) for product_id, document in documents.items()],
+        ['search_document'],
+    )
+    backend.index(documents)
+    return len(documents)
+
+
+class BaseSearchBackend:
+    """
+    Базовый класс поискового индекса продуктов.
+
+    Methods:
+    - search(): Фильтрует набор данных по поисковому запросу и аннотирует релевантность.
+    - index(): Обновляет документы продуктов в индексе.
+    - remove(): Удаляет продукты из индекса.
+    """
+
+    def search(self, queryset: QuerySet, query: str, rank: Optional[str] = 'search_rank') -> QuerySet:
+        """
+        Parameters:
+        - queryset (QuerySet): Набор данных продуктов.
+        - query (str): Поисковый запрос.
+        - rank (Optional[str]): Имя аннотации релевантности; None - только фильтрация.
+
+        Returns:
+        - QuerySet: Отфильтрованный набор данных.
+        """
+        raise NotImplementedError
+
+    def index(self, documents: Dict[int, str]) -> None:
+        pass
+
+    def remove(self, product_ids: Iterable[int]) -> None:
+        pass
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Поиск средствами PostgreSQL: полнотекстовый поиск по search_document (tsvector с GIN-индексом),
+    поиск по сходству триграмм в названии (pg_trgm) для опечаток и поиск по частям слов - каждое слово
+    запроса входит в search_document (LIKE с триграммным GIN-индексом), как в InMemorySearchBackend.
+    Индексы создаются миграциями, поэтому index() и remove() ничего не делают.
+    """
+    config = 'russian'  # Конфигурация полнотекстового поиска, совпадает с GIN-индексом миграции
+
+    def __init__(self) -> None:
+        # Модули django.contrib.postgres требуют psycopg, поэтому импортируются только для PostgreSQL
+        from django.contrib.postgres.lookups import TrigramSimilar
+        from django.db.models import CharField
+        CharField.register_lookup(TrigramSimilar)
+
+    def search(self, queryset: QuerySet, query: str, rank: Optional[str] = 'search_rank') -> QuerySet:
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+
+        vector = SearchVector('search_document', config=self.config)
+        search_query = SearchQuery(query, config=self.config, search_type='websearch')
+        # search_document уже в нижнем регистре (tokenize), поэтому используется contains, а не icontains:
+        # UPPER() в условии не позволил бы использовать триграммный индекс
+        partial = Q()
+        for token in set(tokenize(query)):
+            partial &= Q(search_document__contains=token)
+        condition = Q(search_vector=search_query) | Q(title__trigram_similar=query)
+        if partial:
+            condition |= partial
+        queryset = queryset.alias(search_vector=vector).filter(condition)
+        if rank:
+            queryset = queryset.annotate(**{
+                rank: SearchRank(vector, search_query) + TrigramSimilarity('title', query)
+            })
+        return queryset
+
+
+class InMemorySearchBackend(BaseSearchBackend):
+    """
+    Инвертированный индекс в памяти процесса для SQLite и тестов.
+
+    Индекс строится из search_document при первом поиске и перестраивается, когда другой процесс
+    меняет версию пространства имен кэша 'search'. Слово запроса совпадает со словом документа,
+    если входит в него (как icontains), релевантность - сумма частот совпавших слов.
+    """
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, Dict[int, int]] = {}  # {слово: {идентификатор продукта: частота}}
+        self.documents: Dict[int, Counter] = {}  # {идентификатор продукта: частоты слов}
+        self.version: Optional[int] = None
+
+    def ensure_index(self) -> None:
+        version = get_cache_version('search')
+        if version == self.version:
+            return
+        self.postings, self.documents = {}, {}
+        for product_id, document in ProductInstance.objects.order_by().values_list('id', 'search_document') \
+                .iterator():
+            self.add_document(product_id, document)
+        self.version = version
+
+    def add_document(self, product_id: int, document: str) -> None:
+        counts = Counter(tokenize(document or ''))
+        self.documents[product_id] = counts
+        for term, frequency in counts.items():
+            self.postings.setdefault(term, {})[product_id] = frequency
+
+    def discard_document(self, product_id: int) -> None:
+        for term in self.documents.pop(product_id, ()):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(product_id, None)
+                if not postings:
+                    del self.postings[term]
+
+    def index(self, documents: Dict[int, str]) -> None:
+        in_sync = self.version is not None and self.version == get_cache_version('search')
+        bump_cache_version('search')  # Остальные процессы перестроят индекс при следующем поиске
+        if not in_sync:
+            self.version = None
+            return
+        for product_id, document in documents.items():
+            self.discard_document(product_id)
+            self.add_document(product_id, document)
+        self.version = get_cache_version('search')
+
+    def remove(self, product_ids: Iterable[int]) -> None:
+        self.index({})
+        for product_id in product_ids:
+            self.discard_document(product_id)
+
+    def match(self, query: str) -> Dict[int, int]:
+        """
+        Возвращает продукты, в документах которых есть все слова запроса, с их релевантностью.
+        """
+        self.ensure_index()
+        scores: Optional[Dict[int, int]] = None
+        for token in set(tokenize(query)):
+            token_scores: Dict[int, int] = {}
+            for term, postings in self.postings.items():
+                if token in term:
+                    for product_id, frequency in postings.items():
+                        token_scores[product_id] = token_scores.get(product_id, 0) + frequency
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {product_id: score + token_scores[product_id]
+                          for product_id, score in scores.items() if product_id in token_scores}
+        return scores or {}
+
+    def search(self, queryset: QuerySet, query: str, rank: Optional[str] = 'search_rank') -> QuerySet:
+        scores = self.match(query)
+        queryset = queryset.filter(id__in=list(scores))
+        if rank:
+            queryset = queryset.annotate(**{rank: Case(
+                *[When(id=product_id, then=Value(float(score))) for product_id, score in scores.items()],
+                default=Value(0.0),
+                output_field=FloatField(),
+            )})
+        return queryset
+
+
+_search_backend: Optional[BaseSearchBackend] = None
+
+
+def get_search_backend() -> BaseSearchBackend:
+    """
+    Возвращает поисковый индекс, заданный настройкой PRODUCT_SEARCH_BACKEND; если она не задана -
+    PostgresSearchBackend для PostgreSQL и InMemorySearchBackend для остальных СУБД.
+    """
+    global _search_backend
+    if _search_backend is None:
+        path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+        if path:
+            _search_backend = import_string(path)()
+        elif connection.vendor == 'postgresql':
+            _search_backend = PostgresSearchBackend()
+        else:
+            _search_backend = InMemorySearchBackend()
+    return _search_backend
@@ -1,6 +1,8 @@
+from django.db.models.query import QuerySet
 from rest_framework import serializers, request, exceptions
-from typing import List, Any, Union
+from typing import List, Any, Union, Optional, Dict, Iterable, Tuple
 
+from .images import get_rendition_url
 from .models import Review, ProductImages, CategoryImages, Tag, Category, ProductInstance, \
     PropertyTypeProduct, PropertyInstanceProduct
 from app_users.models import User
@@ -44,7 +46,7 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
             text=validated_data.get('text', None),
             rate=validated_data.get('rate', None),
             defaults={'rate': validated_data.get('rate')}
-        )
+        )  # Хранимые количество отзывов и рейтинг продукта пересчитываются сигналом post_save
 
         return review
 
@@ -81,10 +83,43 @@ class ReviewSerializer(serializers.ModelSerializer):
         )
 
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class RenditionImageField(serializers.ImageField):
+    """
+    URL варианта изображения (app_products.images), выбранного родительским сериализатором.
+    Пока вариант не построен, возвращается URL оригинала.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        kwargs.setdefault('source', '*')  # Нужен весь объект изображения, а не только файл
+        kwargs.setdefault('read_only', True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value: Any) -> Optional[str]:
+        url = value.rendition_url(getattr(self.parent, 'rendition', None))
+        if url is None:
+            return None
+        request = self.context.get('request', None)
+        if request is not None:  # Абсолютный URL, как у ImageField
+            return request.build_absolute_uri(url)
+        return url
+
+
+class RenditionSerializerMixin:
+    """
+    Принимает аргумент rendition - имя варианта изображения для поля src (None - оригинал)
+    """
+    default_rendition: Optional[str] = None
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.rendition = kwargs.pop('rendition', self.default_rendition)
+        super().__init__(*args, **kwargs)
+
+
+class ProductImageSerializer(RenditionSerializerMixin, serializers.ModelSerializer):
     """
     Вывод изображений продукта
     """
+    src = RenditionImageField()
 
     class Meta:
         model = ProductImages
@@ -94,10 +129,12 @@ class ProductImageSerializer(serializers.ModelSerializer):
         )
 
 
-class CategoryImageSerializer(serializers.ModelSerializer):
+class CategoryImageSerializer(RenditionSerializerMixin, serializers.ModelSerializer):
     """
     Вывод изображений категории
     """
+    default_rendition = 'thumbnail'
+    src = RenditionImageField()
 
     class Meta:
         model = CategoryImages
@@ -138,12 +175,183 @@ class CategorySerializer(serializers.ModelSerializer):
         )
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+PRICE_FIELD = serializers.DecimalField(max_digits=10, decimal_places=2)  # Как поле price ModelSerializer
+PRODUCT_DATE_FIELD = serializers.DateTimeField(format='%a %b %d %Y %H:%M:%S GMT%z (%Z)')
+
+
+def get_flat_rows(data: Iterable[Any], fields: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Строки для плоской сериализации: словари из .values() используются как есть, а у объектов
+    модели значения полей берутся из атрибутов.
+
+    Parameters:
+    - data (Iterable[Any]): Строки .values() или объекты модели.
+    - fields (Iterable[str]): Поля строки.
+
+    Returns:
+    - List[Dict[str, Any]]: Список строк.
+    """
+    rows = list(data)
+    if rows and not isinstance(rows[0], dict):
+        rows = [{field: getattr(obj, field) for field in fields} for obj in rows]
+    return rows
+
+
+def product_images_rows(product_ids: List[int]) -> QuerySet:
+    """
+    Строки изображений продуктов (product_id, src, alt, renditions) для group_product_images.
+    """
+    return ProductImages.objects.filter(product_id__in=product_ids).order_by('id') \
+        .values_list('product_id', 'src', 'alt', 'renditions')
+
+
+def group_product_images(rows: Iterable[Tuple[Any, ...]], rendition: Optional[str],
+                         request: Optional[request.Request] = None) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Группирует строки изображений (product_images_rows) по продуктам в формате ProductImageSerializer.
+
+    Parameters:
+    - rows (Iterable[Tuple[Any, ...]]): Строки изображений.
+    - rendition (Optional[str]): Имя варианта изображения; None - оригинал.
+    - request (Optional[Request]): Запрос для построения абсолютных URL, как у ImageField.
+
+    Returns:
+    - Dict[int, List[Dict[str, Any]]]: Словарь {id продукта: список изображений}.
+    """
+    storage = ProductImages._meta.get_field('src').storage
+    images: Dict[int, List[Dict[str, Any]]] = {}
+    for product_id, source, alt, renditions in rows:
+        url = get_rendition_url(storage, source, renditions, rendition)
+        if url is not None and request is not None:
+            url = request.build_absolute_uri(url)
+        images.setdefault(product_id, []).append({'src': url, 'alt': alt})
+    return images
+
+
+def load_product_images(product_ids: List[int], rendition: Optional[str],
+                        request: Optional[request.Request] = None) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Изображения продуктов одним запросом в формате ProductImageSerializer (см. group_product_images).
+    """
+    return group_product_images(product_images_rows(product_ids), rendition, request)
+
+
+async def aload_product_images(product_ids: List[int], rendition: Optional[str],
+                               request: Optional[request.Request] = None) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Асинхронный аналог load_product_images.
+    """
+    return group_product_images([row async for row in product_images_rows(product_ids)], rendition, request)
+
+
+def product_tags_rows(product_ids: List[int]) -> QuerySet:
+    """
+    Строки тегов продуктов (id продукта, имя тега) для group_product_tags.
+    """
+    return ProductInstance.tags.through.objects.filter(productinstance_id__in=product_ids) \
+        .order_by('tag_id').values_list('productinstance_id', 'tag__name')
+
+
+def group_product_tags(rows: Iterable[Tuple[int, str]]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Группирует строки тегов (product_tags_rows) по продуктам в формате TagSerializer.
+
+    Parameters:
+    - rows (Iterable[Tuple[int, str]]): Строки тегов.
+
+    Returns:
+    - Dict[int, List[Dict[str, Any]]]: Словарь {id продукта: список тегов}.
+    """
+    tags: Dict[int, List[Dict[str, Any]]] = {}
+    for product_id, name in rows:
+        tags.setdefault(product_id, []).append({'name': name})
+    return tags
+
+
+def load_product_tags(product_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Теги продуктов одним запросом в формате TagSerializer.
+    """
+    return group_product_tags(product_tags_rows(product_ids))
+
+
+async def aload_product_tags(product_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
     """
-    Список продуктов
+    Асинхронный аналог load_product_tags.
+    """
+    return group_product_tags([row async for row in product_tags_rows(product_ids)])
+
+
+class FlatListSerializer(serializers.ListSerializer):
+    """
+    Сериализатор списка только для чтения: словари ответа строятся напрямую из строк .values()
+    и изображений и тегов, загруженных отдельными запросами для всей страницы, без вызова полей DRF
+    для каждого элемента. Результат совпадает с сериализацией каждого элемента дочерним сериализатором.
+
+    Дочерний сериализатор задает:
+    - flat_fields (Tuple[str, ...]): Поля для .values().
+    - load_flat_related(product_ids): Загрузка связанных данных страницы.
+    - to_flat_representation(row, related): Представление одной строки.
+
+    Асинхронные представления загружают связанные данные заранее (aload_flat_related дочернего
+    сериализатора) и передают их в контексте flat_related: при сериализации запросов к БД нет.
+    """
+
+    def to_representation(self, data: Any) -> List[Dict[str, Any]]:
+        rows = get_flat_rows(data, self.child.flat_fields)
+        related = self.context.get('flat_related')
+        if related is None:
+            related = self.child.load_flat_related([row['id'] for row in rows])
+        return [self.child.to_flat_representation(row, related) for row in rows]
+
+
+class FlatProductListMixin:
+    """
+    Плоская сериализация полей ProductListSerializer (см. FlatListSerializer)
+    """
+    flat_fields: Tuple[str, ...] = (
+        'id', 'category_id', 'price', 'count', 'date', 'title', 'description', 'freeDelivery',
+        'reviews_count', 'average_rating',
+    )
+    flat_rendition: Optional[str] = 'card'
+
+    def load_flat_related(self, product_ids: List[int]) -> Dict[str, Dict[int, List[Dict[str, Any]]]]:
+        return {
+            'images': load_product_images(product_ids, self.flat_rendition, self.context.get('request')),
+            'tags': load_product_tags(product_ids),
+        }
+
+    async def aload_flat_related(self, product_ids: List[int]) -> Dict[str, Dict[int, List[Dict[str, Any]]]]:
+        return {
+            'images': await aload_product_images(product_ids, self.flat_rendition, self.context.get('request')),
+            'tags': await aload_product_tags(product_ids),
+        }
+
+    def to_flat_representation(self, row: Dict[str, Any], related: Dict[str, Any]) -> Dict[str, Any]:
+        product_id = row['id']
+        price, date, rating = row['price'], row['date'], row['average_rating']
+        return {
+            'id': product_id,
+            'category': row['category_id'],
+            'price': None if price is None else PRICE_FIELD.to_representation(price),
+            'count': row['count'],
+            'date': None if date is None else PRODUCT_DATE_FIELD.to_representation(date),
+            'title': row['title'],
+            'description': row['description'],
+            'freeDelivery': row['freeDelivery'],
+            'images': related['images'].get(product_id, []),
+            'tags': related['tags'].get(product_id, []),
+            'reviews': row['reviews_count'],
+            'rating': None if rating is None else float(rating),
+        }
+
+
+class ProductListSerializer(FlatProductListMixin, serializers.ModelSerializer):
+    """
+    Список продуктов; список сериализуется FlatListSerializer из строк .values(*flat_fields)
     """
     tags = TagSerializer(many=True, read_only=True)
-    images = ProductImageSerializer(source='images2', many=True, read_only=True)
+    images = ProductImageSerializer(source='images2', many=True, read_only=True, rendition='card')
     reviews = serializers.IntegerField(source='reviews_count')
     rating = serializers.FloatField(source='average_rating', read_only=True)
     date = serializers.DateTimeField(format='%a %b %d %Y %H:%M:%S GMT%z (%Z)')
@@ -164,13 +372,14 @@ class ProductListSerializer(serializers.ModelSerializer):
             'reviews',
             'rating',
         )
+        list_serializer_class = FlatListSerializer
 
 
 class ProductSalesSerializer(serializers.ModelSerializer):
     """
     Список продуктов для распродажи
     """
-    images = ProductImageSerializer(source='images2', many=True, read_only=True)
+    images = ProductImageSerializer(source='images2', many=True, read_only=True, rendition='card')
     id = serializers.SlugField(read_only=True)
     price = serializers.DecimalField(max_digits=10, decimal_places=2)
     salePrice = serializers.DecimalField(max_digits=10, decimal_places=2)
@@ -183,6 +392,24 @@ class ProductSalesSerializer(serializers.ModelSerializer):
     def get_dateTo(self, obj) -> str:
         return obj.dateTo.strftime("%m-%d")
 
+    # Плоская сериализация списка (см. FlatListSerializer)
+    flat_fields: Tuple[str, ...] = ('id', 'price', 'salePrice', 'dateFrom', 'dateTo', 'title')
+
+    def load_flat_related(self, product_ids: List[int]) -> Dict[str, Dict[int, List[Dict[str, Any]]]]:
+        return {'images': load_product_images(product_ids, 'card', self.context.get('request'))}
+
+    def to_flat_representation(self, row: Dict[str, Any], related: Dict[str, Any]) -> Dict[str, Any]:
+        price, sale_price = row['price'], row['salePrice']
+        return {
+            'id': str(row['id']),
+            'price': None if price is None else PRICE_FIELD.to_representation(price),
+            'salePrice': None if sale_price is None else PRICE_FIELD.to_representation(sale_price),
+            'dateFrom': row['dateFrom'].strftime("%m-%d"),
+            'dateTo': row['dateTo'].strftime("%m-%d"),
+            'title': row['title'],
+            'images': related['images'].get(row['id'], []),
+        }
+
     class Meta:
         model = ProductInstance
         fields = (
@@ -194,6 +421,7 @@ class ProductSalesSerializer(serializers.ModelSerializer):
             'title',
             'images',
         )
+        list_serializer_class = FlatListSerializer
 
 
 class PropertyTypeProductSerializer(serializers.ModelSerializer):
@@ -231,7 +459,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     """
     tags = TagSerializer(many=True)
     reviews = ReviewSerializer(source='reviews2', many=True)
-    images = ProductImageSerializer(source='images2', many=True, read_only=True)
+    images = ProductImageSerializer(source='images2', many=True, read_only=True, rendition='full')
     specifications = PropertyInstanceProductSerializer(source='specifications2', many=True)
     rating = serializers.FloatField(source='average_rating', read_only=True)
     date = serializers.DateTimeField(format='%a %b %d %Y %H:%M:%S GMT%z (%Z)')
@@ -1,4 +1,17 @@
+import base64
+import hashlib
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Paginator
+from django.db import transaction
+from django.db.models import F, Prefetch, Q, Window
+from django.db.models.functions import RowNumber
 from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
@@ -6,10 +19,320 @@ from rest_framework.request import Request
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import FilterSet, CharFilter
 from django_filters import rest_framework as filters
-from django.core.exceptions import FieldError
-from typing import List, Union, Any, Dict
+from django.core.exceptions import EmptyResultSet, FieldError, ValidationError
+from typing import List, Union, Any, Dict, Optional, Tuple, Callable, Awaitable
 
-from .models import ProductInstance
+from .models import ProductInstance, ProductPopularity, Category, PropertyInstanceProduct, Review
+
+
+def get_cache_version(namespace: str = 'catalog') -> int:
+    """
+    Возвращает текущую версию данных пространства имен кэша.
+
+    Parameters:
+    - namespace (str): Пространство имен кэша.
+
+    Returns:
+    - int: Версия данных.
+    """
+    key = f'{namespace}:version'
+    version = cache.get(key)
+    if version is None:
+        # Начальная версия зависит от времени, чтобы после вытеснения ключа не совпасть со старой
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_cache_version(namespace: str = 'catalog') -> int:
+    """
+    Асинхронный аналог get_cache_version.
+    """
+    key = f'{namespace}:version'
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, int(time.time() * 1000), None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_cache_version(namespace: str = 'catalog') -> None:
+    """
+    Увеличивает версию данных пространства имен кэша, делая недействительными все его записи.
+
+    Parameters:
+    - namespace (str): Пространство имен кэша.
+    """
+    key = f'{namespace}:version'
+    try:
+        cache.incr(key)
+    except ValueError:  # Ключа версии нет в кэше
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def get_or_set_versioned(name: str, build: Callable[[], Any], namespace: str = 'catalog') -> Any:
+    """
+    Возвращает сериализованные данные из кэша по текущей версии или строит и сохраняет их.
+
+    Parameters:
+    - name (str): Имя записи кэша.
+    - build (Callable[[], Any]): Функция, строящая сериализованные данные при отсутствии записи.
+    - namespace (str): Пространство имен кэша.
+
+    Returns:
+    - Any: Сериализованные данные.
+    """
+    key = f'{namespace}:{get_cache_version(namespace)}:{name}'
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60 * 24))
+    return data
+
+
+async def aget_or_set_versioned(name: str, build: Callable[[], Awaitable[Any]], namespace: str = 'catalog') -> Any:
+    """
+    Асинхронный аналог get_or_set_versioned: ключи записей те же, поэтому синхронные и асинхронные
+    представления используют общий кэш.
+
+    Parameters:
+    - name (str): Имя записи кэша.
+    - build (Callable[[], Awaitable[Any]]): Корутинная функция, строящая данные при отсутствии записи.
+    - namespace (str): Пространство имен кэша.
+
+    Returns:
+    - Any: Сериализованные данные.
+    """
+    key = f'{namespace}:{await aget_cache_version(namespace)}:{name}'
+    data = await cache.aget(key)
+    if data is None:
+        data = await build()
+        await cache.aset(key, data, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60 * 24))
+    return data
+
+
+POPULAR_ORDERING = ('-sort_index', '-number_of_purchases', 'id')  # Сортировка рейтинга популярных продуктов
+
+
+def refresh_popular_products(limit: Optional[int] = None) -> int:
+    """
+    Пересчитывает рейтинг популярных продуктов (ProductPopularity) в одной транзакции:
+    читатели видят старый рейтинг, пока новый не будет зафиксирован.
+
+    Parameters:
+    - limit (Optional[int]): Количество позиций рейтинга; по умолчанию - настройка POPULAR_PRODUCTS_LIMIT.
+
+    Returns:
+    - int: Количество позиций рейтинга.
+    """
+    limit = limit or getattr(settings, 'POPULAR_PRODUCTS_LIMIT', 100)
+    rows = ProductInstance.objects.filter_and_annotate().order_by(*POPULAR_ORDERING) \
+        .values_list('id', 'sort_index', 'number_of_purchases')[:limit]
+    with transaction.atomic():
+        ProductPopularity.objects.all().delete()
+        created = ProductPopularity.objects.bulk_create([
+            ProductPopularity(product_id=product_id, position=position, sort_index=sort_index or 0,
+                              number_of_purchases=purchases or 0)
+            for position, (product_id, sort_index, purchases) in enumerate(rows, start=1)
+        ])
+    bump_cache_version('catalog')
+    return len(created)
+
+
+def get_popular_products(limit: int, fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """
+    Первые позиции рейтинга популярных продуктов - выборка по индексу позиции.
+    Пока рейтинг не рассчитан, продукты сортируются по POPULAR_ORDERING.
+
+    Parameters:
+    - limit (int): Количество продуктов.
+    - fields (Tuple[str, ...]): Поля строк .values().
+
+    Returns:
+    - List[Dict[str, Any]]: Строки продуктов.
+    """
+    queryset = ProductInstance.objects.filter_and_annotate()
+    rows = list(queryset.filter(popularity2__isnull=False).order_by('popularity2__position').values(*fields)[:limit])
+    if not rows:
+        rows = list(queryset.order_by(*POPULAR_ORDERING).values(*fields)[:limit])
+    return rows
+
+
+async def aget_popular_products(limit: int, fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """
+    Асинхронный аналог get_popular_products.
+    """
+    queryset = ProductInstance.objects.filter_and_annotate()
+    ranked = queryset.filter(popularity2__isnull=False).order_by('popularity2__position').values(*fields)[:limit]
+    rows = [row async for row in ranked]
+    if not rows:
+        rows = [row async for row in queryset.order_by(*POPULAR_ORDERING).values(*fields)[:limit]]
+    return rows
+
+
+def get_reviews_page(request: Request) -> int:
+    """
+    Номер страницы отзывов карточки продукта из параметра reviewsPage; некорректное значение - первая страница.
+    """
+    try:
+        return max(1, int(request.query_params.get('reviewsPage', 1)))
+    except (TypeError, ValueError):
+        return 1
+
+
+def product_detail_queryset(pk: int, reviews_page: int = 1) -> QuerySet:
+    """
+    Продукт для ProductDetailSerializer: продукт загружается одним запросом, а теги, изображения,
+    страница отзывов (с авторами) и характеристики (с названиями) - фиксированным набором запросов
+    prefetch_related, независимо от количества отзывов и характеристик.
+
+    Parameters:
+    - pk (int): Идентификатор продукта.
+    - reviews_page (int): Номер страницы отзывов (PRODUCT_REVIEWS_PAGE_SIZE отзывов на странице).
+
+    Returns:
+    - QuerySet: Набор данных продукта с предзагрузкой связанных данных.
+    """
+    page_size = getattr(settings, 'PRODUCT_REVIEWS_PAGE_SIZE', 20)
+    offset = (reviews_page - 1) * page_size
+    # Срез в Prefetch поддерживается только с Django 5.0, поэтому страница выбирается по номеру строки
+    # оконной функции (сортировка Review по -date, при равных датах - по -id).
+    # Оценка сериализуется по rate_id, поэтому Rate не присоединяется
+    reviews = Review.objects.select_related('author').annotate(
+        position=Window(RowNumber(), partition_by=F('product_id'), order_by=[F('date').desc(), F('id').desc()]),
+    ).filter(position__gt=offset, position__lte=offset + page_size).order_by('-date', '-id')
+    return ProductInstance.objects.filter_and_annotate(product_ids=[pk]).prefetch_related(
+        'tags',
+        'images2',
+        Prefetch('reviews2', queryset=reviews),
+        Prefetch('specifications2', queryset=PropertyInstanceProduct.objects.select_related('name')),
+    )
+
+
+def category_tree_queryset() -> QuerySet:
+    return Category.objects.select_related('image').order_by('id')
+
+
+def build_category_tree(categories: Optional[List[Category]] = None) -> List[Dict[str, Any]]:
+    """
+    Строит дерево категорий в памяти по одному запросу к БД (категории вместе с изображениями).
+
+    Parameters:
+    - categories (Optional[List[Category]]): Категории из category_tree_queryset(); если не переданы - загружаются.
+
+    Returns:
+    - List[Dict[str, Any]]: Корневые категории с вложенными подкатегориями.
+    """
+    if categories is None:
+        categories = list(category_tree_queryset())
+    nodes = {}
+    for category in categories:
+        image = category.image
+        nodes[category.id] = {
+            'id': category.id,
+            'title': category.title,
+            'image': {
+                'src': image.rendition_url('thumbnail'),  # Вариант, как в CategoryImageSerializer
+                'alt': image.alt,
+            } if image else None,
+            'subcategories': [],
+        }
+
+    tree = []
+    for category in categories:  # Привязываем каждую категорию к родителю, сохраняя порядок по id
+        if category.parent_id is None:
+            tree.append(nodes[category.id])
+        elif category.parent_id in nodes:
+            nodes[category.parent_id]['subcategories'].append(nodes[category.id])
+    return tree
+
+
+_category_tree_memo: Dict[str, Any] = {'version': None, 'tree': None}  # Дерево, построенное этим процессом
+
+
+def get_category_tree() -> List[Dict[str, Any]]:
+    """
+    Возвращает дерево категорий, запомненное до изменения Category или CategoryImages.
+
+    Returns:
+    - List[Dict[str, Any]]: Корневые категории с вложенными подкатегориями.
+    """
+    version = get_cache_version('categories')
+    if _category_tree_memo['version'] != version:
+        _category_tree_memo['tree'] = get_or_set_versioned('tree', build_category_tree, namespace='categories')
+        _category_tree_memo['version'] = version
+    return _category_tree_memo['tree']
+
+
+async def aget_category_tree() -> List[Dict[str, Any]]:
+    """
+    Асинхронный аналог get_category_tree (общие запомненное дерево и запись кэша).
+    """
+    async def build() -> List[Dict[str, Any]]:
+        return build_category_tree([category async for category in category_tree_queryset()])
+
+    version = await aget_cache_version('categories')
+    if _category_tree_memo['version'] != version:
+        _category_tree_memo['tree'] = await aget_or_set_versioned('tree', build, namespace='categories')
+        _category_tree_memo['version'] = version
+    return _category_tree_memo['tree']
+
+
+def count_cache_key(queryset: QuerySet) -> Optional[str]:
+    """
+    Ключ кэша количества элементов выборки по тексту SQL-запроса; None, если выборка заведомо пуста.
+    """
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()  # Сортировка не влияет на количество
+    except EmptyResultSet:  # Условие заведомо ложно (например, id__in=[]), запрос не нужен
+        return None
+    return 'products_count:' + hashlib.md5(repr((sql, params)).encode()).hexdigest()
+
+
+def get_cached_count(queryset: QuerySet) -> int:
+    """
+    Возвращает количество элементов выборки, кэшируя его по тексту SQL-запроса.
+
+    Parameters:
+    - queryset (QuerySet): Набор данных, количество элементов которого нужно получить.
+
+    Returns:
+    - int: Количество элементов выборки.
+    """
+    key = count_cache_key(queryset)
+    if key is None:
+        return 0
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, 'PRODUCTS_COUNT_CACHE_TIMEOUT', 60))
+    return count
+
+
+async def aget_cached_count(queryset: QuerySet) -> int:
+    """
+    Асинхронный аналог get_cached_count (общая запись кэша).
+    """
+    key = count_cache_key(queryset)
+    if key is None:
+        return 0
+    count = await cache.aget(key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(key, count, getattr(settings, 'PRODUCTS_COUNT_CACHE_TIMEOUT', 60))
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Пагинатор, не пересчитывающий COUNT(*) отфильтрованной выборки при каждом переходе по страницам.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        if isinstance(self.object_list, QuerySet):
+            return get_cached_count(self.object_list)
+        return len(self.object_list)
 
 
 class CustomPaginationProducts(PageNumberPagination):
@@ -20,10 +343,183 @@ class CustomPaginationProducts(PageNumberPagination):
     - page_size (int): Определение базового размера страницы.
     - page_query_param (str): Параметр запроса для указания текущей страницы.
     - max_page_size (int): Определение максимального размера страницы.
+    - cursor_query_param (str): Параметр запроса, включающий курсорный (keyset) режим.
+    - cursor_ordering_fields (tuple): Поля сортировки, поддерживаемые курсорным режимом.
     """
     page_size: int = 3  # Определение базового размера страницы
     page_query_param: str = 'currentPage'  # Параметр запроса для указания текущей страницы
     max_page_size: int = 20  # Определение максимального размера страницы
+    django_paginator_class = CachedCountPaginator  # Количество элементов кэшируется между страницами
+
+    # Курсорный (keyset) режим включается параметром cursor, например /catalog?cursor=&sort=price&sortType=inc
+    cursor_query_param: str = 'cursor'
+    cursor_ordering_fields: Tuple[str, ...] = ('price', 'rating', 'reviews_count', 'date')
+    cursor_default_ordering: str = 'date'
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> Optional[List[Any]]:
+        """
+        Возвращает элементы текущей страницы в постраничном или курсорном режиме. Если активная
+        сортировка не поддерживается курсорным режимом (например, по релевантности поиска),
+        используется постраничный режим.
+
+        Args:
+        - queryset (QuerySet): Набор данных для пагинации.
+        - request (Request): Объект запроса.
+        - view (Any): Вид представления.
+
+        Returns:
+        - Optional[List[Any]]: Элементы текущей страницы.
+        """
+        cursor_ordering = None
+        if self.cursor_query_param in request.query_params:
+            cursor_ordering = self.get_cursor_ordering(queryset)
+        self.cursor_mode = cursor_ordering is not None
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        field, descending = cursor_ordering
+        cursor = self.decode_cursor(request.query_params[self.cursor_query_param], field, descending)
+
+        # Общее количество считается по выборке без условия курсора и берется из кэша
+        self.cursor_count = get_cached_count(queryset)
+        self.cursor_page_number = cursor['page'] if cursor else 1
+
+        ordering = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+        # Значение поля сортировки аннотируется, так как в строках .values() его может не быть
+        queryset = queryset.annotate(cursor_value=F(field)).order_by(ordering, '-id' if descending else 'id')
+        if cursor:
+            queryset = queryset.filter(self.get_cursor_filter(field, descending, cursor['value'], cursor['id']))
+
+        results = list(queryset[:page_size + 1])  # Лишний элемент показывает наличие следующей страницы
+        self.next_cursor = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            last = results[-1]
+            if not isinstance(last, dict):  # Строки .values() (плоская сериализация) или объекты модели
+                last = {'cursor_value': last.cursor_value, 'id': last.id}
+            self.next_cursor = self.encode_cursor(field, descending, last['cursor_value'], last['id'],
+                                                  self.cursor_page_number + 1)
+        return results
+
+    async def apaginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> Optional[List[Any]]:
+        """
+        Асинхронный аналог paginate_queryset: в постраничном режиме количество и элементы страницы
+        загружаются асинхронным ORM, курсорный режим выполняется в потоке.
+
+        Args:
+        - queryset (QuerySet): Набор данных для пагинации.
+        - request (Request): Объект запроса.
+        - view (Any): Вид представления.
+
+        Returns:
+        - Optional[List[Any]]: Элементы текущей страницы.
+
+        Raises:
+        - NotFound: Некорректный номер страницы, как в PageNumberPagination.
+        """
+        if self.cursor_query_param in request.query_params and self.get_cursor_ordering(queryset) is not None:
+            return await sync_to_async(self.paginate_queryset)(queryset, request, view)
+
+        self.cursor_mode = False
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await aget_cached_count(queryset)  # Задается до номера страницы: 'last' зависит от него
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        bottom = (number - 1) * paginator.per_page  # Границы страницы, как в Paginator.page()
+        top = bottom + paginator.per_page
+        if top + paginator.orphans >= paginator.count:
+            top = paginator.count
+        rows = [row async for row in queryset[bottom:top]]
+        self.page = paginator._get_page(rows, number, paginator)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return rows
+
+    def get_cursor_ordering(self, queryset: QuerySet) -> Optional[Tuple[str, bool]]:
+        """
+        Определяет поле и направление активной сортировки набора данных. Без сортировки в запросе
+        используется сортировка модели, а если она не поддерживается - cursor_default_ordering.
+
+        Args:
+        - queryset (QuerySet): Набор данных.
+
+        Returns:
+        - Optional[Tuple[str, bool]]: Поле сортировки и признак сортировки по убыванию; None, если
+          сортировка запроса не поддерживается курсорным режимом.
+        """
+        explicit = bool(queryset.query.order_by)
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        item = ordering[0] if ordering else None
+        if isinstance(item, str) and item.lstrip('-') in self.cursor_ordering_fields:
+            return item.lstrip('-'), item.startswith('-')
+        if explicit:  # Например, сортировка по релевантности поиска (-search_rank)
+            return None
+        return self.cursor_default_ordering, False
+
+    @staticmethod
+    def get_cursor_filter(field: str, descending: bool, value: Any, last_id: int) -> Q:
+        """
+        Условие выборки элементов, следующих за курсором (значения NULL идут в конце).
+
+        Args:
+        - field (str): Поле сортировки.
+        - descending (bool): Признак сортировки по убыванию.
+        - value (Any): Значение поля сортировки у последнего элемента предыдущей страницы.
+        - last_id (int): Идентификатор последнего элемента предыдущей страницы.
+
+        Returns:
+        - Q: Условие фильтрации.
+        """
+        id_lookup = 'id__lt' if descending else 'id__gt'
+        if value is None:
+            return Q(**{f'{field}__isnull': True, id_lookup: last_id})
+        value_lookup = f'{field}__lt' if descending else f'{field}__gt'
+        return (
+            Q(**{value_lookup: value})
+            | Q(**{field: value, id_lookup: last_id})
+            | Q(**{f'{field}__isnull': True})
+        )
+
+    def encode_cursor(self, field: str, descending: bool, value: Any, last_id: int, page: int) -> str:
+        """
+        Кодирует сортировку и позицию последнего элемента страницы в строку курсора.
+        """
+        if value is not None and not isinstance(value, int):
+            value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        data = json.dumps({'f': field, 'd': descending, 'v': value, 'id': last_id, 'p': page})
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, encoded: str, field: str, descending: bool) -> Optional[Dict[str, Any]]:
+        """
+        Декодирует строку курсора. Пустой курсор или курсор другой сортировки означает первую страницу.
+
+        Raises:
+        - NotFound: Некорректный курсор.
+        """
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            if data['f'] != field or data.get('d') is not descending:  # Сортировка изменилась - первая страница
+                return None
+            value = data['v']
+            if value is not None:
+                value = ProductInstance._meta.get_field(field).to_python(value)
+            return {'value': value, 'id': int(data['id']), 'page': int(data['p'])}
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound('Invalid cursor')
 
     def get_paginated_response(self, data: List[Dict[str, Any]]) -> Response:
         """
@@ -36,6 +532,13 @@ class CustomPaginationProducts(PageNumberPagination):
         - Response: Ответ с пагинацией, содержащий текущие элементы страницы, номер текущей страницы
                     и общее количество элементов.
         """
+        if getattr(self, 'cursor_mode', False):
+            return Response({
+                'items': data,
+                'currentPage': self.cursor_page_number,
+                'lastPage': self.cursor_count,
+                'nextCursor': self.next_cursor,  # Курсор следующей страницы (None на последней)
+            })
         return Response({
             'items': data,  # Возвращает текущие элементы страницы
             'currentPage': self.page.number,  # Возвращает номер текущей страницы
@@ -125,6 +628,51 @@ class PrefixedBooleanFilter(filters.BooleanFilter):
         return super().filter(qs, value)  # Родительский метод filter() с примененными значениями фильтрации
 
 
+class PrefixedSearchFilter(filters.CharFilter):
+    """
+    Класс для поиска товаров через поисковый индекс (app_products.search).
+
+    Attributes:
+    - rank (Optional[str]): Имя аннотации релевантности; если задано и сортировка не указана в запросе,
+      результаты сортируются по релевантности. None - только фильтрация.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Инициализация нового атрибута rank к классу PrefixedSearchFilter.
+
+        Args:
+        - *args: Позиционные аргументы.
+        - **kwargs: Именованные аргументы.
+        """
+        self.rank = kwargs.pop('rank', 'search_rank')  # Забираем rank из аргументов
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs: QuerySet, value: str) -> QuerySet:
+        """
+        Метод фильтрации.
+
+        Args:
+        - qs (QuerySet): Набор данных для фильтрации.
+        - value (str): Значение фильтра.
+
+        Returns:
+        - QuerySet: Отфильтрованный набор данных.
+        """
+        from .search import get_search_backend  # search.py импортирует этот модуль
+
+        request = getattr(self.parent, 'request', None)
+        if request:
+            value = request.GET.get(f'filter[{self.field_name}]', None)  # Значение из filter[<имя фильтра>]
+        if not value or not value.strip():
+            return qs
+
+        qs = get_search_backend().search(qs, value, rank=self.rank)
+        if self.rank and not qs.query.order_by:  # Сортировка из запроса имеет приоритет над релевантностью
+            qs = qs.order_by(f'-{self.rank}', 'id')
+        return qs
+
+
 class ProductFilter(FilterSet):
     """
     Класс для фильтрации с параметрами фильтрации, например
@@ -136,8 +684,8 @@ class ProductFilter(FilterSet):
     - freeDelivery (PrefixedBooleanFilter): Фильтр для бесплатной доставки товара.
     - available (PrefixedBooleanFilter): Фильтр для доступности товара.
     - category (PrefixedNumberFilter): Фильтр для категории товара по идентификатору.
-    - property (CharFilter): Фильтр для характеристик товара по значению.
-    - name (CharFilter): Фильтр для поиска по названию товара без учета регистра символов.
+    - property (CharFilter): Поиск товара по поисковому индексу (значения характеристик, теги, название).
+    - name (CharFilter): Ранжированный поиск товара по поисковому индексу.
 
     Permissions:
     - permission_classes (list): Разрешения для доступа к фильтру.
@@ -148,8 +696,8 @@ class ProductFilter(FilterSet):
     freeDelivery = PrefixedBooleanFilter(field_name='freeDelivery')
     available = PrefixedBooleanFilter(field_name='available')
     category = PrefixedNumberFilter(field_name='category__id')
-    property = CharFilter(field_name='specifications__value', lookup_expr='icontains')  # поиск по вх. без учёта рег.
-    name = CharFilter(field_name='title', lookup_expr='icontains')  # поиск по вхождению без учёта регистра символов
+    property = PrefixedSearchFilter(field_name='property', rank=None)  # поиск по индексу без JOIN и дублей строк
+    name = PrefixedSearchFilter(field_name='name')  # поиск по индексу с ранжированием
 
     class Meta:
         model = ProductInstance
@@ -163,7 +711,7 @@ class CustomOrderingFilter(OrderingFilter):
     Attributes:
     - ordering_field_map (dict): Словарь для маппинга полей сортировки.
     """
-    # Словарь для маппинга полей сортировки
+    # Словарь для маппинга полей сортировки (reviews_count - хранимое индексированное поле модели)
     ordering_field_map = {
         'reviews': 'reviews_count'
     }
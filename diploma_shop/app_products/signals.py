@@ -0,0 +1,122 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from typing import Any
+
+from .images import renditions_ready
+from .models import ProductInstance, Review, Category, Tag, ProductImages, CategoryImages, PropertyInstanceProduct
+from .search import get_search_backend, update_search_documents
+from .service import bump_cache_version
+
+
+def bump_catalog_version(sender: Any, **kwargs: Any) -> None:
+    """
+    Делает недействительным кэш блоков главной страницы при изменении данных каталога.
+    """
+    bump_cache_version('catalog')
+
+
+def bump_categories_version(sender: Any, **kwargs: Any) -> None:
+    """
+    Делает недействительным запомненное дерево категорий.
+    """
+    bump_cache_version('categories')
+
+
+def refresh_product_review_stats(sender: Any, instance: Review, **kwargs: Any) -> None:
+    """
+    Пересчитывает хранимые количество отзывов и рейтинг продукта при создании, изменении или удалении
+    отзыва (в том числе в админке и каскадно при удалении пользователя).
+    """
+    if instance.product_id:
+        ProductInstance.objects.refresh_review_stats([instance.product_id])
+
+
+# Подключаются до сброса кэша каталога: закэшированные ответы строятся по уже пересчитанному рейтингу
+post_save.connect(refresh_product_review_stats, sender=Review, dispatch_uid='review_stats_save')
+post_delete.connect(refresh_product_review_stats, sender=Review, dispatch_uid='review_stats_delete')
+
+# Модели, от которых зависят закэшированные ответы каталога
+for model in (ProductInstance, Review, Category, Tag, ProductImages, CategoryImages):
+    post_save.connect(bump_catalog_version, sender=model, dispatch_uid=f'catalog_save_{model.__name__}')
+    post_delete.connect(bump_catalog_version, sender=model, dispatch_uid=f'catalog_delete_{model.__name__}')
+
+m2m_changed.connect(bump_catalog_version, sender=ProductInstance.tags.through, dispatch_uid='catalog_tags_changed')
+
+# Модели, от которых зависит дерево категорий
+for model in (Category, CategoryImages):
+    post_save.connect(bump_categories_version, sender=model, dispatch_uid=f'categories_save_{model.__name__}')
+    post_delete.connect(bump_categories_version, sender=model, dispatch_uid=f'categories_delete_{model.__name__}')
+
+# Варианты изображений строятся в фоне после сохранения, закэшированные ответы ссылаются на оригинал
+renditions_ready.connect(bump_catalog_version, sender=ProductImages, dispatch_uid='catalog_renditions_ProductImages')
+renditions_ready.connect(bump_catalog_version, sender=CategoryImages, dispatch_uid='catalog_renditions_CategoryImages')
+renditions_ready.connect(bump_categories_version, sender=CategoryImages, dispatch_uid='categories_renditions')
+
+
+def reindex_product(sender: Any, instance: ProductInstance, update_fields: Any = None, **kwargs: Any) -> None:
+    """
+    Обновляет поисковый документ продукта при изменении названия или описания.
+    """
+    if update_fields is None or {'title', 'description'} & set(update_fields):
+        update_search_documents([instance.pk])
+
+
+def unindex_product(sender: Any, instance: ProductInstance, **kwargs: Any) -> None:
+    """
+    Удаляет продукт из поискового индекса.
+    """
+    get_search_backend().remove([instance.pk])
+
+
+def reindex_product_tags(sender: Any, instance: Any, action: str, reverse: bool, pk_set: Any, **kwargs: Any) -> None:
+    """
+    Обновляет поисковые документы при изменении тегов продукта (с любой стороны связи).
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            update_search_documents([instance.pk])
+    elif action == 'pre_clear':
+        instance._search_product_ids = list(instance.tag2.values_list('id', flat=True))
+    elif action == 'post_clear':
+        update_search_documents(getattr(instance, '_search_product_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        update_search_documents(pk_set)
+
+
+def collect_tag_products(sender: Any, instance: Tag, **kwargs: Any) -> None:
+    """
+    Запоминает продукты тега до удаления: связи удаляются каскадно без сигнала m2m_changed.
+    """
+    instance._search_product_ids = list(instance.tag2.values_list('id', flat=True))
+
+
+def reindex_tag_products(sender: Any, instance: Tag, created: bool = False, **kwargs: Any) -> None:
+    """
+    Обновляет поисковые документы продуктов тега при изменении или удалении тега.
+    """
+    if created:
+        return
+    product_ids = getattr(instance, '_search_product_ids', None)
+    if product_ids is None:
+        product_ids = list(instance.tag2.values_list('id', flat=True))
+    update_search_documents(product_ids)
+
+
+def reindex_specification_product(sender: Any, instance: PropertyInstanceProduct, **kwargs: Any) -> None:
+    """
+    Обновляет поисковый документ продукта при изменении значения его характеристики.
+    """
+    if instance.product_id:
+        update_search_documents([instance.product_id])
+
+
+# Поисковый индекс продуктов (app_products.search)
+post_save.connect(reindex_product, sender=ProductInstance, dispatch_uid='search_save_product')
+post_delete.connect(unindex_product, sender=ProductInstance, dispatch_uid='search_delete_product')
+m2m_changed.connect(reindex_product_tags, sender=ProductInstance.tags.through, dispatch_uid='search_tags_changed')
+pre_delete.connect(collect_tag_products, sender=Tag, dispatch_uid='search_predelete_tag')
+post_save.connect(reindex_tag_products, sender=Tag, dispatch_uid='search_save_tag')
+post_delete.connect(reindex_tag_products, sender=Tag, dispatch_uid='search_delete_tag')
+post_save.connect(reindex_specification_product, sender=PropertyInstanceProduct,
+                  dispatch_uid='search_save_specification')
+post_delete.connect(reindex_specification_product, sender=PropertyInstanceProduct,
+                    dispatch_uid='search_delete_specification')
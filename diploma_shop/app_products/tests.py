@@ -1,3 +1,688 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from importlib import import_module
+from io import StringIO
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict
+from unittest import skipUnless
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import module_has_submodule
+from PIL import Image as PILImage
 
-# Create your tests here.
+from .models import ProductInstance, ProductImages, Tag, Rate, User, Category, Review, PropertyInstanceProduct, \
+    PropertyTypeProduct, CategoryImages
+from .search import InMemorySearchBackend, PostgresSearchBackend
+from .serializers import ProductImageSerializer, ProductListSerializer, ProductSalesSerializer, CategorySerializer
+from app_orders.models import Order
+from app_users.models import Profile
+
+PERF_BATCH_SIZE = 1000  # Размер пачки bulk_create при заполнении синтетического каталога
+with open(Path(settings.BASE_DIR) / 'performance_budgets.json', encoding='utf-8') as budgets_file:
+    PERF_BUDGETS = json.load(budgets_file)  # Бюджеты SQL-запросов и времени ответа эндпоинтов
+PERF_RESULTS: Dict[str, Dict[str, float]] = {}  # Измерения всех эндпоинтов за прогон
+
+
+class ProductListQueryCountTest(TestCase):
+    """
+    Количество запросов списков продуктов не зависит от количества продуктов на странице
+    """
+
+    def setUp(self) -> None:
+        cache.clear()  # Ответы блоков главной страницы кэшируются между запросами
+        self.tags = Tag.objects.bulk_create([Tag(name='tag1'), Tag(name='tag2')])
+
+    def create_products(self, count: int) -> None:
+        start = ProductInstance.objects.count()
+        now = timezone.now()
+        products = ProductInstance.objects.bulk_create([
+            ProductInstance(
+                title=f'Продукт {i}',
+                slug=f'product-{i}',
+                price=100 + i,
+                count=10,
+                dateFrom=now - timedelta(days=1),  # Продукт участвует в распродаже
+                dateTo=now + timedelta(days=1),
+            )
+            for i in range(start, start + count)
+        ])
+        # bulk_create не вызывает save(), поэтому обработка изображений PIL не выполняется
+        ProductImages.objects.bulk_create([
+            ProductImages(product=product, src=f'images/images_product/{product.slug}.jpg', alt=product.title)
+            for product in products
+            for _ in range(2)
+        ])
+        for product in products:
+            product.tags.set(self.tags)
+
+    def count_queries(self, url: str, params: dict = None) -> int:
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['items'] if isinstance(data, dict) else data)  # Страница не пустая
+        return len(queries)
+
+    def assert_constant_queries(self, url: str, page_size: int, params: dict = None) -> None:
+        self.create_products(1)
+        queries_for_one = self.count_queries(url, params)
+        self.create_products(page_size - 1)
+        queries_for_page = self.count_queries(url, params)
+        self.assertEqual(queries_for_one, queries_for_page)
+
+    def test_catalog(self) -> None:
+        self.assert_constant_queries(reverse('catalog'), page_size=3)
+
+    def test_catalog_cursor(self) -> None:
+        self.assert_constant_queries(reverse('catalog'), page_size=3, params={'cursor': ''})
+
+    def test_popular(self) -> None:
+        self.assert_constant_queries(reverse('products_popular'), page_size=8)
+
+    def test_limited(self) -> None:
+        self.assert_constant_queries(reverse('products_limited'), page_size=16)
+
+    def test_sales(self) -> None:
+        self.assert_constant_queries(reverse('sales'), page_size=3)
+
+
+class PerformanceBudgetTestCase(TestCase):
+    """
+    Базовый класс проверки бюджета SQL-запросов и времени ответа эндпоинтов.
+
+    Размер синтетического каталога задается переменными окружения PERF_PRODUCTS, PERF_REVIEWS
+    и PERF_CATEGORY_DEPTH (по умолчанию - небольшой каталог для быстрого прогона), допустимое
+    время умножается на PERF_TIME_FACTOR. Бюджеты хранятся в performance_budgets.json,
+    если задан PERF_REPORT, результаты измерений записываются в файл и выводятся после прогона.
+    """
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.results: Dict[str, Dict[str, float]] = {}  # Измерения эндпоинтов этого класса
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        call_command(
+            'generate_catalog',
+            products=int(os.environ.get('PERF_PRODUCTS', 300)),
+            reviews=int(os.environ.get('PERF_REVIEWS', 3000)),
+            category_depth=int(os.environ.get('PERF_CATEGORY_DEPTH', 4)),
+            users=50, orders=20, tags=20, batch_size=PERF_BATCH_SIZE, stdout=StringIO(),
+        )
+        cls.user = User.objects.create_user(username='perf_client', email='perf_client@example.com',
+                                            password='perf-password')
+        Profile.objects.create(user=cls.user, fullName='Иван Иванов')
+        cls.product = ProductInstance.objects.order_by('id').first()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        report = os.environ.get('PERF_REPORT')
+        if not report:
+            return
+        with open(report, 'w', encoding='utf-8') as file:
+            json.dump(PERF_RESULTS, file, ensure_ascii=False, indent=2)
+        for name, result in sorted(cls.results.items()):
+            print(f'{name}: {result["queries"]} запросов, {result["ms"]:.1f} мс')
+
+    def measure(self, name: str, method: str, url: str, **kwargs: Any) -> HttpResponse:
+        """
+        Выполняет запрос, записывает количество SQL-запросов и время ответа и сверяет их с бюджетом.
+        """
+        budget = PERF_BUDGETS['endpoints'][name]
+        cache.clear()  # Измеряем ответ без кэша
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(url, **kwargs)
+            elapsed = (time.perf_counter() - start) * 1000
+        self.results[name] = PERF_RESULTS[name] = {'queries': len(queries), 'ms': elapsed}
+
+        self.assertLess(response.status_code, 400, f'{name}: {response.status_code}')
+        self.assertLessEqual(
+            len(queries), budget['queries'],
+            f'{name}: {len(queries)} SQL-запросов при бюджете {budget["queries"]}'
+        )
+        time_budget = budget['ms'] * float(os.environ.get('PERF_TIME_FACTOR', 1))
+        self.assertLessEqual(elapsed, time_budget, f'{name}: {elapsed:.1f} мс при бюджете {time_budget} мс')
+        return response
+
+
+class ProductsPerformanceTest(PerformanceBudgetTestCase):
+    """
+    Бюджеты эндпоинтов app_products
+    """
+
+    def test_products_list(self) -> None:
+        self.measure('products_list', 'get', reverse('products_list'))
+
+    def test_categories(self) -> None:
+        self.measure('categories', 'get', reverse('categories'))
+
+    def test_catalog(self) -> None:
+        self.measure('catalog', 'get', reverse('catalog'), data={
+            'filter[name]': 'Продукт', 'filter[minPrice]': 0, 'filter[maxPrice]': 50000,
+            'currentPage': 2, 'sort': 'price', 'sortType': 'inc',
+        })
+
+    def test_catalog_cursor(self) -> None:
+        self.measure('catalog_cursor', 'get', reverse('catalog'), data={
+            'cursor': '', 'sort': 'reviews', 'sortType': 'dec',
+        })
+
+    def test_products_popular(self) -> None:
+        self.measure('products_popular', 'get', reverse('products_popular'))
+
+    def test_products_limited(self) -> None:
+        self.measure('products_limited', 'get', reverse('products_limited'))
+
+    def test_sales(self) -> None:
+        self.measure('sales', 'get', reverse('sales'))
+
+    def test_banners(self) -> None:
+        self.measure('banners', 'get', reverse('banners'))
+
+    def test_tags(self) -> None:
+        self.measure('tags', 'get', reverse('tags'))
+
+    def test_product_detail(self) -> None:
+        self.measure('product_detail', 'get', reverse('product_detail', kwargs={'pk': self.product.id}))
+
+    def test_product_review(self) -> None:
+        self.client.force_login(self.user)
+        rate = Rate.objects.get(value=5)
+        self.measure('product_review', 'post', reverse('product_review', kwargs={'pk': self.product.id}),
+                     data={'text': 'Отзыв', 'rate': rate.id}, content_type='application/json')
+
+    def test_async_catalog(self) -> None:
+        self.measure('async_catalog', 'get', reverse('async_catalog'), data={
+            'filter[name]': 'Продукт', 'filter[minPrice]': 0, 'filter[maxPrice]': 50000,
+            'currentPage': 2, 'sort': 'price', 'sortType': 'inc',
+        })
+
+    def test_async_categories(self) -> None:
+        self.measure('async_categories', 'get', reverse('async_categories'))
+
+    def test_async_products_popular(self) -> None:
+        self.measure('async_products_popular', 'get', reverse('async_products_popular'))
+
+    def test_async_tags(self) -> None:
+        self.measure('async_tags', 'get', reverse('async_tags'))
+
+    def test_async_product_detail(self) -> None:
+        self.measure('async_product_detail', 'get', reverse('async_product_detail', kwargs={'pk': self.product.id}))
+
+
+class PerformanceBudgetCoverageTest(SimpleTestCase):
+    """
+    У каждого маршрута приложений (app_*/urls.py) есть бюджет в performance_budgets.json
+    """
+
+    def test_every_route_has_budget(self) -> None:
+        budget_urls = {budget['url'] for budget in PERF_BUDGETS['endpoints'].values()}
+        for app in apps.get_app_configs():
+            if not app.name.startswith('app_') or not module_has_submodule(app.module, 'urls'):
+                continue
+            for pattern in import_module(f'{app.name}.urls').urlpatterns:
+                route = f'{app.name}: {pattern.pattern}'
+                self.assertIsNotNone(pattern.name, f'{route}: маршрут без имени')
+                self.assertIn(pattern.name, budget_urls, f'{route}: нет бюджета для {pattern.name}')
+
+
+class CursorPaginationTest(TestCase):
+    """
+    Курсорный режим каталога: обход страниц, смена направления сортировки, неподдерживаемая сортировка
+    """
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.products = [
+            ProductInstance.objects.create(title=f'Ноутбук {i}', slug=f'laptop-{i}', price=100 + (i * 7) % 10)
+            for i in range(8)
+        ]
+
+    def get(self, **params: Any) -> Dict[str, Any]:
+        response = self.client.get(reverse('catalog'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def walk(self, sort_type: str) -> list:
+        ids, cursor = [], ''
+        while cursor is not None:
+            data = self.get(cursor=cursor, sort='price', sortType=sort_type)
+            ids += [item['id'] for item in data['items']]
+            cursor = data['nextCursor']
+        return ids
+
+    def test_walk_pages(self) -> None:
+        by_price = sorted(self.products, key=lambda product: (product.price, product.id))
+        self.assertEqual(self.walk('inc'), [product.id for product in by_price])
+        self.assertEqual(self.walk('dec'), [product.id for product in sorted(
+            self.products, key=lambda product: (-product.price, -product.id))])
+
+    def test_direction_change_resets_cursor(self) -> None:
+        cursor = self.get(cursor='', sort='price', sortType='inc')['nextCursor']
+        first_page = self.get(cursor='', sort='price', sortType='dec')
+        self.assertEqual(self.get(cursor=cursor, sort='price', sortType='dec')['items'], first_page['items'])
+
+    def test_relevance_ordering_uses_pages(self) -> None:
+        params = {'filter[name]': 'ноутбук', 'currentPage': 2}
+        data = self.get(cursor='', **params)
+        self.assertNotIn('nextCursor', data)  # Постраничный режим с сортировкой по релевантности
+        self.assertEqual(data, self.get(**params))
+
+
+class ProductSearchTest(TestCase):
+    """
+    Поиск каталога через поисковый индекс и его синхронизация сигналами
+    """
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.phone = ProductInstance.objects.create(title='Смартфон Galaxy', slug='phone', price=100)
+        self.laptop = ProductInstance.objects.create(title='Ноутбук', slug='laptop', price=200,
+                                                     description='Легкий ноутбук для работы')
+        self.bag = ProductInstance.objects.create(title='Сумка для ноутбука', slug='bag', price=50)
+        self.tag = Tag.objects.create(name='Электроника')
+        self.laptop.tags.add(self.tag)
+
+    def search(self, query: str) -> list:
+        response = self.client.get(reverse('catalog'), {'filter[name]': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()['items']]
+
+    def test_ranked_by_relevance(self) -> None:
+        self.assertEqual(self.search('ноутбук'), [self.laptop.id, self.bag.id])  # В ноутбуке слово встречается дважды
+        self.assertEqual(self.search('легкий ноутбук'), [self.laptop.id])
+        self.assertEqual(self.search('галакси смартфон'), [])
+        self.assertEqual(self.search('смарт'), [self.phone.id])  # Поиск по части слова, как icontains
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgresSearchBackend работает только с PostgreSQL')
+    def test_backends_match_partial_words(self) -> None:
+        queryset = ProductInstance.objects.all()
+        for query in ('смарт', 'ноутб', 'сумк ноут', 'лектро', 'алакс'):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    sorted(PostgresSearchBackend().search(queryset, query).values_list('id', flat=True)),
+                    sorted(InMemorySearchBackend().search(queryset, query).values_list('id', flat=True)),
+                )
+
+    def test_index_follows_changes(self) -> None:
+        self.assertEqual(self.search('электроника'), [self.laptop.id])
+        self.phone.tags.add(self.tag)
+        self.assertEqual(sorted(self.search('электроника')), sorted([self.phone.id, self.laptop.id]))
+        self.tag.name = 'Гаджеты'
+        self.tag.save()
+        self.assertEqual(self.search('электроника'), [])
+        self.phone.title = 'Планшет'
+        self.phone.save()
+        self.assertEqual(self.search('гаджеты планшет'), [self.phone.id])
+
+
+@override_settings(IMAGE_PIPELINE_ASYNC=False)
+class ImageRenditionsTest(TestCase):
+    """
+    Варианты изображений строятся после фиксации транзакции, оригинал не изменяется
+    """
+
+    def setUp(self) -> None:
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.product = ProductInstance.objects.create(title='Продукт', slug='product', price=100)
+
+    def upload(self, size: tuple) -> ProductImages:
+        content = io.BytesIO()
+        PILImage.new('RGB', size).save(content, 'JPEG')
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImages.objects.create(
+                product=self.product, src=SimpleUploadedFile('photo.jpg', content.getvalue()), alt='Фото'
+            )
+        image.refresh_from_db()
+        return image
+
+    def test_renditions_built_after_commit(self) -> None:
+        image = self.upload((2000, 1000))
+        with PILImage.open(image.src.path) as original:
+            self.assertEqual(original.size, (2000, 1000))  # Оригинал сохранен без изменений
+        self.assertEqual(image.renditions['source'], image.src.name)
+        for name, size in ProductImages.rendition_sizes.items():
+            with image.src.storage.open(image.renditions[name]) as file, PILImage.open(file) as rendition:
+                self.assertEqual(rendition.size, (size[0], size[0] // 2))
+
+        self.assertEqual(ProductImageSerializer(image, rendition='card').data['src'],
+                         image.src.storage.url(image.renditions['card']))
+        self.assertEqual(ProductImageSerializer(image).data['src'], image.src.url)
+
+    def test_small_image_uses_original(self) -> None:
+        image = self.upload((80, 80))
+        self.assertEqual(image.renditions['thumbnail'], image.src.name)
+        self.assertEqual(image.renditions['full'], image.src.name)
+
+
+class FlatSerializerTest(TestCase):
+    """
+    Плоская сериализация списков из строк .values() совпадает с сериализацией каждого объекта
+    """
+
+    def setUp(self) -> None:
+        now = timezone.now()
+        category = Category.objects.create(title='Категория')
+        tags = Tag.objects.bulk_create([Tag(name='tag1'), Tag(name='tag2')])
+        self.products = [
+            ProductInstance.objects.create(
+                title=f'Продукт {i}', slug=f'product-{i}', price=Decimal('99.5') + i, salePrice=80, count=i,
+                category=category if i else None, freeDelivery=bool(i % 2), description='Описание',
+                dateFrom=now - timedelta(days=1), dateTo=now + timedelta(days=1),
+                reviews_count=i, average_rating=Decimal('4.5') if i else None,
+            )
+            for i in range(3)
+        ]
+        ProductImages.objects.bulk_create([
+            ProductImages(product=self.products[0], src='images/images_product/a.jpg', alt='a',
+                          renditions={'source': 'images/images_product/a.jpg', 'card': 'renditions/card/a.jpg'}),
+            ProductImages(product=self.products[0], src='images/images_product/b.jpg', alt=None),
+            ProductImages(product=self.products[1], src='', alt='пусто'),
+        ])
+        self.products[0].tags.set(tags)
+        self.products[2].tags.set(tags[1:])
+
+    def assert_same(self, serializer_class: Any, context: Dict[str, Any]) -> None:
+        rows = ProductInstance.objects.order_by('id').values(*serializer_class.flat_fields)
+        instances = ProductInstance.objects.order_by('id').prefetch_related('images2', 'tags')
+        self.assertEqual(
+            json.dumps(serializer_class(rows, many=True, context=context).data),
+            json.dumps([serializer_class(instance, context=context).data for instance in instances]),
+        )
+
+    def test_same_json(self) -> None:
+        request = RequestFactory().get('/api/catalog')
+        for context in ({}, {'request': request}):
+            self.assert_same(ProductListSerializer, context)
+            self.assert_same(ProductSalesSerializer, context)
+
+
+class AsyncCatalogViewsTest(TestCase):
+    """
+    Асинхронные представления каталога (/api/async/...) возвращают те же ответы, что и синхронные
+    """
+
+    def setUp(self) -> None:
+        cache.clear()  # Записи кэша общие у синхронных и асинхронных представлений
+        now = timezone.now()
+        parent = Category.objects.create(title='Категория')
+        Category.objects.create(title='Подкатегория', parent=parent)
+        tag = Tag.objects.create(name='tag1')
+        self.products = [
+            ProductInstance.objects.create(
+                title=f'Продукт {i}', slug=f'product-{i}', price=Decimal('99.5') + i, count=i, category=parent,
+                description='Описание', dateFrom=now, dateTo=now, number_of_purchases=i,
+            )
+            for i in range(5)
+        ]
+        self.products[0].tags.set([tag])
+        ProductImages.objects.create(product=self.products[0], src='images/images_product/a.jpg', alt='a')
+        author = User.objects.create_user(username='author', email='author@example.com', password='password')
+        Review.objects.create(product=self.products[0], author=author, rate=Rate.objects.create(value=5), text='Отзыв')
+        PropertyInstanceProduct.objects.create(product=self.products[0], value='Синий', slug='blue',
+                                               name=PropertyTypeProduct.objects.create(name='Цвет', slug='color'))
+
+    def test_same_responses(self) -> None:
+        pk = self.products[0].id
+        cases = [
+            ('catalog', {}, {}),
+            ('catalog', {}, {'currentPage': 2, 'sort': 'price', 'sortType': 'inc'}),
+            ('catalog', {}, {'cursor': '', 'sort': 'price', 'sortType': 'dec'}),
+            ('categories', {}, {}),
+            ('products_popular', {}, {}),
+            ('tags', {}, {}),
+            ('product_detail', {'pk': pk}, {}),
+        ]
+        for name, kwargs, params in cases:
+            with self.subTest(name=name, params=params):
+                for async_first in (False, True):  # Запись кэша создает любой из вариантов
+                    cache.clear()
+                    urls = [reverse(name, kwargs=kwargs), reverse(f'async_{name}', kwargs=kwargs)]
+                    responses = [self.client.get(url, params) for url in (urls[::-1] if async_first else urls)]
+                    self.assertEqual([response.status_code for response in responses], [200, 200])
+                    self.assertEqual(responses[0].content, responses[1].content)
+
+    def test_not_found(self) -> None:
+        self.assertEqual(self.client.get(reverse('async_catalog'), {'currentPage': 100}).status_code, 404)
+        self.assertEqual(self.client.get(reverse('async_product_detail', kwargs={'pk': 0})).status_code, 404)
+
+    async def test_asgi_request(self) -> None:
+        response = await self.async_client.get(reverse('async_catalog'), {'currentPage': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['lastPage'], 5)
+        response = await self.async_client.get(reverse('async_product_detail', kwargs={'pk': self.products[0].id}))
+        self.assertEqual(response.json()['specifications'], [{'name': 'Цвет', 'value': 'Синий'}])
+
+
+@override_settings(PRODUCT_REVIEWS_PAGE_SIZE=10)
+class ProductDetailTest(TestCase):
+    """
+    Карточка продукта загружается фиксированным числом запросов, отзывы - постранично
+    """
+
+    def setUp(self) -> None:
+        self.product = ProductInstance.objects.create(title='Продукт', slug='product', price=100, count=1)
+        rate = Rate.objects.create(value=5)
+        for i in range(25):
+            author = User.objects.create(username=f'author{i}', email=f'author{i}@example.com')
+            Review.objects.create(product=self.product, author=author, rate=rate, text=f'Отзыв {i}')
+            name = PropertyTypeProduct.objects.create(name=f'Характеристика {i}', slug=f'property-{i}')
+            PropertyInstanceProduct.objects.create(product=self.product, name=name, value=str(i), slug=f'value-{i}')
+
+    def get_reviews(self, params: Dict[str, Any]) -> list:
+        # Продукт, теги, изображения, страница отзывов с авторами, характеристики с названиями
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('product_detail', kwargs={'pk': self.product.id}), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['specifications']), 25)
+        return [review['text'] for review in response.json()['reviews']]
+
+    def test_reviews_pages(self) -> None:
+        expected = [review.text for review in Review.objects.filter(product=self.product)]  # Сортировка -date
+        self.assertEqual(self.get_reviews({}), expected[:10])
+        self.assertEqual(self.get_reviews({'reviewsPage': 3}), expected[20:])
+        self.assertEqual(self.get_reviews({'reviewsPage': 'x'}), expected[:10])
+        self.assertEqual(self.get_reviews({'reviewsPage': 4}), [])
+
+    def test_not_found(self) -> None:
+        self.product.available = False
+        self.product.save(update_fields=['available'])
+        self.assertEqual(self.client.get(reverse('product_detail', kwargs={'pk': self.product.id})).status_code, 404)
+
+
+class GenerateCatalogTest(TestCase):
+    """
+    Заказы синтетического набора данных создаются со строками и стоимостью
+    """
+
+    def test_orders_have_items(self) -> None:
+        call_command('generate_catalog', products=20, reviews=10, users=5, orders=5, tags=3, category_depth=1,
+                     stdout=StringIO())
+        orders = Order.objects.prefetch_related('items2')
+        self.assertEqual(len(orders), 5)
+        for order in orders:
+            lines = order.items2.all()
+            self.assertTrue(lines)
+            self.assertAlmostEqual(order.totalCost, float(sum(line.price * line.count for line in lines)))
+            self.assertAlmostEqual(order.totalCost, order.calculate_total_cost())
+
+        with self.assertRaises(CommandError):  # Slug и имена пользователей того же --seed уже заняты
+            call_command('generate_catalog', products=1, reviews=0, users=1, orders=0, stdout=StringIO())
+
+
+class ReviewStatsTest(TestCase):
+    """
+    Хранимые количество отзывов и рейтинг продукта пересчитываются при создании, изменении и удалении отзыва
+    """
+
+    def setUp(self) -> None:
+        self.product = ProductInstance.objects.create(title='Продукт', slug='product', price=100, count=1)
+        self.rates = {value: Rate.objects.create(value=value) for value in (3, 4, 5)}
+        self.user = User.objects.create_user(username='buyer', password='password')
+
+    def assertStats(self, reviews_count: int, rating: Any) -> None:
+        product = ProductInstance.objects.get(id=self.product.id)
+        self.assertEqual((product.reviews_count, product.average_rating, product.rating),
+                         (reviews_count, rating, rating))
+
+    def test_api(self) -> None:
+        self.client.force_login(self.user)
+        url = reverse('product_review', kwargs={'pk': self.product.id})
+        self.client.post(url, data={'text': 'Отзыв', 'rate': self.rates[5].id}, content_type='application/json')
+        self.assertStats(1, 5)
+        self.client.post(url, data={'text': 'Изменен', 'rate': self.rates[4].id}, content_type='application/json')
+        self.assertStats(1, 4)
+        self.assertEqual(Review.objects.get(product=self.product).text, 'Изменен')
+
+    def test_admin_changes(self) -> None:
+        review = Review.objects.create(product=self.product, author=self.user, rate=self.rates[5])
+        other = User.objects.create_user(username='other', password='password')
+        Review.objects.create(product=self.product, author=other, rate=self.rates[4])
+        self.assertStats(2, Decimal('4.5'))
+
+        review.rate = self.rates[3]
+        review.save()
+        self.assertStats(2, Decimal('3.5'))
+
+        other.delete()  # Отзывы пользователя удаляются каскадно
+        self.assertStats(1, 3)
+        review.delete()
+        self.assertStats(0, None)
+
+
+class CatalogCacheInvalidationTest(TestCase):
+    """
+    Закэшированные ответы блоков главной страницы, тегов и категорий обновляются после изменения моделей
+    """
+    product_urls = ('products_popular', 'products_limited', 'banners')
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.tag = Tag.objects.create(name='Тег')
+        self.product = ProductInstance.objects.create(title='Продукт', slug='product', price=100, count=1)
+        self.product.tags.add(self.tag)
+        self.category = Category.objects.create(title='Категория')
+
+    def get(self, name: str) -> Any:
+        self.client.get(reverse(name))
+        with self.assertNumQueries(0):  # Повторный ответ берется из кэша
+            return self.client.get(reverse(name)).json()
+
+    def products(self) -> Dict[str, list]:
+        return {name: self.get(name) for name in self.product_urls}
+
+    def test_product_changes(self) -> None:
+        self.products()
+        self.product.title = 'Новое название'
+        self.product.save()
+        for name, items in self.products().items():
+            self.assertEqual([item['title'] for item in items], ['Новое название'], name)
+
+        self.product.delete()
+        for name, items in self.products().items():
+            self.assertEqual(items, [], name)
+
+    def test_review_changes(self) -> None:
+        self.products()
+        user = User.objects.create_user(username='buyer', password='password')
+        review = Review.objects.create(product=self.product, author=user, rate=Rate.objects.create(value=5))
+        for name, items in self.products().items():
+            self.assertEqual((items[0]['reviews'], items[0]['rating']), (1, 5.0), name)
+
+        review.delete()
+        for name, items in self.products().items():
+            self.assertEqual((items[0]['reviews'], items[0]['rating']), (0, None), name)
+
+    def test_tag_changes(self) -> None:
+        self.products()
+        self.assertEqual(self.get('tags'), [{'name': 'Тег'}])
+        self.tag.name = 'Новый тег'
+        self.tag.save()
+        self.assertEqual(self.get('tags'), [{'name': 'Новый тег'}])
+        for name, items in self.products().items():
+            self.assertEqual(items[0]['tags'], [{'name': 'Новый тег'}], name)
+
+        self.tag.delete()
+        self.assertEqual(self.get('tags'), [])
+        for name, items in self.products().items():
+            self.assertEqual(items[0]['tags'], [], name)
+
+    def test_category_changes(self) -> None:
+        self.assertEqual([category['title'] for category in self.get('categories')], ['Категория'])
+        self.category.title = 'Новая категория'
+        self.category.save()
+        self.assertEqual([category['title'] for category in self.get('categories')], ['Новая категория'])
+
+        self.category.delete()
+        self.assertEqual(self.get('categories'), [])
+
+
+class CategoryTreeTest(TestCase):
+    """
+    Дерево категорий совпадает с выводом CategorySerializer и перестраивается после изменения категорий и изображений
+    """
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.image = CategoryImages.objects.create(alt='Изображение')
+        self.root = Category.objects.create(title='Электроника', image=self.image)
+        self.child = Category.objects.create(title='Ноутбуки', parent=self.root)
+        Category.objects.create(title='Игровые', parent=self.child, image=self.image)
+        Category.objects.create(title='Одежда')
+
+    def get_tree(self) -> list:
+        response = self.client.get(reverse('categories'))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_same_as_serializer(self) -> None:
+        with self.assertNumQueries(1):  # Категории вместе с изображениями
+            tree = self.get_tree()
+        expected = json.loads(json.dumps(CategorySerializer(Category.objects.all(), many=True).data))
+        self.assertEqual(tree, expected)
+        self.assertEqual([category['title'] for category in tree], ['Электроника', 'Одежда'])
+        self.assertEqual(tree[0]['image'], {'src': self.image.src.url, 'alt': 'Изображение'})
+        self.assertEqual(tree[0]['subcategories'][0]['subcategories'][0]['title'], 'Игровые')
+
+    def test_rebuilt_after_changes(self) -> None:
+        self.get_tree()
+        with self.assertNumQueries(0):  # Дерево запомнено
+            self.get_tree()
+
+        self.child.title = 'Ноутбуки и планшеты'
+        self.child.save()
+        self.assertEqual(self.get_tree()[0]['subcategories'][0]['title'], 'Ноутбуки и планшеты')
+
+        self.image.alt = 'Новое описание'
+        self.image.save()
+        self.assertEqual(self.get_tree()[0]['image']['alt'], 'Новое описание')
+
+        self.child.parent = None
+        self.child.save()
+        self.assertEqual([category['title'] for category in self.get_tree()],
+                         ['Электроника', 'Ноутбуки и планшеты', 'Одежда'])
+
+        self.image.delete()  # Ссылки категорий на изображение обнуляются (SET_NULL)
+        self.assertIsNone(self.get_tree()[0]['image'])
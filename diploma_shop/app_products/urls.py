@@ -1,6 +1,8 @@
 from django.urls import path
 from .api import ProductListView, CategoryView, CatalogView, ProductPopularView, ProductLimitedView, ProductSalesView, \
     ProductBannersView, TagsView, ProductDetailView, ReviewCreateView
+from .async_api import AsyncCatalogView, AsyncCategoryView, AsyncProductPopularView, AsyncTagsView, \
+    AsyncProductDetailView
 
 
 urlpatterns = [
@@ -14,4 +16,10 @@ urlpatterns = [
     path('tags', TagsView.as_view(), name='tags'),
     path('product/<int:pk>', ProductDetailView.as_view(), name='product_detail'),
     path('product/<int:pk>/reviews', ReviewCreateView.as_view(), name='product_review'),
+    # Асинхронные варианты представлений каталога для запуска через ASGI (diploma_shop/asgi.py)
+    path('async/categories', AsyncCategoryView.as_view(), name='async_categories'),
+    path('async/catalog', AsyncCatalogView.as_view(), name='async_catalog'),
+    path('async/products/popular', AsyncProductPopularView.as_view(), name='async_products_popular'),
+    path('async/tags', AsyncTagsView.as_view(), name='async_tags'),
+    path('async/product/<int:pk>', AsyncProductDetailView.as_view(), name='async_product_detail'),
 ]
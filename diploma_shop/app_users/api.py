@@ -1,6 +1,8 @@
 import json
 
-from django.contrib.auth import authenticate, login, logout, get_user_model
+from asgiref.sync import sync_to_async
+from django.contrib.auth import login, logout, get_user_model
+from django.contrib.auth.hashers import make_password
 from django.core.exceptions import ObjectDoesNotExist
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework import status
@@ -13,7 +15,19 @@ from rest_framework.views import APIView
 from typing import Optional
 
 from .models import Profile, User
+from diploma_shop.async_views import AsyncAPIView
+from app_orders.service import SessionBasket
+from .passwords import aauthenticate, acheck_password, run_hashing
 from .serializers import ProfileSerializer, SignInSerializer, SignUpSerializer, AvatarUploadSerializer
+from .service import get_profile_snapshot, invalidate_profile_snapshot
+
+
+def sign_in(request: Request, user: User) -> None:
+    """
+    Вход пользователя в сессию и перенос в его корзину анонимной корзины из сессии.
+    """
+    login(request, user)
+    SessionBasket(request.session).merge_into(user)
 
 
 class ProfileView(APIView):
@@ -47,12 +61,9 @@ class ProfileView(APIView):
         Returns:
         - 200 OK: Возвращает данные профиля пользователя.
         """
-        try:  # Попытка получить профиль пользователя
-            profile = Profile.objects.get(user=request.user)
-        except ObjectDoesNotExist:
-            profile = Profile.objects.create(user=request.user)  # Если профиль не найден, создаем новый профиль
-        serializer = self.serializer_class(profile)
-        return Response(serializer.data)
+        # Снимок профиля из кэша; при промахе профиль загружается вместе с пользователем и аватаром,
+        # а если профиля нет - создается
+        return Response(get_profile_snapshot(request.user))
 
     def post(self, request: Request) -> Response:  # POST-метод для обновления профиля
         """
@@ -76,7 +87,7 @@ class ProfileView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SignInView(APIView):
+class SignInView(AsyncAPIView):
     """
     Аутентификация пользователя.
 
@@ -98,7 +109,7 @@ class SignInView(APIView):
     permission_classes = [AllowAny]
     serializer_class = SignInSerializer
 
-    def post(self, request: Request) -> Response:
+    async def post(self, request: Request) -> Response:
         """
         Аутентификация пользователя.
 
@@ -123,10 +134,11 @@ class SignInView(APIView):
         if serializer.is_valid():
             username = serializer.validated_data.get('username')
             password = serializer.validated_data.get('password')
-            user = authenticate(username=username, password=password)
-            if user.is_authenticated:
+            # Пароль проверяется в пуле хеширования, поток и цикл событий не заняты PBKDF2
+            user = await aauthenticate(request, username=username, password=password)
+            if user is not None:
                 # request.session.flush()  # Очистка сессии
-                login(request, user)
+                await sync_to_async(sign_in)(request, user)
                 # cache.clear()
                 return Response({"message": "successful operation"}, status=status.HTTP_200_OK)
             else:
@@ -135,7 +147,7 @@ class SignInView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SignUpView(APIView):
+class SignUpView(AsyncAPIView):
     """
     Регистрация нового пользователя.
 
@@ -157,7 +169,7 @@ class SignUpView(APIView):
     serializer_class = SignUpSerializer
     User = get_user_model()
 
-    def post(self, request: Request) -> Response:
+    async def post(self, request: Request) -> Response:
         """
         Регистрация нового пользователя.
 
@@ -186,14 +198,19 @@ class SignUpView(APIView):
                     'phone'
                 ]
             }
-            # Создаем пользователя без полей slug, avatar и phone
-            user = User.objects.create_user(username=validated_data['username'], password=validated_data['password'])
-            Profile.objects.create(user=user, fullName=validated_data['fullName'])
-            login(request, user)
+            # Хеш пароля вычисляется в пуле хеширования, пользователь создается с готовым хешем
+            password_hash = await run_hashing(make_password, validated_data['password'])
+            await sync_to_async(self.create_user)(request, validated_data, password_hash)
             return Response({"message": "successful operation"}, status=status.HTTP_200_OK)
 
         return Response({"error": "unsuccessful operation"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def create_user(self, request: Request, validated_data: dict, password_hash: str) -> None:
+        # Создаем пользователя без полей slug, avatar и phone
+        user = User.objects.create(username=User.normalize_username(validated_data['username']), password=password_hash)
+        Profile.objects.create(user=user, fullName=validated_data['fullName'])
+        sign_in(request, user)
+
 
 class SignOutView(APIView):
     """
@@ -227,7 +244,7 @@ class SignOutView(APIView):
         return Response({"message": "successful operation"}, status=status.HTTP_200_OK)
 
 
-class ChangePasswordAPIView(APIView):
+class ChangePasswordAPIView(AsyncAPIView):
     """
     Изменение пароля текущего пользователя.
 
@@ -247,7 +264,7 @@ class ChangePasswordAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     authentication_classes = [SessionAuthentication]
 
-    def post(self, request: Request) -> Response:
+    async def post(self, request: Request) -> Response:
         """
         Изменение пароля текущего пользователя.
 
@@ -262,11 +279,11 @@ class ChangePasswordAPIView(APIView):
         new_password = request.data.get('newPassword')
         user = request.user
 
-        # Проверяем, совпадает ли текущий пароль
-        if user.check_password(current_password):
+        # Проверяем, совпадает ли текущий пароль (хеширование - в пуле хеширования)
+        if await acheck_password(user, current_password):
             # Обновляем пароль
-            user.set_password(new_password)
-            user.save()
+            user.password = await run_hashing(make_password, new_password)
+            await sync_to_async(user.save)(update_fields=['password'])
 
             return Response({'message': 'successful operation'}, status=status.HTTP_200_OK)
         else:
@@ -330,6 +347,7 @@ class UpdateAvatarAPIView(APIView):
                 avatar_instance.save()
             profile.avatar = avatar_instance  # Присваиваем профилю корректный экземпляр
             profile.save()
+            invalidate_profile_snapshot(request.user.id)  # Снимок профиля ссылается на прежний аватар
             return Response(file_serializer.data, status=status.HTTP_201_CREATED)
         else:
             return Response(file_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
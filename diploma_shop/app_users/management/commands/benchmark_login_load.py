@@ -0,0 +1,99 @@
+import asyncio
+import statistics
+import time
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandParser
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from typing import Any, Dict, List
+
+from app_users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест входа и каталога через ASGI-приложение (AsyncClient, в одном процессе):
+    сначала измеряется задержка каталога без входов, затем - при параллельных входах. Выводит
+    количество входов в секунду, количество отказов 503 (заполнен пул хеширования паролей)
+    и задержки каталога p50/p95. Пользователи для входов создаются на время теста.
+
+    Пример:
+    python manage.py benchmark_login_load --logins 16 --catalog 8 --duration 10
+    """
+    help = 'Измеряет пропускную способность входа и задержку каталога при смешанной нагрузке через ASGI'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--logins', type=int, default=16, help='Количество параллельных клиентов входа')
+        parser.add_argument('--catalog', type=int, default=8, help='Количество параллельных клиентов каталога')
+        parser.add_argument('--duration', type=float, default=10, help='Длительность каждого этапа (секунды)')
+        parser.add_argument('--users', type=int, default=50, help='Количество пользователей для входа')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Количество потоков пула хеширования (по умолчанию - PASSWORD_HASHING_WORKERS)')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        password = 'benchmark-password'
+        prefix = f'bench-login-{int(time.time())}'
+        password_hash = make_password(password)  # Один хеш для всех пользователей теста
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}-{i}', password=password_hash) for i in range(options['users'])
+        ])
+        try:
+            # AsyncClient обращается к хосту testserver; пул хеширования создается при первом входе
+            workers = options['workers'] or getattr(settings, 'PASSWORD_HASHING_WORKERS', 2)
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                                   PASSWORD_HASHING_WORKERS=workers):
+                for logins in (0, options['logins']):
+                    result = asyncio.run(self.run_stage(
+                        [user.username for user in users], password, logins, options['catalog'], options['duration']
+                    ))
+                    self.report(logins, result, options['duration'])
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+
+    async def run_stage(self, usernames: List[str], password: str, logins: int, catalog: int,
+                        duration: float) -> Dict[str, Any]:
+        """
+        Запускает клиентов входа и каталога на duration секунд.
+        """
+        result: Dict[str, Any] = {'logins': 0, 'busy': 0, 'errors': 0, 'catalog': []}
+        deadline = time.perf_counter() + duration
+
+        async def login_client(number: int) -> None:
+            client = AsyncClient()
+            while time.perf_counter() < deadline:
+                username = usernames[(number + result['logins']) % len(usernames)]
+                async with ThreadSensitiveContext():  # Как в ASGIHandler: свой поток синхронного кода на запрос
+                    response = await client.post(reverse('sign-in'), data={'username': username, 'password': password})
+                if response.status_code == 200:
+                    result['logins'] += 1
+                elif response.status_code == 503:
+                    result['busy'] += 1
+                    await asyncio.sleep(float(response.get('Retry-After', 1)))
+                else:
+                    result['errors'] += 1
+
+        async def catalog_client() -> None:
+            client = AsyncClient()
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                async with ThreadSensitiveContext():
+                    response = await client.get(reverse('catalog'))
+                if response.status_code == 200:
+                    result['catalog'].append((time.perf_counter() - started) * 1000)
+                else:
+                    result['errors'] += 1
+
+        await asyncio.gather(*[login_client(number) for number in range(logins)],
+                             *[catalog_client() for _ in range(catalog)])
+        return result
+
+    def report(self, logins: int, result: Dict[str, Any], duration: float) -> None:
+        latencies = sorted(result['catalog']) or [0.0]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f'Клиентов входа {logins}: входов {result["logins"] / duration:.1f}/с, отказов 503 {result["busy"]}, '
+            f'ошибок {result["errors"]}; каталог {len(result["catalog"]) / duration:.1f} запросов/с, '
+            f'p50 {statistics.median(latencies):.1f} мс, p95 {p95:.1f} мс'
+        )
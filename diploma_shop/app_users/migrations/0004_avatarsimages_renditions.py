@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_users', '0003_alter_avatarsimages_src'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='avatarsimages',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Варианты изображения'),
+        ),
+    ]
@@ -2,15 +2,16 @@ from autoslug import AutoSlugField
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db import models
-from PIL import Image
 from django.urls import reverse
 from phonenumber_field.modelfields import PhoneNumberField
 from typing import Optional
 
+from app_products.images import ImageRenditionsMixin
+
 User = get_user_model()
 
 
-class AvatarsImages(models.Model):
+class AvatarsImages(ImageRenditionsMixin, models.Model):
     """
     Модель изображения для аватарок
     """
@@ -29,6 +30,17 @@ class AvatarsImages(models.Model):
         default=None,
         verbose_name='Альтернативная строка изображения аватара'
     )
+    renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Варианты изображения'  # Заполняется app_products.images после сохранения
+    )
+    rendition_sizes = {
+        'thumbnail': (50, 50),  # Размер, до которого раньше уменьшался оригинал
+        'card': (200, 200),
+        'full': (600, 600),
+    }
 
     def __str__(self) -> str:
         return f'{self.alt}'
@@ -46,16 +58,11 @@ class AvatarsImages(models.Model):
             return self.src.url
 
     def save(self, *args, **kwargs) -> None:
-        super().save()
-        img = Image.open(self.src.path)
-        if img.height > 50 or img.width > 50:
-            output_size = (50, 50)
-            img.thumbnail(output_size)
-            img.save(self.src.path)
-        # Проверка размера изображения
+        # Проверка размера нового загруженного изображения до сохранения: оригинал хранится без уменьшения
         MAX_SIZE = 2 * 1024 * 1024  # 2 МБ
-        if self.src.size > MAX_SIZE:
+        if self.src and not self.src._committed and self.src.size > MAX_SIZE:
             raise ValidationError('Размер изображения должен быть не более 2 МБ.')
+        super().save(*args, **kwargs)  # Варианты изображения строятся app_products.images
 
 
 class Profile(models.Model):
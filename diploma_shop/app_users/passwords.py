@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.signals import user_login_failed
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from typing import Any, Callable, Optional, Tuple
+
+User = get_user_model()
+
+# Пул потоков хеширования паролей этого процесса и счетчик свободных мест в нем (выполняемые и ожидающие задачи)
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+_init_lock = threading.Lock()
+
+
+class PasswordHashingBusy(APIException):
+    """
+    Очередь хеширования паролей заполнена: запрос отклоняется сразу, а не ждет освобождения пула.
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'password_hashing_busy'
+    wait = 1  # Заголовок Retry-After (секунды), см. rest_framework.views.exception_handler
+
+
+def _get_pool() -> Tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    global _executor, _slots
+    with _init_lock:
+        if _executor is None:
+            workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', 2)
+            _slots = threading.BoundedSemaphore(workers + getattr(settings, 'PASSWORD_HASHING_QUEUE_SIZE', 32))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+    return _executor, _slots
+
+
+async def run_hashing(func: Callable, *args: Any) -> Any:
+    """
+    Выполняет хеширование пароля в ограниченном пуле потоков (PASSWORD_HASHING_WORKERS), не занимая
+    цикл событий. PBKDF2 освобождает GIL, поэтому потоки пула хешируют параллельно. Функция не должна
+    обращаться к БД: соединения с БД потоков пула не закрываются.
+
+    Parameters:
+    - func (Callable): Функция хеширования (make_password, check_password).
+    - args (Any): Аргументы функции.
+
+    Returns:
+    - Any: Результат функции.
+
+    Raises:
+    - PasswordHashingBusy: В пуле нет свободных мест (PASSWORD_HASHING_WORKERS + PASSWORD_HASHING_QUEUE_SIZE).
+    """
+    executor, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        raise PasswordHashingBusy()
+    try:
+        future = executor.submit(func, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return await asyncio.wrap_future(future)
+
+
+def _verify_password(password: Optional[str], encoded: str) -> Tuple[bool, bool]:
+    needs_update = []  # check_password вызывает setter, если пароль верен, а хеш устарел
+    return check_password(password, encoded, setter=needs_update.append), bool(needs_update)
+
+
+async def acheck_password(user: User, password: Optional[str]) -> bool:
+    """
+    Асинхронный аналог user.check_password(): проверка в пуле хеширования, при устаревшем
+    алгоритме или числе итераций хеш пересчитывается и сохраняется.
+    """
+    is_correct, needs_update = await run_hashing(_verify_password, password, user.password)
+    if is_correct and needs_update:
+        user.password = await run_hashing(make_password, password)
+        await sync_to_async(user.save)(update_fields=['password'])
+    return is_correct
+
+
+def _get_user(username: str) -> Optional[User]:
+    try:
+        return User._default_manager.get_by_natural_key(username)
+    except User.DoesNotExist:
+        return None
+
+
+async def aauthenticate(request: Any, username: str, password: str) -> Optional[User]:
+    """
+    Асинхронный аналог authenticate() для ModelBackend (единственного бэкенда проекта): пользователь
+    загружается из БД в потоке, пароль проверяется в пуле хеширования.
+
+    Parameters:
+    - request (Any): Объект запроса (для сигнала user_login_failed).
+    - username (str): Имя пользователя.
+    - password (str): Пароль.
+
+    Returns:
+    - Optional[User]: Пользователь или None, если данные неверны или пользователь неактивен.
+    """
+    user = await sync_to_async(_get_user)(username)
+    if user is None:
+        # Хеширование выполняется и для несуществующего пользователя, как в ModelBackend,
+        # чтобы время ответа не выдавало существование имени
+        await run_hashing(make_password, password)
+    elif await acheck_password(user, password) and getattr(user, 'is_active', True):
+        return user
+
+    credentials = {'username': username, 'password': '********************'}  # Пароль скрыт, как в authenticate()
+    await sync_to_async(user_login_failed.send)(sender=__name__, credentials=credentials, request=request)
+    return None
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from typing import Optional, Any, List, Union
 
 from .models import User, AvatarsImages, Profile
+from .service import invalidate_profile_snapshot
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -36,8 +37,7 @@ class ProfileImageSerializer(serializers.ModelSerializer):
         fields = ('src', 'alt')
 
     def get_src(self, obj) -> Optional[str]:  # Метод для получения URL изображения
-        if obj.src and hasattr(obj.src, 'url'):  # Проверка наличия атрибута url у объекта src
-            return obj.src.url  # Возвращает URL изображения
+        return obj.rendition_url('thumbnail')  # Вариант аватара, пока он не построен - оригинал
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -102,6 +102,7 @@ class ProfileSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():  # Проходим по оставшимся валидированным данным
             setattr(instance, attr, value)  # Присваиваем значения экземпляру профиля
         instance.save()
+        invalidate_profile_snapshot(instance.user_id)  # Снимок профиля в кэше больше не актуален
 
         return instance  # Возвращаем обновленный профиль
 
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.cache import cache
+from typing import Any, Dict, Iterable, Optional
+
+from .models import Profile, User
+
+
+def profile_cache_key(user_id: int) -> str:
+    return f'profile:{user_id}'
+
+
+def build_profile_snapshot(profile: Profile) -> Dict[str, Any]:
+    """
+    Снимок профиля - данные ProfileSerializer (fullName, email, phone, avatar).
+
+    Parameters:
+    - profile (Profile): Профиль, загруженный вместе с пользователем и аватаром (select_related).
+
+    Returns:
+    - Dict[str, Any]: Сериализованный профиль.
+    """
+    from .serializers import ProfileSerializer  # serializers импортирует функции этого модуля
+    data = ProfileSerializer(profile).data
+    return {**data, 'avatar': dict(data['avatar']) if data['avatar'] else None}
+
+
+def get_profile_snapshots(user_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Снимки профилей пользователей из кэша; отсутствующие загружаются одним запросом и кэшируются.
+    Пользователи без профиля в результат не попадают; для них кэшируется пустой снимок, чтобы не
+    запрашивать профиль повторно (при создании профиля он удаляется, см. signals).
+
+    Parameters:
+    - user_ids (Iterable[int]): Идентификаторы пользователей.
+
+    Returns:
+    - Dict[int, Dict[str, Any]]: Снимки профилей {идентификатор пользователя: снимок}.
+    """
+    keys = {profile_cache_key(user_id): user_id for user_id in set(user_ids) if user_id is not None}
+    cached = cache.get_many(keys)
+    snapshots = {keys[key]: snapshot for key, snapshot in cached.items() if snapshot}
+
+    missing = [user_id for key, user_id in keys.items() if key not in cached]
+    if missing:
+        loaded = {
+            profile.user_id: build_profile_snapshot(profile)
+            for profile in Profile.objects.select_related('avatar', 'user').filter(user_id__in=missing)
+        }
+        cache.set_many({profile_cache_key(user_id): loaded.get(user_id, {}) for user_id in missing},
+                       getattr(settings, 'PROFILE_CACHE_TIMEOUT', 60 * 15))
+        snapshots.update(loaded)
+    return snapshots
+
+
+def get_profile_snapshot(user: User) -> Dict[str, Any]:
+    """
+    Снимок профиля пользователя; если профиля нет в кэше, снимок строится по профилю из БД (профиль
+    создается, если его нет) и записывается в кэш вместо закэшированного отсутствия профиля.
+
+    Parameters:
+    - user (User): Пользователь.
+
+    Returns:
+    - Dict[str, Any]: Снимок профиля.
+    """
+    snapshot = get_profile_snapshots([user.id]).get(user.id)
+    if snapshot is None:
+        Profile.objects.get_or_create(user=user)
+        snapshot = build_profile_snapshot(Profile.objects.select_related('avatar', 'user').get(user=user))
+        cache.set(profile_cache_key(user.id), snapshot, getattr(settings, 'PROFILE_CACHE_TIMEOUT', 60 * 15))
+    return snapshot
+
+
+def invalidate_profile_snapshot(user_id: Optional[int]) -> None:
+    """
+    Удаляет снимок профиля пользователя из кэша после изменения профиля, email или аватара.
+    """
+    if user_id is not None:
+        cache.delete(profile_cache_key(user_id))
@@ -0,0 +1,179 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.middleware import SessionMiddleware as BaseSessionMiddleware
+from django.contrib.sessions.models import Session
+from django.db import DatabaseError
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'app_users.sessions'
+
+_pending: Dict[str, datetime] = {}  # Отложенные продления сессий этого процесса {ключ сессии: новый срок}
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+class SessionStore(CachedDBStore):
+    """
+    Сессии в БД с кэшем (cached_db), которые не записываются в БД на каждом запросе.
+
+    Данные сессии вместе со сроком ее действия хранятся в кэше SESSION_CACHE_ALIAS, поэтому чтение
+    активной сессии не обращается к БД. Срок действия продлевается, только когда с последнего
+    продления прошла доля SESSION_RENEW_FRACTION от времени жизни сессии. Продление сразу обновляет
+    кэш, а в БД записывается пачкой (flush_expiry_updates). Изменение данных сессии (login(), logout(),
+    корзина) сохраняется сразу, как в cached_db.
+
+    Attributes:
+    - expiry_renewed (bool): Срок действия продлен на этом запросе; SessionMiddleware обновляет cookie.
+    """
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key: Optional[str] = None) -> None:
+        super().__init__(session_key)
+        self.expiry_renewed = False
+        self._expire_date: Optional[datetime] = None  # Срок действия сессии, записанный в БД или кэш
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:  # Некорректный ключ кэша - сессия загружается из БД, как в cached_db
+            entry = None
+
+        if entry is None:
+            session = self._get_session_from_db()
+            if session is None:
+                return {}
+            entry = (self.decode(session.session_data), session.expire_date)
+            self._cache.set(self.cache_key, entry, self.get_expiry_age(expiry=session.expire_date))
+
+        data, self._expire_date = entry
+        self.renew_expiry(data)
+        return data
+
+    def renew_expiry(self, data: Dict[str, Any]) -> None:
+        """
+        Продлевает срок действия сессии, если с последнего продления прошла доля SESSION_RENEW_FRACTION
+        от времени жизни. Сессии с фиксированной датой окончания (set_expiry(datetime)) не продлеваются.
+
+        Parameters:
+        - data (Dict[str, Any]): Данные загруженной сессии.
+        """
+        expiry = data.get('_session_expiry')  # Передается явно: self.get() во время load() зациклит загрузку
+        if self._expire_date is None or isinstance(expiry, (datetime, str)):
+            return
+        ttl = self.get_expiry_age(expiry=expiry)
+        expire_date = self.get_expiry_date(expiry=expiry)
+        elapsed = (expire_date - self._expire_date).total_seconds()  # Время с последнего продления
+        if elapsed < ttl * getattr(settings, 'SESSION_RENEW_FRACTION', 0.1):
+            return
+
+        self._expire_date = expire_date
+        self._cache.set(self.cache_key, (data, expire_date), ttl)
+        queue_expiry_update(self.session_key, expire_date)
+        self.expiry_renewed = True
+
+    def create_model_instance(self, data: Dict[str, Any]) -> Session:
+        instance = super().create_model_instance(data)
+        self._expire_date = instance.expire_date
+        return instance
+
+    def save(self, must_create: bool = False) -> None:
+        super(CachedDBStore, self).save(must_create)  # Запись в БД без кэша cached_db: формат записи кэша другой
+        self._cache.set(self.cache_key, (self._session, self._expire_date), self.get_expiry_age())
+        discard_expiry_update(self.session_key)  # Срок уже записан вместе с данными
+
+    def delete(self, session_key: Optional[str] = None) -> None:
+        discard_expiry_update(session_key or self.session_key)
+        super().delete(session_key)
+
+
+class SessionMiddleware(BaseSessionMiddleware):
+    """
+    SessionMiddleware, который обновляет cookie сессии при продлении ее срока действия (SessionStore.renew_expiry)
+    без сохранения сессии. Сохранение измененных сессий выполняет SessionMiddleware Django.
+    """
+
+    def process_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        response = super().process_response(request, response)
+        session = getattr(request, 'session', None)
+        if not getattr(session, 'expiry_renewed', False) or session.modified or response.status_code >= 500:
+            return response
+        if settings.SESSION_COOKIE_NAME in response.cookies or session.get_expire_at_browser_close():
+            return response
+
+        max_age = session.get_expiry_age()
+        response.set_cookie(
+            settings.SESSION_COOKIE_NAME,
+            session.session_key,
+            max_age=max_age,
+            expires=http_date(time.time() + max_age),
+            domain=settings.SESSION_COOKIE_DOMAIN,
+            path=settings.SESSION_COOKIE_PATH,
+            secure=settings.SESSION_COOKIE_SECURE or None,
+            httponly=settings.SESSION_COOKIE_HTTPONLY or None,
+            samesite=settings.SESSION_COOKIE_SAMESITE,
+        )
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+
+def queue_expiry_update(session_key: str, expire_date: datetime) -> None:
+    """
+    Откладывает запись нового срока действия сессии в БД. Отложенные продления записываются
+    одним запросом, когда их набирается SESSION_EXPIRY_BATCH_SIZE или с последней записи
+    прошло SESSION_EXPIRY_FLUSH_INTERVAL секунд.
+
+    Parameters:
+    - session_key (str): Ключ сессии.
+    - expire_date (datetime): Новый срок действия.
+    """
+    with _pending_lock:
+        _pending[session_key] = expire_date
+        due = len(_pending) >= getattr(settings, 'SESSION_EXPIRY_BATCH_SIZE', 500) or \
+            time.monotonic() - _last_flush >= getattr(settings, 'SESSION_EXPIRY_FLUSH_INTERVAL', 60)
+    if due:
+        flush_expiry_updates()
+
+
+def discard_expiry_update(session_key: Optional[str]) -> None:
+    with _pending_lock:
+        _pending.pop(session_key, None)
+
+
+def flush_expiry_updates() -> int:
+    """
+    Записывает отложенные продления сессий в БД одним запросом (bulk_update).
+    Сессии, удаленные до записи, пропускаются: UPDATE не затрагивает отсутствующие строки.
+
+    Returns:
+    - int: Количество записанных продлений.
+    """
+    global _last_flush
+    with _pending_lock:
+        updates: Tuple[Tuple[str, datetime], ...] = tuple(_pending.items())
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not updates:
+        return 0
+    try:
+        Session.objects.bulk_update(
+            [Session(session_key=session_key, expire_date=expire_date) for session_key, expire_date in updates],
+            ['expire_date'],
+        )
+    except DatabaseError:
+        # Продление не критично: до окончания срока в БД остается большая его часть, сессия продлится снова
+        logger.exception('Не удалось записать продление %s сессий', len(updates))
+        return 0
+    return len(updates)
+
+
+atexit.register(flush_expiry_updates)  # Отложенные продления записываются при остановке процесса
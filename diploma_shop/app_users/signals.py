@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from typing import Any
+
+from app_products.images import renditions_ready
+from .models import AvatarsImages, Profile
+from .service import invalidate_profile_snapshot
+
+
+def invalidate_avatar_profiles(sender: Any, instance_id: int, **kwargs: Any) -> None:
+    """
+    Делает недействительными снимки профилей с аватаром, для которого построены варианты:
+    снимок ссылается на оригинал, пока вариант не готов.
+    """
+    for user_id in Profile.objects.filter(avatar_id=instance_id).values_list('user_id', flat=True):
+        invalidate_profile_snapshot(user_id)
+
+
+def invalidate_created_profile(sender: Any, instance: Profile, created: bool, **kwargs: Any) -> None:
+    """
+    Удаляет пустой снимок, закэшированный для пользователя без профиля, когда профиль создан.
+    Удаление выполняется после фиксации транзакции: до нее параллельный запрос не видит профиль
+    и снова закэшировал бы пустой снимок.
+    """
+    if created:
+        transaction.on_commit(lambda: invalidate_profile_snapshot(instance.user_id))
+
+
+renditions_ready.connect(invalidate_avatar_profiles, sender=AvatarsImages, dispatch_uid='profile_renditions')
+post_save.connect(invalidate_created_profile, sender=Profile, dispatch_uid='profile_created')
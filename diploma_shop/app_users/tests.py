@@ -1,3 +1,204 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
 
-# Create your tests here.
+from app_products.tests import PerformanceBudgetTestCase
+
+from app_orders.models import Basket, Order
+from .models import Profile
+from . import service
+from .passwords import _get_pool
+from .sessions import flush_expiry_updates
+
+class UsersPerformanceTest(PerformanceBudgetTestCase):
+    """
+    Бюджеты эндпоинтов app_users
+    """
+
+    def test_sign_in(self) -> None:
+        self.measure('sign_in', 'post', reverse('sign-in'),
+                     data={'username': 'perf_client', 'password': 'perf-password'})
+
+    def test_sign_up(self) -> None:
+        self.measure('sign_up', 'post', reverse('sign-up'),
+                     data={'name': 'Петр Петров', 'username': 'perf_new_user', 'password': 'perf-password'})
+
+    def test_sign_out(self) -> None:
+        self.client.force_login(self.user)
+        self.measure('sign_out', 'post', reverse('sign-out'))
+
+    def test_profile_get(self) -> None:
+        self.client.force_login(self.user)
+        self.measure('profile_get', 'get', reverse('profile'))
+
+    def test_profile_post(self) -> None:
+        self.client.force_login(self.user)
+        self.measure('profile_post', 'post', reverse('profile'),
+                     data={'fullName': 'Иван Петров', 'email': 'perf_client@example.com'},
+                     content_type='application/json')
+
+    def test_profile_password(self) -> None:
+        self.client.force_login(self.user)
+        self.measure('profile_password', 'post', reverse('profile-password'),
+                     data={'currentPassword': 'perf-password', 'newPassword': 'perf-password-2'},
+                     content_type='application/json')
+
+    def test_profile_avatar(self) -> None:
+        self.client.force_login(self.user)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        image = io.BytesIO()
+        Image.new('RGB', (100, 100)).save(image, 'PNG')
+        image.name = 'avatar.png'
+        image.seek(0)
+        with override_settings(MEDIA_ROOT=media_root):
+            self.measure('profile_avatar', 'post', reverse('profile-avatar'), data={'avatar': image})
+
+
+@override_settings(SESSION_EXPIRY_FLUSH_INTERVAL=3600, SESSION_EXPIRY_BATCH_SIZE=500)
+class SessionEngineTest(TestCase):
+    """
+    Сессии читаются из кэша и не записываются в БД на каждом запросе, продления записываются пачкой
+    """
+
+    def setUp(self) -> None:
+        flush_expiry_updates()  # Продления сессий предыдущих тестов
+        self.user = get_user_model().objects.create_user(username='buyer', password='password')
+        self.client.force_login(self.user)
+        self.session_key = self.client.session.session_key
+
+    def session_queries(self, renewed: bool) -> list:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(settings.SESSION_COOKIE_NAME in response.cookies, renewed)  # Cookie обновляется при продлении
+        return [query['sql'] for query in queries if 'django_session' in query['sql']]
+
+    def test_no_writes_without_renewal(self) -> None:
+        for _ in range(3):
+            self.assertEqual(self.session_queries(renewed=False), [])
+
+    @override_settings(SESSION_RENEW_FRACTION=0)
+    def test_renewal_batched(self) -> None:
+        expire_date = Session.objects.get(session_key=self.session_key).expire_date
+        self.assertEqual(self.session_queries(renewed=True), [])  # Продление откладывается
+        self.assertEqual(flush_expiry_updates(), 1)
+        self.assertGreater(Session.objects.get(session_key=self.session_key).expire_date, expire_date)
+        self.assertEqual(flush_expiry_updates(), 0)
+
+    def test_sign_out(self) -> None:
+        self.client.post(reverse('sign-out'))
+        self.assertFalse(Session.objects.filter(session_key=self.session_key).exists())
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 403)
+
+
+class ProfileSnapshotTest(TestCase):
+    """
+    Профиль и данные покупателя в заказах читаются из снимка профиля в кэше, изменения его обновляют
+    """
+
+    def setUp(self) -> None:
+        cache.clear()  # Снимки профилей предыдущих тестов с теми же идентификаторами пользователей
+        self.user = get_user_model().objects.create_user(username='buyer', email='buyer@example.com',
+                                                         password='password')
+        Profile.objects.create(user=self.user, fullName='Иван Иванов', phone='+79990000000')
+        self.client.force_login(self.user)
+        order = Order.objects.create(basket=Basket.objects.create(user=self.user), user=self.user)
+        self.order_url = reverse('order-detail', kwargs={'pk': order.id})
+
+    def get(self, url: str) -> tuple:
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url).json()
+        return data, [query['sql'] for query in queries if 'app_users_profile' in query['sql']]
+
+    def test_profile_cached(self) -> None:
+        data, queries = self.get(reverse('profile'))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.get(reverse('profile')), (data, []))
+
+        order, queries = self.get(self.order_url)
+        self.assertEqual(queries, [])
+        self.assertEqual((order['fullName'], order['email'], order['phone']),
+                         ('Иван Иванов', 'buyer@example.com', '+79990000000'))
+
+    def test_loaded_once_per_order(self) -> None:
+        with mock.patch('app_orders.serializers.get_profile_snapshots',
+                        wraps=service.get_profile_snapshots) as get_profile_snapshots:
+            self.get(self.order_url)
+        self.assertEqual(get_profile_snapshots.call_count, 1)
+
+    def test_user_without_profile(self) -> None:
+        Profile.objects.filter(user=self.user).delete()
+        cache.clear()
+        order, queries = self.get(self.order_url)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual((order['fullName'], order['email'], order['phone']), (None, 'buyer@example.com', None))
+        self.assertEqual(self.get(self.order_url)[1], [])  # Отсутствие профиля закэшировано
+
+        with self.captureOnCommitCallbacks(execute=True):  # Пустой снимок удаляется после фиксации
+            Profile.objects.create(user=self.user, fullName='Петр Петров')
+        self.assertEqual(self.get(self.order_url)[0]['fullName'], 'Петр Петров')
+
+    def test_stale_missing_profile(self) -> None:
+        # Пустой снимок, закэшированный параллельным запросом до фиксации создания профиля
+        cache.set(service.profile_cache_key(self.user.id), {})
+        data, _ = self.get(reverse('profile'))
+        self.assertEqual(data['fullName'], 'Иван Иванов')
+        self.assertEqual(self.get(reverse('profile')), (data, []))
+
+    def test_invalidated_on_update(self) -> None:
+        self.get(reverse('profile'))
+        self.client.post(reverse('profile'), data={'fullName': 'Петр Петров', 'email': 'petr@example.com'},
+                         content_type='application/json')
+        data, _ = self.get(reverse('profile'))
+        self.assertEqual((data['fullName'], data['email']), ('Петр Петров', 'petr@example.com'))
+
+        self.client.post(self.order_url, data={'fullName': 'Сидор Сидоров'}, content_type='application/json')
+        self.assertEqual(self.get(self.order_url)[0]['fullName'], 'Сидор Сидоров')
+        self.assertEqual(self.get(reverse('profile'))[0]['fullName'], 'Сидор Сидоров')
+
+
+class PasswordHashingTest(TestCase):
+    """
+    Вход, регистрация и смена пароля хешируют пароли в ограниченном пуле, при заполненном пуле - 503
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(username='buyer', password='password')
+
+    async def test_sign_in_asgi(self) -> None:
+        client = AsyncClient()
+        response = await client.post(reverse('sign-in'), data={'username': 'buyer', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 500)
+        response = await client.post(reverse('sign-in'), data={'username': 'buyer', 'password': 'password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await client.get(reverse('profile'))).status_code, 200)
+
+    def test_change_password(self) -> None:
+        self.client.force_login(self.user)
+        response = self.client.post('/api/profile/password', data={'currentPassword': 'wrong', 'newPassword': 'new'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/profile/password', data={'currentPassword': 'password', 'newPassword': 'new'})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new'))
+
+    def test_busy_pool(self) -> None:
+        executor, _ = _get_pool()
+        with mock.patch('app_users.passwords._get_pool', return_value=(executor, threading.BoundedSemaphore(0))):
+            response = self.client.post(reverse('sign-up'),
+                                        data={'name': 'Петр Петров', 'username': 'petr', 'password': 'password'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(get_user_model().objects.filter(username='petr').exists())
@@ -8,6 +8,6 @@ urlpatterns = [
     path('sign-up', SignUpView.as_view(), name='sign-up'),
     path('sign-out', SignOutView.as_view(), name='sign-out'),
     path('profile', ProfileView.as_view(), name='profile'),
-    path('profile/password', ChangePasswordAPIView.as_view()),
-    path('profile/avatar', UpdateAvatarAPIView.as_view()),
+    path('profile/password', ChangePasswordAPIView.as_view(), name='profile-password'),
+    path('profile/avatar', UpdateAvatarAPIView.as_view(), name='profile-avatar'),
 ]
@@ -3,6 +3,10 @@ ASGI config for diploma_shop project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Асинхронные представления (вход, регистрация и смена пароля) не занимают поток на время
+хеширования пароля только при запуске через ASGI-сервер, например:
+uvicorn diploma_shop.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -0,0 +1,45 @@
+import inspect
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.http import HttpRequest
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from typing import Any, Callable
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView с асинхронными обработчиками методов (async def post и т.д.) для запуска через ASGI
+    (diploma_shop/asgi.py). DRF 3.14 не поддерживает асинхронные представления, поэтому dispatch
+    переопределен: аутентификация, проверка прав и ограничения (initial) обращаются к сессии и БД
+    и выполняются в потоке через sync_to_async, а обработчик ожидается в цикле событий, не занимая поток.
+    Через WSGI и тестовый клиент Django такое представление выполняется через async_to_sync.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs: Any) -> Callable:
+        view = super().as_view(**initkwargs)
+        if cls.view_is_async:
+            markcoroutinefunction(view)  # csrf_exempt в APIView.as_view скрывает асинхронность представления
+        return view
+
+    async def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> Response:
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):  # options и http_method_not_allowed синхронные
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,269 @@
+import codecs
+import json
+import math
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import json as json_utils
+from rest_framework.utils.encoders import JSONEncoder
+from typing import List, Union, Any, Dict, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson не установлен - FastJSONRenderer использует JSONRenderer
+    orjson = None
+
+
+JSON_STREAM_CHUNK_SIZE = 64 * 1024  # Размер блока, читаемого из тела запроса за один раз
+JSON_WHITESPACE = ' \t\n\r'
+JSON_ENCODER = JSONEncoder()  # Преобразование типов, которые orjson не сериализует сам (Decimal, Promise, ...)
+# Диапазон модулей чисел с плавающей точкой, которые orjson выводит так же, как json (без экспоненты);
+# вне его json пишет, например, 1e-07 и 1e-05, а orjson - 1e-7 и 0.00001
+ORJSON_SAME_FLOAT_RANGE = (1e-4, 1e16)
+
+
+class JSONStreamReader:
+    """
+    Инкрементальный разбор JSON из байтового потока тела запроса.
+
+    Байты читаются блоками и сразу декодируются инкрементальным декодером, в буфере хранится только
+    неразобранный остаток, поэтому тело запроса не копируется целиком в bytes и str. Элементы
+    массива разбираются по одному (iter_array), размер тела и количество элементов ограничены.
+
+    Attributes:
+    - max_bytes (Optional[int]): Максимальный размер тела запроса в байтах.
+    - max_items (Optional[int]): Максимальное количество элементов массива.
+    """
+
+    def __init__(self, stream: Any, encoding: str = 'utf-8', max_bytes: Optional[int] = None,
+                 max_items: Optional[int] = None, parse_constant: Optional[Any] = None) -> None:
+        self.stream = stream
+        self.text_decoder = codecs.getincrementaldecoder(encoding)()
+        self.json_decoder = json.JSONDecoder(parse_constant=parse_constant)
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.buffer = ''
+        self.pos = 0
+        self.bytes_read = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """
+        Дочитывает следующий блок потока; разобранная часть буфера отбрасывается.
+
+        Returns:
+        - bool: False, если поток закончился.
+        """
+        if self.eof:
+            return False
+        chunk = self.stream.read(JSON_STREAM_CHUNK_SIZE)
+        self.bytes_read += len(chunk)
+        if self.max_bytes is not None and self.bytes_read > self.max_bytes:
+            raise ParseError(f'JSON parse error - request body exceeds {self.max_bytes} bytes')
+        try:
+            text = self.text_decoder.decode(chunk, final=not chunk)
+        except UnicodeDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        self.eof = not chunk
+        return not self.eof
+
+    def peek(self) -> str:
+        """
+        Пропускает пробельные символы и возвращает следующий символ ('' в конце потока).
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in JSON_WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def read_value(self) -> Any:
+        """
+        Разбирает одно значение JSON, дочитывая поток, пока значение не будет полным.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.pos)
+            except ValueError as exc:
+                if self.fill():
+                    continue
+                raise ParseError('JSON parse error - %s' % str(exc))
+            # Число в конце буфера может продолжаться в следующем блоке
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def read_document(self) -> Any:
+        """
+        Разбирает тело запроса целиком как одно значение JSON.
+        """
+        value = self.read_value()
+        self.expect_end()
+        return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """
+        Возвращает элементы JSON-массива по одному по мере чтения потока.
+
+        Raises:
+        - ParseError: Тело запроса не является массивом, некорректно или превышает ограничения.
+        """
+        if self.peek() != '[':
+            raise ParseError('JSON parse error - expected an array')
+        self.pos += 1
+        if self.peek() == ']':
+            self.pos += 1
+            self.expect_end()
+            return
+        count = 0
+        while True:
+            value = self.read_value()
+            count += 1
+            if self.max_items is not None and count > self.max_items:
+                raise ParseError(f'JSON parse error - array exceeds {self.max_items} items')
+            yield value
+            separator = self.peek()
+            self.pos += 1
+            if separator == ']':
+                break
+            if separator != ',':
+                raise ParseError("JSON parse error - expected ',' or ']'")
+        self.expect_end()
+
+    def expect_end(self) -> None:
+        if self.peek():
+            raise ParseError('JSON parse error - extra data after JSON value')
+
+
+class StreamingJSONParser(JSONParser):
+    """
+    Анализирует JSON инкрементально из байтового потока (см. JSONStreamReader) вместо чтения тела
+    запроса целиком. Ограничения задаются настройками JSON_PARSER_MAX_BYTES и JSON_PARSER_MAX_ITEMS.
+
+    Media Type:
+    - application/json: Медиа-тип определен как 'application/json'.
+
+    Raises:
+    - ParseError: Исключение в случае ошибки при разборе JSON или превышения ограничений.
+    """
+
+    media_type: str = 'application/json'  # Определение медиа-типа
+
+    def get_reader(self, stream: Any, parser_context: Union[None, Dict[str, Any]]) -> JSONStreamReader:
+        parser_context = parser_context or {}  # Установка контекста анализатора
+        return JSONStreamReader(
+            stream,
+            encoding=parser_context.get('encoding', settings.DEFAULT_CHARSET),
+            max_bytes=getattr(settings, 'JSON_PARSER_MAX_BYTES', None),
+            max_items=getattr(settings, 'JSON_PARSER_MAX_ITEMS', None),
+            parse_constant=json_utils.strict_constant if self.strict else None,  # NaN и Infinity запрещены
+        )
+
+    def parse(self, stream: Any, media_type: Union[None, str] = None,
+              parser_context: Union[None, Dict[str, Any]] = None) -> Any:
+        return self.get_reader(stream, parser_context).read_document()
+
+
+class PlainListJSONParser(StreamingJSONParser):
+    """
+    Анализирует входные данные, сериализованные в формате JSON-массива, в список примитивов Python.
+    Это позволяет в POST-запросе отправлять данные в формате массива.
+
+    Если у представления stream_list_items = True, вместо списка возвращается итератор,
+    разбирающий элементы по мере их обработки представлением.
+
+    Media Type:
+    - application/json: Медиа-тип определен как 'application/json'.
+
+    Methods:
+    - parse: Метод для анализа входных данных JSON в список Python.
+
+    Returns:
+    - Union[List[Any], Iterator[Any]]: Элементы массива из JSON в формате Python.
+
+    Raises:
+    - ParseError: Исключение в случае ошибки при разборе JSON.
+    """
+
+    def parse(self, stream: Any, media_type: Union[None, str] = None,
+              parser_context: Union[None, Dict[str, Any]] = None) -> Union[List[Any], Iterator[Any]]:
+        items = self.get_reader(stream, parser_context).iter_array()
+        view = (parser_context or {}).get('view')
+        if getattr(view, 'stream_list_items', False):
+            return items  # Ошибки разбора возникнут при обходе итератора в представлении
+        return list(items)
+
+
+def is_orjson_safe_float(value: float) -> bool:
+    """
+    Проверяет, что orjson выведет число так же, как JSONRenderer: NaN и бесконечность JSONRenderer
+    отклоняет (STRICT_JSON), а orjson заменяет на null; экспоненциальную запись они форматируют по-разному.
+    """
+    low, high = ORJSON_SAME_FLOAT_RANGE
+    return value == 0 or (math.isfinite(value) and low <= abs(value) < high)
+
+
+def has_orjson_unsafe_floats(data: Any) -> bool:
+    """
+    Ищет в данных числа с плавающей точкой, которые orjson выводит иначе, чем JSONRenderer
+    (см. is_orjson_safe_float). Обход без рекурсии: вложенность ответа не ограничена.
+
+    Parameters:
+    - data (Any): Данные ответа.
+
+    Returns:
+    - bool: True, если такое число найдено.
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        value_type = type(value)
+        if value_type is dict:
+            stack.extend(value.values())
+        elif value_type is list or value_type is tuple:
+            stack.extend(value)
+        elif isinstance(value, float) and not is_orjson_safe_float(value):
+            return True
+    return False
+
+
+def orjson_default(value: Any) -> Any:
+    """
+    Преобразует типы, которые orjson не сериализует сам, кодировщиком DRF. Decimal кодировщик
+    превращает в float; если orjson выведет его иначе, чем JSONRenderer, рендеринг прерывается
+    (TypeError) и ответ строит JSONRenderer.
+    """
+    value = JSON_ENCODER.default(value)
+    if isinstance(value, float) and not is_orjson_safe_float(value):
+        raise TypeError('float is rendered by JSONRenderer')
+    return value
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson с тем же побайтовым результатом, что и JSONRenderer DRF:
+    компактные разделители, UTF-8 без экранирования, datetime в ISO 8601 с 'Z' для UTC,
+    экранирование U+2028 и U+2029. Decimal, ленивые строки перевода и прочие типы преобразуются
+    кодировщиком DRF. Если orjson не установлен, запрошен отступ или данные orjson выводит иначе
+    (NaN и бесконечность, числа в экспоненциальной записи - см. is_orjson_safe_float) или не
+    поддерживает (например, целые числа больше 64 бит), используется JSONRenderer.
+    """
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None,
+               renderer_context: Optional[Dict[str, Any]] = None) -> bytes:
+        # orjson выводит только компактный JSON в UTF-8 (UNICODE_JSON и COMPACT_JSON по умолчанию)
+        if orjson is None or data is None or self.ensure_ascii or not self.compact \
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None \
+                or has_orjson_unsafe_floats(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=orjson_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и в JSONRenderer: результат должен быть подмножеством JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
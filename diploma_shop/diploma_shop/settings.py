@@ -64,7 +64,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'app_users.sessions.SessionMiddleware',  # Обновляет cookie при продлении сессии без ее сохранения
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -115,6 +115,28 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# В продакшене используется общий для всех процессов Redis (REDIS_URL), в разработке и тестах - локальная память
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'diploma_shop',
+        }
+    }
+
+# Время хранения ответов блоков главной страницы; актуальность обеспечивается версией каталога (секунды)
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -187,13 +209,16 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'diploma_shop.json_api.StreamingJSONParser',
         'rest_framework.parsers.FormParser',
         'rest_framework.parsers.MultiPartParser'
     ],
-    # 'DEFAULT_RENDERER_CLASSES': [
-    #     'rest_framework.renderers.BrowsableAPIRenderer',
-    # ],
+    # FastJSONRenderer (orjson) выводит тот же JSON, что и rest_framework.renderers.JSONRenderer: данные, которые
+    # orjson форматирует иначе (NaN, числа в экспоненциальной записи), рендерит JSONRenderer
+    'DEFAULT_RENDERER_CLASSES': [
+        'diploma_shop.json_api.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
@@ -323,6 +348,44 @@ SPECTACULAR_SETTINGS = {
 
 # APPEND_SLASH=False
 
-SESSION_SAVE_EVERY_REQUEST = True
+# Сессии хранятся в БД и кэше и не сохраняются на каждом запросе (app_users.sessions). Срок действия продлевается,
+# когда прошла доля SESSION_RENEW_FRACTION времени жизни сессии; продления записываются в БД одним запросом
+# по SESSION_EXPIRY_BATCH_SIZE сессий или раз в SESSION_EXPIRY_FLUSH_INTERVAL секунд
+SESSION_ENGINE = 'app_users.sessions'
+SESSION_RENEW_FRACTION = 0.1
+SESSION_EXPIRY_BATCH_SIZE = 500
+SESSION_EXPIRY_FLUSH_INTERVAL = 60
+
+# Время хранения в кэше количества элементов отфильтрованного каталога (секунды)
+PRODUCTS_COUNT_CACHE_TIMEOUT = 60
+
+# Пул хеширования паролей асинхронных представлений входа, регистрации и смены пароля (app_users.passwords):
+# количество потоков (половина ядер процессора остается остальным запросам) и количество ожидающих задач,
+# сверх которого запросы отклоняются с 503
+PASSWORD_HASHING_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+PASSWORD_HASHING_QUEUE_SIZE = 32
+
+# Время хранения в кэше снимков профилей пользователей (app_users.service.get_profile_snapshots, секунды)
+PROFILE_CACHE_TIMEOUT = 60 * 15
+
+# Количество позиций рейтинга популярных продуктов (команда refresh_popular_products)
+POPULAR_PRODUCTS_LIMIT = 100
+
+# Количество отзывов на странице карточки продукта (параметр reviewsPage)
+PRODUCT_REVIEWS_PAGE_SIZE = 20
+
+# Поисковый индекс каталога (app_products.search). None - выбор по СУБД: PostgresSearchBackend
+# для PostgreSQL, InMemorySearchBackend для SQLite
+PRODUCT_SEARCH_BACKEND = None
+
+# Построение вариантов изображений (app_products.images): в пуле потоков после фиксации транзакции
+# или, если IMAGE_PIPELINE_ASYNC = False, сразу после фиксации в том же потоке
+IMAGE_PIPELINE_ASYNC = True
+IMAGE_PIPELINE_WORKERS = 2
+
+# Ограничения потокового разбора JSON (diploma_shop.json_api.StreamingJSONParser): размер тела запроса
+# в байтах и количество элементов массива
+JSON_PARSER_MAX_BYTES = 2 * 1024 * 1024
+JSON_PARSER_MAX_ITEMS = 1000
 
 # CRISPY_TEMPLATE_PACK = 'bootstrap4'
\ No newline at end of file